@@ -0,0 +1,87 @@
+"""
+機種ページのテーブル抽出: セルごとの locator 呼び出し vs HTML 一括解析
+
+    python benchmarks/bench_bulk_extract.py [--repeat 20]
+
+リポジトリのルートで実行する（scraper/ のロガーが data/log に出力するため）
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scraper"))
+
+from page_parser import MODEL_ROW_CSS, parse_model_page  # noqa: E402
+from utils import _norm_text  # noqa: E402
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "model_page.html")
+
+
+def extract_by_locator(page) -> list[list[str]]:
+    """旧実装: セルごとに inner_text を呼ぶ（1 セル = 1 IPC）"""
+    rows = page.locator(MODEL_ROW_CSS)
+    table: list[list[str]] = []
+    for j in range(rows.count()):
+        tds = rows.nth(j).locator("td")
+        row = [_norm_text(tds.nth(k).inner_text()) for k in range(tds.count())]
+        if row:
+            table.append(row)
+    return table
+
+
+def extract_by_content(page) -> list[list[str]]:
+    """新実装: page.content() 1 回 + BeautifulSoup"""
+    _, _, table = parse_model_page(page.content())
+    return table
+
+
+def timeit(fn, repeat: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with open(FIXTURE, encoding="utf-8") as f:
+        html = f.read()
+
+    parse_sec = timeit(lambda: parse_model_page(html), args.repeat)
+    print(f"parse_model_page (解析のみ): {parse_sec * 1000:.2f} ms")
+
+    try:
+        from playwright.sync_api import sync_playwright
+    except ImportError:
+        print("playwright が無いためブラウザ比較をスキップします")
+        return
+
+    with sync_playwright() as p:
+        try:
+            browser = p.chromium.launch(headless=True)
+        except Exception as e:
+            print(f"Chromium を起動できないためブラウザ比較をスキップします: {type(e).__name__}")
+            return
+        page = browser.new_page()
+        page.set_content(html)
+
+        legacy = extract_by_locator(page)
+        bulk = extract_by_content(page)
+        assert legacy == bulk, "抽出結果が一致しません"
+
+        legacy_sec = timeit(lambda: extract_by_locator(page), max(1, args.repeat // 5))
+        bulk_sec = timeit(lambda: extract_by_content(page), args.repeat)
+        browser.close()
+
+    print(f"rows x cols: {len(bulk)} x {len(bulk[0]) if bulk else 0}")
+    print(f"locator (セル単位): {legacy_sec * 1000:.1f} ms")
+    print(f"content + parse   : {bulk_sec * 1000:.1f} ms")
+    print(f"speedup           : {legacy_sec / bulk_sec:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
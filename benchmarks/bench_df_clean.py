@@ -0,0 +1,104 @@
+"""
+df_clean のスループット: 旧実装 vs clean_results（合成データ）
+
+    python benchmarks/bench_df_clean.py [--rows 1000000] [--bad-rate 0.01]
+
+リポジトリのルートで実行する（scraper/ のロガーが data/log に出力するため）
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scraper"))
+
+from df_clean import clean_results  # noqa: E402
+
+MODELS = [
+    "マイジャグラーV",
+    "SミスタージャグラーKK",
+    "S ミスタージャグラー KK",
+    "ＳアイムジャグラーＥＸ",
+    "ファンキージャグラー2KT",
+    "ハッピージャグラーＶＩＩＩ",
+]
+
+
+def make_frame(rows: int, bad_rate: float, seed: int = 0) -> pd.DataFrame:
+    """scraper.main が返す形（数値は "1,234" 形式の文字列）の合成データ"""
+    rng = np.random.default_rng(seed)
+    halls = [f"ホール{i}" for i in range(200)]
+    df = pd.DataFrame(
+        {
+            "pref": rng.choice(["東京都", "大阪府", "愛知県"], rows),
+            "hall": rng.choice(halls, rows),
+            "model": rng.choice(MODELS, rows),
+            "date": rng.choice(pd.date_range("2024-01-01", periods=90).strftime("%Y-%m-%d"), rows),
+            "台番": rng.integers(1, 2000, rows).astype(str),
+            "G数": [f"{v:,}" for v in rng.integers(0, 12_000, rows)],
+            "BB": rng.integers(0, 60, rows).astype(str),
+            "RB": rng.integers(0, 60, rows).astype(str),
+            "差枚": [f"{v:,}" for v in rng.integers(-5_000, 8_000, rows)],
+        }
+    )
+    if bad_rate:
+        n_bad = int(rows * bad_rate)
+        idx = rng.choice(rows, n_bad, replace=False)
+        df.loc[idx[: n_bad // 2], "差枚"] = "−1,234"  # 全角マイナス（変換できる）
+        df.loc[idx[n_bad // 2 :], "G数"] = "-"  # 変換できない
+    return df
+
+
+def legacy_clean(df: pd.DataFrame) -> pd.DataFrame:
+    """旧実装（呼び出しごとに変換表を作り、game/medal だけ int 変換する）"""
+    alias_map = {
+        "SミスタージャグラーKK": "ミスタージャグラー",
+        "S ミスタージャグラー KK": "ミスタージャグラー",
+        "SアイムジャグラーEX": "アイムジャグラーEX-TP",
+        "ファンキージャグラー2KT": "ファンキージャグラー2",
+    }
+    rename_map = {"台番": "unit_no", "G数": "game", "BB": "bb", "RB": "rb", "差枚": "medal"}
+    df = df.rename(columns=rename_map)
+    df["model"] = df["model"].replace(alias_map)
+    df["game"] = df["game"].str.replace(",", "").astype(int)
+    df["medal"] = df["medal"].str.replace(",", "").astype(int)
+    return df
+
+
+def measure(fn, df: pd.DataFrame) -> tuple[float, pd.DataFrame]:
+    t0 = time.perf_counter()
+    out = fn(df)
+    return time.perf_counter() - t0, out
+
+
+def mb(df: pd.DataFrame) -> float:
+    return df.memory_usage(deep=True).sum() / 1024 / 1024
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--bad-rate", type=float, default=0.01)
+    args = parser.parse_args()
+
+    df = make_frame(args.rows, bad_rate=0)
+    print(f"rows: {len(df):,} / 入力 {mb(df):.0f} MB")
+
+    legacy_sec, legacy = measure(legacy_clean, df)
+    new_sec, (clean, _) = measure(clean_results, df)
+    print(f"旧実装        : {legacy_sec:.2f} 秒 ({len(df) / legacy_sec:,.0f} rows/sec, {mb(legacy):.0f} MB)")
+    print(f"clean_results : {new_sec:.2f} 秒 ({len(df) / new_sec:,.0f} rows/sec, {mb(clean):.0f} MB)")
+
+    # 不正な値を含むデータ（旧実装は例外で止まる）
+    df_bad = make_frame(args.rows, bad_rate=args.bad_rate)
+    bad_sec, (clean, rejects) = measure(clean_results, df_bad)
+    print(
+        f"不正値 {args.bad_rate:.0%}  : {bad_sec:.2f} 秒 / 整形 {len(clean):,} 行 / 除外 {len(rejects):,} 行"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+ページ取得方法の比較: HTTP（生 HTML）vs ブラウザ（Playwright）
+
+    python benchmarks/bench_fetch_modes.py --slug 大山オーシャン --period 1
+
+1 ホール分（ホール → 日付 → 機種ページ）を各モードで取得し pages/sec を表示する
+リポジトリのルートで実行する（scraper/ のロガーが data/log に出力するため）
+"""
+import argparse
+import os
+import sys
+import time
+from urllib.parse import quote, urljoin
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scraper"))
+
+import config  # noqa: E402
+from browser_manager import BrowserManager  # noqa: E402
+from fetcher import FetchStats, create_fetcher  # noqa: E402
+from scraping_hall_page import extract_date_url  # noqa: E402
+from scraping_date_page import extract_model_url  # noqa: E402
+from scraping_model_page import extract_model_data  # noqa: E402
+
+
+def run_mode(hall_url: str, period: int, mode: str) -> tuple[int, float, int]:
+    """returns: (取得ページ数, 秒, 取得行数)"""
+    stats = FetchStats()
+    rows = 0
+    t0 = time.perf_counter()
+    with BrowserManager() as browser:
+        with create_fetcher(browser, mode) as fetcher:
+            for pref, hall, date, date_url in extract_date_url(hall_url, fetcher, period):
+                model_urls = extract_model_url(fetcher, hall, pref, date_url, date)
+                if model_urls:
+                    rows += len(extract_model_data(fetcher, model_urls))
+            stats.add(fetcher)
+    elapsed = time.perf_counter() - t0
+    return sum(stats.pages.values()), elapsed, rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--slug", default="大山オーシャン")
+    parser.add_argument("--base-url", default=config.MAIN_URL)
+    parser.add_argument("--period", type=int, default=1)
+    parser.add_argument("--modes", nargs="+", default=["http", "browser"])
+    args = parser.parse_args()
+
+    hall_url = urljoin(args.base_url, quote(args.slug))
+    print(f"{'mode':8} {'pages':>6} {'sec':>8} {'pages/sec':>10} {'rows':>6}")
+    for mode in args.modes:
+        try:
+            pages, sec, rows = run_mode(hall_url, args.period, mode)
+        except Exception as e:
+            print(f"{mode:8} 失敗: {type(e).__name__}: {e}")
+            continue
+        print(f"{mode:8} {pages:6d} {sec:8.2f} {pages / sec:10.2f} {rows:6d}")
+
+
+if __name__ == "__main__":
+    main()
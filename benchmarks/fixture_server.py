@@ -0,0 +1,97 @@
+"""
+保存済みのホール・日付・機種ページを返すローカル HTTP サーバー（min-repo.com の代わり）
+
+    python benchmarks/fixture_server.py --port 8765 [--latency 0.05] [--fail-rate 0.2]
+
+    /tag/<slug>        -> fixtures/hall_page.html（ホール名を slug に置き換える）
+    /<id>/?kishu=<n>   -> fixtures/model_page.html
+    /<id>/             -> fixtures/date_page.html
+
+fail-rate で 503 を返し、リトライ・サーキットブレーカーの動作確認に使う
+フィクスチャは benchmarks/make_fixtures.py で作る
+"""
+import argparse
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+HALL_NAME = "ベンチマークホール"  # make_fixtures.HALL_NAME と同じ
+
+
+def load_fixtures(fixture_dir: str = FIXTURE_DIR) -> dict[str, str]:
+    pages = {}
+    for name in ("hall_page", "date_page", "model_page"):
+        with open(os.path.join(fixture_dir, f"{name}.html"), encoding="utf-8") as f:
+            pages[name] = f.read()
+    return pages
+
+
+def make_handler(pages: dict[str, str], latency: float, fail_rate: float = 0.0):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            parts = urlsplit(self.path)
+            if parts.path.startswith("/tag/"):
+                slug = unquote(parts.path[len("/tag/") :]).strip("/")
+                html = pages["hall_page"].replace(HALL_NAME, slug or HALL_NAME)
+            elif "kishu" in parts.query:
+                html = pages["model_page"]
+            else:
+                html = pages["date_page"]
+
+            if latency:
+                time.sleep(latency)
+            if fail_rate and random.random() < fail_rate:
+                self.send_response(503)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            body = html.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+
+def serve(port: int = 0, latency: float = 0.0, fail_rate: float = 0.0) -> ThreadingHTTPServer:
+    """
+    バックグラウンドスレッドで起動する（port=0 なら空いているポート）
+    base URL は f"http://127.0.0.1:{server.server_address[1]}"
+    """
+    server = ThreadingHTTPServer(
+        ("127.0.0.1", port), make_handler(load_fixtures(), latency, fail_rate)
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="1 リクエストあたりの遅延（秒）")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="503 を返す割合")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(
+        ("127.0.0.1", args.port), make_handler(load_fixtures(), args.latency, args.fail_rate)
+    )
+    print(f"fixture server: http://127.0.0.1:{args.port}/tag/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+ベンチマーク用のフィクスチャページ（min-repo.com のページ構造を模したもの）を生成する
+
+    python benchmarks/make_fixtures.py
+"""
+import os
+import random
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+HALL_NAME = "ベンチマークホール"
+PREF = "東京都"
+MODELS = [
+    "ハッピージャグラーＶＩＩＩ",
+    "マイジャグラーＶ",
+    "ファンキージャグラー２ＫＴ",
+    "ネオアイムジャグラーＥＸ",
+    "ミスタージャグラー",
+    "スマスロ北斗の拳",
+]
+
+
+def hall_page(n_dates: int = 10) -> str:
+    links = "\n".join(
+        f'<tr><td><a href="/{100000 + i}/">2025/10/{n_dates - i:02d}</a></td>'
+        f"<td>{random.randint(-50000, 50000):,}</td></tr>"
+        for i in range(n_dates)
+    )
+    return f"""<html><head><title>{HALL_NAME}</title></head><body>
+<div id="content">
+<h1>{HALL_NAME}</h1>
+<div><span class="todofuken">{PREF}</span></div>
+<div><table><tbody>
+{links}
+</tbody></table></div>
+</div></body></html>"""
+
+
+def date_page(date_id: int = 100000) -> str:
+    links = "\n".join(
+        f'<tr><td><a href="/{date_id}/?kishu={i}">{m}</a></td><td>{random.randint(3, 40)}</td></tr>'
+        for i, m in enumerate(MODELS)
+    )
+    return f"""<html><head><title>{HALL_NAME} 2025/10/10</title></head><body>
+<h1>{HALL_NAME} 2025/10/10</h1>
+<table class="kishu"><tbody>
+{links}
+</tbody></table>
+</body></html>"""
+
+
+def model_page(model: str = MODELS[0], n_rows: int = 100) -> str:
+    header = "<tr>" + "".join(
+        f"<th>{c}</th>" for c in ["台番", "G数", "差枚", "BB", "RB", "合成"]
+    ) + "</tr>"
+    rows = []
+    for i in range(n_rows):
+        game = random.randint(0, 9000)
+        bb = random.randint(0, 40)
+        rb = random.randint(0, 30)
+        medal = random.randint(-3000, 5000)
+        prob = f"1/{game // max(bb + rb, 1)}"
+        rows.append(
+            f"<tr><td>{1001 + i}</td><td>{game:,}</td><td>{medal:,}</td>"
+            f"<td>{bb}</td><td>{rb}</td><td>{prob}</td></tr>"
+        )
+    rows.append(
+        "<tr><td>平均</td><td>4,000</td><td>100</td><td>15</td><td>12</td><td>1/148</td></tr>"
+    )
+    body = "\n".join(rows)
+    return f"""<html><head><title>{model}</title></head><body>
+<div id="content"><div class="tab_content">
+<h2>{model}　グラフ一覧</h2>
+<div><div class="table_wrap"><table><tbody>
+{header}
+{body}
+</tbody></table></div></div>
+</div></div></body></html>"""
+
+
+def main() -> None:
+    random.seed(0)
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    pages = {
+        "hall_page.html": hall_page(),
+        "date_page.html": date_page(),
+        "model_page.html": model_page(),
+    }
+    for name, html in pages.items():
+        with open(os.path.join(FIXTURE_DIR, name), "w", encoding="utf-8") as f:
+            f.write(html)
+        print(f"✅ {name}")
+
+
+if __name__ == "__main__":
+    main()
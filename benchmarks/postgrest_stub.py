@@ -0,0 +1,202 @@
+"""
+Supabase (PostgREST) のローカル代替サーバー（インメモリ）
+
+    python benchmarks/postgrest_stub.py --port 54321 [--fail-rate 0.2] [--latency 0.05]
+
+    SUPABASE_URL=http://127.0.0.1:54321 SUPABASE_SERVICE_ROLE_KEY=local python scraper/df_to_supabase.py
+
+df_to_supabase が使う範囲だけを実装している
+- GET  /rest/v1/<table>?select=...&<col>=in.(...)|eq.<v>
+- POST /rest/v1/<table>?on_conflict=a,b   （upsert、Prefer: return=representation）
+- POST /rest/v1/rpc/ingest_results        （名前を ID に置き換えて results に upsert）
+- POST /rest/v1/rpc/<function>            （呼び出しを記録するだけ）
+fail-rate で 503 を返し、リトライの動作確認に使う
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+# テーブル名 -> 自動採番する ID 列
+ID_COLUMNS = {
+    "prefectures": "prefecture_id",
+    "halls": "hall_id",
+    "models": "model_id",
+}
+
+
+class Store:
+    """テーブルごとに {一意キー: 行} を保持する"""
+
+    def __init__(self):
+        self.tables: dict[str, dict[tuple, dict]] = {}
+        self.next_id: dict[str, int] = {}
+        self.requests = 0
+        self.rpc_calls: list[tuple[str, dict]] = []
+        self.lock = threading.Lock()
+
+    def upsert(self, table: str, rows: list[dict], on_conflict: list[str]) -> list[dict]:
+        with self.lock:
+            data = self.tables.setdefault(table, {})
+            id_col = ID_COLUMNS.get(table)
+            out = []
+            for row in rows:
+                key_cols = on_conflict or ([id_col] if id_col else sorted(row))
+                key = tuple(row.get(c) for c in key_cols)
+                current = data.get(key)
+                if current is None:
+                    current = dict(row)
+                    if id_col and id_col not in current:
+                        self.next_id[table] = self.next_id.get(table, 0) + 1
+                        current[id_col] = self.next_id[table]
+                    data[key] = current
+                else:
+                    current.update(row)
+                out.append(dict(current))
+            return out
+
+    def ingest(self, rows: list[dict]) -> dict:
+        """ingest_results 関数と同じく、名前の登録・ID の解決・results の upsert を行う"""
+        prefs = [{"name": p} for p in {r["pref"] for r in rows}]
+        pref_ids = {r["name"]: r["prefecture_id"] for r in self.upsert("prefectures", prefs, ["name"])}
+        models = [{"name": m} for m in {r["model"] for r in rows}]
+        models = self.upsert("models", models, ["name"])
+        model_ids = {r["name"]: r["model_id"] for r in models}
+        pairs = {(pref_ids[r["pref"]], r["hall"]) for r in rows}
+        halls = self.upsert(
+            "halls",
+            [{"name": h, "prefecture_id": p} for p, h in pairs],
+            ["name", "prefecture_id"],
+        )
+        hall_ids = {(r["prefecture_id"], r["name"]): r["hall_id"] for r in halls}
+
+        results = [
+            {
+                "hall_id": hall_ids[(pref_ids[r["pref"]], r["hall"])],
+                "model_id": model_ids[r["model"]],
+                **{c: r[c] for c in ("unit_no", "date", "game", "bb", "rb", "medal")},
+            }
+            for r in rows
+        ]
+        upserted = self.upsert("results", results, ["hall_id", "model_id", "unit_no", "date"])
+        keys = sorted({(r["hall_id"], r["date"]) for r in results})
+        return {"rows": len(upserted), "keys": [{"hall_id": h, "date": d} for h, d in keys]}
+
+    def select(self, table: str, filters: dict[str, str], columns: list[str]) -> list[dict]:
+        with self.lock:
+            rows = list(self.tables.get(table, {}).values())
+        for col, expr in filters.items():
+            op, _, value = expr.partition(".")
+            if op == "in":
+                values = set(_split_in(value))
+                rows = [r for r in rows if str(r.get(col)) in values]
+            elif op == "eq":
+                rows = [r for r in rows if str(r.get(col)) == value]
+        if columns and columns != ["*"]:
+            rows = [{c: r.get(c) for c in columns} for r in rows]
+        return rows
+
+
+def _split_in(value: str) -> list[str]:
+    """in.(a,"b,c",d) の括弧内を分割する"""
+    inner = value.strip()[1:-1]
+    return [m.group(1) if m.group(1) is not None else m.group(2)
+            for m in re.finditer(r'"([^"]*)"|([^,]+)', inner)]
+
+
+def make_handler(store: Store, fail_rate: float, latency: float):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status: int, body=None) -> None:
+            payload = json.dumps(body if body is not None else []).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _route(self) -> tuple[str, dict[str, str]]:
+            parts = urlsplit(self.path)
+            table = parts.path.rstrip("/").split("/")[-1]
+            return table, dict(parse_qsl(parts.query, keep_blank_values=True))
+
+        def _maybe_fail(self) -> bool:
+            store.requests += 1
+            if latency:
+                time.sleep(latency)
+            if fail_rate and random.random() < fail_rate:
+                self._send(503, {"message": "injected failure"})
+                return True
+            return False
+
+        def do_GET(self):
+            table, params = self._route()
+            if self._maybe_fail():
+                return
+            columns = [c.strip() for c in params.pop("select", "*").split(",")]
+            self._send(200, store.select(table, params, columns))
+
+        def do_POST(self):
+            table, params = self._route()
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"[]")
+            if self._maybe_fail():
+                return
+            if "/rpc/" in self.path:
+                if table == "ingest_results":
+                    ingested = store.ingest(body["p_rows"])
+                    with store.lock:
+                        store.rpc_calls.append((table, {"rows": ingested["rows"]}))
+                    self._send(200, ingested)
+                    return
+                with store.lock:
+                    store.rpc_calls.append((table, body))
+                self._send(200, None)
+                return
+            rows = body if isinstance(body, list) else [body]
+            on_conflict = [c for c in params.get("on_conflict", "").split(",") if c]
+            result = store.upsert(table, rows, on_conflict)
+            prefer = self.headers.get("Prefer", "")
+            self._send(201, result if "return=representation" in prefer else [])
+
+        do_PATCH = do_POST
+
+    return Handler
+
+
+def serve(port: int = 54321, fail_rate: float = 0.0, latency: float = 0.0):
+    """バックグラウンドスレッドで起動し (server, store) を返す"""
+    store = Store()
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(store, fail_rate, latency))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, store
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=54321)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    store = Store()
+    server = ThreadingHTTPServer(
+        ("127.0.0.1", args.port), make_handler(store, args.fail_rate, args.latency)
+    )
+    print(f"PostgREST stub: http://127.0.0.1:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
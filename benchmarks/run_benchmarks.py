@@ -0,0 +1,425 @@
+"""
+オフラインのベンチマーク一式（ネットワーク・Supabase には接続しない）
+
+    python benchmarks/run_benchmarks.py [--suite scrape clean sqlite supabase store]
+        [--halls 4] [--period 2] [--sizes 10k 100k 1M] [--threshold 0.2]
+
+- scrape  : fixture_server のページを sync / async × http / browser で取得
+            （全体の pages/sec と extract_* 各段階の p50/p95）
+- clean   : clean_results（合成データ）
+- sqlite  : df_to_db.add_data_result（一時ファイルの DB）
+- supabase: df_to_supabase の "rest"（テーブルごとの upsert）と "rpc"（ingest_results）
+            （postgrest_stub。往復回数も記録する）
+- store   : results_store の範囲・集計・上位 k 件のクエリ（合成データ、メモリマップで開く）
+
+結果は benchmarks/results/<日時>.json と history.jsonl（1 行 = 1 計測値）に保存し、
+前回の値より threshold 以上遅くなったものを REGRESSION と表示する
+リポジトリのルートで実行する（scraper/ のロガーが data/log に出力するため）
+"""
+import argparse
+import datetime as dt
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, os.path.join(ROOT, "scraper"))
+sys.path.insert(0, os.path.join(ROOT, "utils"))
+
+import config  # noqa: E402
+from metrics import METRICS  # noqa: E402
+
+import fixture_server  # noqa: E402
+import postgrest_stub  # noqa: E402
+from bench_df_clean import make_frame  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+HISTORY = os.path.join(RESULTS_DIR, "history.jsonl")
+
+# 段階ごとの p50/p95 を記録する系列
+STAGE_SERIES = [
+    "extract_date_url_seconds",
+    "extract_model_url_seconds",
+    "extract_model_page_seconds",
+    "hall_seconds",
+]
+
+
+def parse_size(text: str) -> int:
+    """'10k' / '1M' / '250000' -> 行数"""
+    units = {"k": 1_000, "m": 1_000_000}
+    text = text.strip().lower()
+    if text[-1:] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+def browser_available() -> bool:
+    """Chromium が起動できない環境では browser モードを飛ばす"""
+    from playwright.sync_api import sync_playwright
+
+    try:
+        with sync_playwright() as p:
+            p.chromium.launch(headless=True).close()
+        return True
+    except Exception as e:
+        print(f"browser モードを飛ばします: {str(e).splitlines()[0]}")
+        return False
+
+
+def stage_stats(summary: dict) -> dict:
+    return {
+        name: {"p50": summary["series"][name]["p50"], "p95": summary["series"][name]["p95"]}
+        for name in STAGE_SERIES
+        if name in summary["series"]
+    }
+
+
+def result(name: str, metric: str, value: float, seconds: float, **extra) -> dict:
+    print(f"  {name:<28} {value:>14,.1f} {metric} ({seconds:.2f} 秒)")
+    return {"name": name, "metric": metric, "value": value, "seconds": seconds, **extra}
+
+
+# =========================
+# スクレイピング
+# =========================
+def bench_scrape(args) -> list[dict]:
+    from scraper import scrape_halls_sync
+    from async_scraper import run_async
+
+    server = fixture_server.serve(latency=args.latency)
+    config.MAIN_URL = f"http://127.0.0.1:{server.server_address[1]}/tag/"
+    config.PAGE_CACHE_ENABLED = False  # 毎回フィクスチャサーバーから取得する
+    config.OUTPUT_FORMATS = ()  # 途中の CSV は書き出さない
+
+    hall_list = [
+        config.HallInfo(slug=f"bench-hall-{i}", period=args.period) for i in range(args.halls)
+    ]
+    modes = ["http"] + (["browser"] if browser_available() else [])
+    engines = {
+        "sync": lambda mode: scrape_halls_sync(hall_list, mode),
+        "async": lambda mode: run_async(
+            hall_list, concurrency=args.concurrency, rps=0, fetch_mode=mode
+        ),
+    }
+
+    out = []
+    try:
+        for engine, run in engines.items():
+            for mode in modes:
+                METRICS.reset()
+                t0 = time.perf_counter()
+                frames = run(mode)
+                elapsed = time.perf_counter() - t0
+
+                summary = METRICS.summary()
+                pages = sum(
+                    summary["series"][s]["count"]
+                    for s in STAGE_SERIES[:3]
+                    if s in summary["series"]
+                )
+                out.append(
+                    result(
+                        f"scrape.{engine}.{mode}",
+                        "pages/sec",
+                        pages / elapsed,
+                        elapsed,
+                        pages=pages,
+                        rows=sum(len(df) for df in frames),
+                        stages=stage_stats(summary),
+                    )
+                )
+    finally:
+        server.shutdown()
+    return out
+
+
+# =========================
+# クリーニング・取り込み
+# =========================
+def bench_clean(sizes: list[int]) -> list[dict]:
+    from df_clean import clean_results
+
+    out = []
+    for n in sizes:
+        df = make_frame(n, bad_rate=0.01)
+        t0 = time.perf_counter()
+        clean_results(df)
+        elapsed = time.perf_counter() - t0
+        out.append(result(f"clean.{n}", "rows/sec", n / elapsed, elapsed, rows=n))
+    return out
+
+
+def bench_sqlite(sizes: list[int]) -> list[dict]:
+    import df_to_db
+    from create_databese import create_databese
+    from df_clean import clean_results
+    from sqlite_profile import connect_for_ingest
+
+    out = []
+    for n in sizes:
+        df, _ = clean_results(make_frame(n, bad_rate=0))
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "bench.db")
+            create_databese(db_path)
+            conn = connect_for_ingest(db_path)
+            try:
+                t0 = time.perf_counter()
+                df_to_db.add_data_result(conn, conn.cursor(), df)
+                elapsed = time.perf_counter() - t0
+            finally:
+                conn.close()
+        out.append(result(f"sqlite.{n}", "rows/sec", len(df) / elapsed, elapsed, rows=len(df)))
+    return out
+
+
+def bench_supabase(sizes: list[int], max_rows: int) -> list[dict]:
+    import df_to_supabase
+    from df_clean import clean_results
+    from id_cache import IdCache
+    from supabase import create_client
+
+    out = []
+    for n in sizes:
+        if n > max_rows:
+            print(f"  supabase.{n}: --supabase-max-rows ({max_rows:,}) を超えるため飛ばします")
+            continue
+        df, _ = clean_results(make_frame(n, bad_rate=0))
+        for mode in ("rest", "rpc"):
+            server, store = postgrest_stub.serve(port=0)
+            try:
+                supabase = create_client(f"http://127.0.0.1:{server.server_address[1]}", "local")
+                with tempfile.TemporaryDirectory() as tmp:
+                    cache = IdCache(path=os.path.join(tmp, "id_cache.json"))
+                    t0 = time.perf_counter()
+                    if mode == "rpc":
+                        df_to_supabase.ingest_results(df, supabase)
+                    else:
+                        df_to_supabase.add_model(df, supabase, cache)
+                        df_to_supabase.add_prefecture_and_hall(df, supabase, cache)
+                        df_to_supabase.add_data_result(df, supabase, cache)
+                    elapsed = time.perf_counter() - t0
+            finally:
+                server.shutdown()
+            name = "supabase" if mode == "rest" else "supabase_rpc"
+            out.append(
+                result(
+                    f"{name}.{n}",
+                    "rows/sec",
+                    len(df) / elapsed,
+                    elapsed,
+                    rows=len(df),
+                    requests=store.requests,
+                )
+            )
+    return out
+
+
+def bench_store(sizes: list[int], queries: int = 50) -> list[dict]:
+    import numpy as np
+
+    from results_store import ResultsStore, to_days
+
+    rng = np.random.default_rng(0)
+    out = []
+    for n in sizes:
+        halls, models, days = 200, 500, 365
+        columns = {
+            "hall_id": rng.integers(1, halls + 1, n),
+            "model_id": rng.integers(1, models + 1, n),
+            "unit_no": rng.integers(1, 1000, n),
+            "date": to_days("2026-01-01") + rng.integers(0, days, n),
+            "game": rng.integers(0, 9000, n),
+            "bb": rng.integers(0, 40, n),
+            "rb": rng.integers(0, 40, n),
+            "medal": rng.integers(-3000, 3000, n),
+        }
+        with tempfile.TemporaryDirectory() as tmp:
+            ResultsStore.from_arrays(
+                columns,
+                {1: "東京都"},
+                {h: (f"hall-{h}", 1) for h in range(1, halls + 1)},
+                {m: f"model-{m}" for m in range(1, models + 1)},
+            ).save(tmp)
+            del columns
+            store = ResultsStore.load(tmp)
+
+            # ダッシュボードでよく使うクエリ: ホールの 1 か月 / 機種の 1 か月 / 機種ランキング / 末尾別
+            month = {"date_from": "2026-03-01", "date_to": "2026-03-31"}
+            work = [
+                lambda i: store.frame(hall=1 + i % halls, **month),
+                lambda i: store.group_by("date", model=1 + i % models, **month),
+                lambda i: store.top_k("model", hall=1 + i % halls, k=10, min_units=5),
+                lambda i: store.group_by(["date", "digit"], hall=1 + i % halls),
+            ]
+            t0 = time.perf_counter()
+            for i in range(queries):
+                for q in work:
+                    q(i)
+            elapsed = time.perf_counter() - t0
+            count = queries * len(work)
+            out.append(
+                result(
+                    f"store.{n}", "queries/sec", count / elapsed, elapsed, rows=n, bytes=store.nbytes
+                )
+            )
+            del store
+
+    # ResultsStore.open: Parquet から作って保存する初回と、保存済みを開く 2 回目
+    out += bench_store_open(sizes[0])
+    return out
+
+
+def bench_store_open(n: int) -> list[dict]:
+    import pandas as pd
+
+    from df_clean import clean_results
+    from parquet_store import append_results
+    from results_store import ResultsStore
+
+    # パーティション（日付 x ホール）が多すぎないよう 8 ホール x 20 日にまとめる
+    raw = make_frame(n, bad_rate=0)
+    raw["hall"] = "ホール" + (raw.index % 8).astype(str)
+    raw["date"] = pd.date_range("2024-01-01", periods=20).strftime("%Y-%m-%d")[raw.index % 20]
+    df, _ = clean_results(raw)
+    saved = (config.PARQUET_DIR, config.DB_PATH)
+    out = []
+    with tempfile.TemporaryDirectory() as tmp:
+        config.PARQUET_DIR = os.path.join(tmp, "parquet")
+        config.DB_PATH = os.path.join(tmp, "missing.db")  # source="auto" で Parquet を選ぶ
+        try:
+            append_results(df, config.PARQUET_DIR)
+            root = os.path.join(tmp, "store")
+            for name in ("build", "cached"):
+                t0 = time.perf_counter()
+                store = ResultsStore.open("auto", root=root)
+                elapsed = time.perf_counter() - t0
+                rows = len(store)
+                out.append(
+                    result(f"store_open.{name}.{n}", "rows/sec", rows / elapsed, elapsed, rows=rows)
+                )
+                del store
+        finally:
+            config.PARQUET_DIR, config.DB_PATH = saved
+    return out
+
+
+# =========================
+# 保存・比較
+# =========================
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def load_previous() -> dict[str, dict]:
+    """history.jsonl から計測名ごとの直近の値を返す"""
+    previous: dict[str, dict] = {}
+    if not os.path.exists(HISTORY):
+        return previous
+    with open(HISTORY, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                row = json.loads(line)
+                previous[row["name"]] = row
+    return previous
+
+
+def compare(results: list[dict], previous: dict[str, dict], threshold: float) -> list[str]:
+    """値はすべて「大きいほど速い」ので、前回比で threshold 以上下がったものを返す"""
+    regressions = []
+    for r in results:
+        prev = previous.get(r["name"])
+        if not prev or not prev["value"]:
+            continue
+        change = r["value"] / prev["value"] - 1
+        mark = "REGRESSION" if change <= -threshold else ""
+        print(f"  {r['name']:<28} {change:+7.1%} (前回 {prev['run']}) {mark}")
+        if mark:
+            regressions.append(r["name"])
+    return regressions
+
+
+def save(results: list[dict], args) -> str:
+    now = dt.datetime.now()
+    run = now.strftime("%Y%m%d_%H%M%S")
+    meta = {
+        "run": run,
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+    }
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"{run}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({**meta, "args": vars(args), "results": results}, f, ensure_ascii=False, indent=2)
+    with open(HISTORY, "a", encoding="utf-8") as f:
+        for r in results:
+            row = {**meta, "name": r["name"], "metric": r["metric"], "value": r["value"]}
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+    return path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="オフラインのベンチマーク")
+    parser.add_argument(
+        "--suite",
+        nargs="+",
+        choices=["scrape", "clean", "sqlite", "supabase", "store"],
+        default=["scrape", "clean", "sqlite", "supabase", "store"],
+    )
+    parser.add_argument("--halls", type=int, default=4)
+    parser.add_argument("--period", type=int, default=2, help="ホールごとの日数")
+    parser.add_argument("--concurrency", type=int, default=config.ASYNC_CONCURRENCY)
+    parser.add_argument("--latency", type=float, default=0.0, help="フィクスチャサーバーの遅延（秒）")
+    parser.add_argument(
+        "--sizes", nargs="+", default=["10k", "100k", "1M"], help="合成データの行数（10M も可）"
+    )
+    parser.add_argument("--supabase-max-rows", type=parse_size, default=100_000)
+    parser.add_argument("--threshold", type=float, default=0.2, help="前回比の許容低下率")
+    parser.add_argument("--no-save", action="store_true", help="結果を保存しない")
+    parser.add_argument(
+        "--fail-on-regression", action="store_true", help="REGRESSION があれば終了コード 1"
+    )
+    args = parser.parse_args()
+    sizes = [parse_size(s) for s in args.sizes]
+
+    results: list[dict] = []
+    if "scrape" in args.suite:
+        print("[scrape]")
+        results += bench_scrape(args)
+    if "clean" in args.suite:
+        print("[clean]")
+        results += bench_clean(sizes)
+    if "sqlite" in args.suite:
+        print("[sqlite]")
+        results += bench_sqlite(sizes)
+    if "supabase" in args.suite:
+        print("[supabase]")
+        results += bench_supabase(sizes, args.supabase_max_rows)
+    if "store" in args.suite:
+        print("[store]")
+        results += bench_store(sizes)
+
+    print("[前回比]")
+    regressions = compare(results, load_previous(), args.threshold)
+    if not args.no_save:
+        print(f"保存: {save(results, args)}")
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
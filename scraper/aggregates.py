@@ -0,0 +1,184 @@
+import argparse
+import os
+import sqlite3
+from typing import Iterable
+
+import config
+from logger_steup import setup_logger
+from metrics import METRICS
+
+# =========================
+# 設定・ロガー
+# =========================
+filename, ext = os.path.splitext(os.path.basename(__file__))
+logger = setup_logger(filename, log_file=config.LOG_PATH)
+
+
+# =========================
+# スキーマ
+# =========================
+# ダッシュボード用に results を事前集計したテーブル
+# 取り込みのたびに、取り込んだ (hall_id, date) の分だけ集計し直す（df_to_db / df_to_supabase から呼ぶ）
+# 全件作り直す場合: python scraper/aggregates.py [--supabase]
+#
+# 集計テーブル -> 集計キー（utils/create_databese.py と同じ定義）
+# どのテーブルも units（台数）と game / medal / bb / rb の合計、win_units（差枚 > 0 の台数）を持つ
+# 平均や BB・RB 確率は 合計 / units、game / bb のように読み取り側で計算する
+AGG_TABLES = {
+    "agg_hall_date": ["hall_id", "date"],
+    "agg_model_date": ["model_id", "date"],
+    "agg_hall_model_date": ["hall_id", "date", "model_id"],
+    "agg_hall_digit_date": ["hall_id", "date", "digit"],  # digit: 台番の末尾
+}
+
+_KEY_TYPES = {"hall_id": "INTEGER", "model_id": "INTEGER", "date": "DATE", "digit": "INTEGER"}
+_KEY_EXPRS = {"hall_id": "r.hall_id", "model_id": "r.model_id", "date": "r.date", "digit": "r.unit_no % 10"}
+_VALUE_COLUMNS = ["units", "game", "medal", "bb", "rb", "win_units"]
+_VALUE_EXPRS = "COUNT(*), SUM(r.game), SUM(r.medal), SUM(r.BB), SUM(r.RB), SUM(r.medal > 0)"
+
+
+def _create_sql(table: str) -> str:
+    keys = AGG_TABLES[table]
+    cols = [f"{k} {_KEY_TYPES[k]} NOT NULL" for k in keys]
+    cols += ["units INTEGER NOT NULL"] + [f"{c} INTEGER" for c in _VALUE_COLUMNS[1:]]
+    return (
+        f"CREATE TABLE IF NOT EXISTS {table} ({', '.join(cols)},"
+        f" PRIMARY KEY ({', '.join(keys)})) WITHOUT ROWID"
+    )
+
+
+def ensure_schema(conn: sqlite3.Connection) -> None:
+    """既存の DB に集計テーブルが無ければ作り、results から全件集計する"""
+    existing = {
+        name
+        for (name,) in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'agg_%'"
+        )
+    }
+    missing = [t for t in AGG_TABLES if t not in existing]
+    for table in missing:
+        conn.execute(_create_sql(table))
+    if missing:
+        logger.info("集計テーブルを作成しました: %s", missing)
+        rebuild_aggregates(conn, missing)
+
+
+# =========================
+# 集計（SQLite）
+# =========================
+def _insert_sql(table: str, key_table: str | None) -> str:
+    keys = AGG_TABLES[table]
+    select = ", ".join(_KEY_EXPRS[k] for k in keys)
+    sql = f"INSERT INTO {table} ({', '.join(keys + _VALUE_COLUMNS)}) SELECT {select}, {_VALUE_EXPRS} "
+    if key_table == "agg_keys":
+        sql += "FROM temp.agg_keys k JOIN results r ON r.hall_id = k.hall_id AND r.date = k.date "
+    elif key_table == "agg_model_keys":
+        sql += "FROM temp.agg_model_keys k JOIN results r ON r.model_id = k.model_id AND r.date = k.date "
+    else:
+        sql += "FROM results r "
+    return sql + f"GROUP BY {', '.join(str(i + 1) for i in range(len(keys)))}"
+
+
+def rebuild_aggregates(conn: sqlite3.Connection, tables: Iterable[str] = AGG_TABLES) -> None:
+    """集計テーブルを results から全件作り直す"""
+    with METRICS.timer("rebuild_aggregates"):
+        for table in tables:
+            conn.execute(f"DELETE FROM {table}")
+            conn.execute(_insert_sql(table, None))
+
+
+def refresh_aggregates(conn: sqlite3.Connection, keys: Iterable[tuple[int, str]]) -> int:
+    """
+    取り込んだ (hall_id, date) の分だけ集計し直す（呼び出し側のトランザクション内で実行する）
+    機種 × 日付は、その (hall_id, date) に含まれる機種の日付分を集計し直す
+    returns: 集計し直した (hall_id, date) の数
+    """
+    keys = list(dict.fromkeys((int(h), str(d)) for h, d in keys))
+    if not keys:
+        return 0
+    ensure_schema(conn)
+
+    with METRICS.timer("refresh_aggregates"):
+        conn.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS agg_keys"
+            " (hall_id INTEGER, date DATE, PRIMARY KEY (hall_id, date))"
+        )
+        conn.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS agg_model_keys"
+            " (model_id INTEGER, date DATE, PRIMARY KEY (model_id, date))"
+        )
+        conn.execute("DELETE FROM temp.agg_keys")
+        conn.execute("DELETE FROM temp.agg_model_keys")
+        conn.executemany("INSERT INTO temp.agg_keys VALUES (?, ?)", keys)
+        conn.execute(
+            "INSERT INTO temp.agg_model_keys SELECT DISTINCT r.model_id, r.date"
+            " FROM temp.agg_keys k JOIN results r ON r.hall_id = k.hall_id AND r.date = k.date"
+        )
+
+        for table in AGG_TABLES:
+            key_table = "agg_model_keys" if table == "agg_model_date" else "agg_keys"
+            key_cols = "model_id, date" if key_table == "agg_model_keys" else "hall_id, date"
+            conn.execute(
+                f"DELETE FROM {table} WHERE ({key_cols}) IN"
+                f" (SELECT {key_cols} FROM temp.{key_table})"
+            )
+            conn.execute(_insert_sql(table, key_table))
+
+    METRICS.incr("aggregate_partitions", len(keys))
+    logger.info("集計テーブルを更新: %d (ホール, 日付)", len(keys))
+    return len(keys)
+
+
+# =========================
+# 集計（Supabase）
+# =========================
+def refresh_aggregates_supabase(
+    supabase, keys: Iterable[tuple[int, str]] | None, chunk: int = config.SUPABASE_AGG_CHUNK
+) -> None:
+    """
+    RPC refresh_daily_aggregates で (hall_id, date) の分だけ集計し直す（keys=None なら全件）
+    失敗しても取り込み自体は止めない（python scraper/aggregates.py --supabase で作り直せる）
+    """
+    if keys is None:
+        payloads: list[list[dict] | None] = [None]
+        label = "全件"
+    else:
+        unique = [
+            {"hall_id": h, "date": d}
+            for h, d in dict.fromkeys((int(h), str(d)) for h, d in keys)
+        ]
+        payloads = [unique[i : i + chunk] for i in range(0, len(unique), chunk)]
+        label = f"{len(unique)} (ホール, 日付)"
+
+    with METRICS.timer("refresh_aggregates_supabase"):
+        for p_keys in payloads:
+            try:
+                supabase.rpc("refresh_daily_aggregates", {"p_keys": p_keys}).execute()
+            except Exception as e:
+                logger.error("Supabase の集計テーブルを更新できません: %s", e)
+                return
+    if payloads:
+        logger.info("Supabase の集計テーブルを更新: %s", label)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="集計テーブルを作り直す")
+    parser.add_argument("--supabase", action="store_true", help="Supabase の集計テーブルを作り直す")
+    args = parser.parse_args()
+
+    if args.supabase:
+        from df_to_supabase import get_supabase_client
+
+        refresh_aggregates_supabase(get_supabase_client(), None)
+        return
+
+    conn = sqlite3.connect(config.DB_PATH)
+    with conn:
+        ensure_schema(conn)
+        rebuild_aggregates(conn)
+    conn.close()
+    logger.info("集計テーブルを作り直しました: %s", config.DB_PATH)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,470 @@
+from playwright.async_api import async_playwright, Browser, BrowserContext, Page
+from playwright.async_api import Playwright, TimeoutError as PWTimeout
+import asyncio
+import pandas as pd
+from urllib.parse import quote, urljoin, urlsplit
+import os
+import time
+from typing import AsyncIterator
+
+import config
+from logger_steup import setup_logger
+from utils import parse_date_text
+from page_parser import HALL_LINK_CSS, MODEL_LINK_CSS, MODEL_ROW_CSS
+from page_parser import parse_hall_page, parse_date_page, parse_model_page
+from page_parser import PAGE_BODY_CSS, has_selector, pick_model_name
+from model_catalog import CATALOG
+from request_filter import RequestFilter
+from crawl_state import CrawlState
+from checkpoint import RunCheckpoint
+from metrics import METRICS
+from fetcher import FetchStats, HttpFetcher, create_http_session
+from page_cache import AsyncCachingFetcher, open_page_cache
+from retry import AsyncRetryingFetcher, FetchError
+from wait_policy import WAIT_POLICY
+
+# =========================
+# 設定・ロガー
+# =========================
+filename, ext = os.path.splitext(os.path.basename(__file__))
+logger = setup_logger(filename, log_file=config.LOG_PATH)
+
+
+# =========================
+# レート制御
+# =========================
+class HostRateLimiter:
+    """ホストごとに 1 秒あたりのリクエスト数を制限する"""
+
+    def __init__(self, rps: float):
+        self.interval = 1.0 / rps if rps > 0 else 0.0
+        self._next_slot: dict[str, float] = {}
+        self._lock = asyncio.Lock()
+
+    async def wait(self, url: str) -> None:
+        if not self.interval:
+            return
+        host = urlsplit(url).netloc
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            now = loop.time()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+# =========================
+# フェッチャー（async 版）
+# =========================
+class AsyncBrowser:
+    """Chromium を最初に必要になった時点で 1 回だけ起動する"""
+
+    def __init__(self, playwright: Playwright):
+        self._pw = playwright
+        self._browser: Browser | None = None
+        self._lock = asyncio.Lock()
+        self.request_filter = RequestFilter()
+
+    async def new_context(self) -> BrowserContext:
+        async with self._lock:
+            if self._browser is None or not self._browser.is_connected():
+                self._browser = await self._pw.chromium.launch(headless=True)
+        context = await self._browser.new_context()
+        await self.request_filter.attach_async(context)
+        return context
+
+    async def close(self) -> None:
+        if self._browser is not None:
+            await self._browser.close()
+        self.request_filter.log_summary()
+
+
+class AsyncBrowserFetcher:
+    """fetcher.BrowserFetcher の async 版（ホールごとに独立した BrowserContext）"""
+
+    name = "browser"
+
+    def __init__(self, browser: AsyncBrowser, limiter: HostRateLimiter):
+        self.browser = browser
+        self.limiter = limiter
+        self._context: BrowserContext | None = None
+        self._page: Page | None = None
+        self.pages = 0
+        self.elapsed = 0.0
+
+    async def _navigate(self, url: str, reload: bool = False) -> None:
+        await self.limiter.wait(url)
+        timeout = WAIT_POLICY.timeout_ms("navigate")
+        t0 = time.perf_counter()
+        try:
+            with METRICS.timer("navigate", url):
+                if reload:
+                    await self._page.reload(timeout=timeout, wait_until="domcontentloaded")
+                else:
+                    await self._page.goto(url, timeout=timeout, wait_until="domcontentloaded")
+        except PWTimeout:
+            WAIT_POLICY.observe("navigate", timeout / 1000)
+            raise
+        WAIT_POLICY.observe("navigate", time.perf_counter() - t0)
+
+    async def _wait(self, url: str, selector: str, timeout: int | None) -> bool:
+        """必須要素（データ）が現れるまで待つ（fetcher.BrowserFetcher._wait と同じ）"""
+        timeout = timeout or WAIT_POLICY.timeout_ms(selector)
+        t0 = time.perf_counter()
+        try:
+            with METRICS.timer("wait_selector", url):
+                await self._page.wait_for_selector(selector, timeout=timeout, state="attached")
+        except PWTimeout:
+            WAIT_POLICY.observe(selector, timeout / 1000)
+            METRICS.incr("selector_timeouts")
+            return False
+        WAIT_POLICY.observe(selector, time.perf_counter() - t0)
+        return True
+
+    async def fetch(
+        self, url: str, selector: str, timeout: int | None = None, reload: bool = False
+    ) -> str | None:
+        if self._page is None:
+            self._context = await self.browser.new_context()
+            self._page = await self._context.new_page()
+        t0 = time.perf_counter()
+        try:
+            await self._navigate(url)
+            found = await self._wait(url, selector, timeout)
+            if not found and reload:
+                # JS でテーブルを描画中のこともあるため、データなしと決める前に 1 回再読み込みする
+                METRICS.incr("reloads")
+                await self._navigate(url, reload=True)
+                found = await self._wait(url, selector, timeout)
+            if found:
+                return await self._page.content()
+            body = PAGE_BODY_CSS.get(selector)
+            if body and await self._page.query_selector(body) is not None:
+                logger.info("データのないページです: %s", url)
+                METRICS.incr("empty_pages")
+            return None
+        finally:
+            self.pages += 1
+            self.elapsed += time.perf_counter() - t0
+
+    async def close(self) -> None:
+        if self._context is not None:
+            await self._context.close()
+        self._context = self._page = None
+
+
+class AsyncHttpFetcher:
+    """
+    fetcher.HttpFetcher の async 版（requests はスレッドで実行する）
+    ページキャッシュは AsyncCachingFetcher でブラウザのフォールバックごと外側から包む
+    """
+
+    def __init__(
+        self,
+        http: HttpFetcher,
+        limiter: HostRateLimiter,
+        fallback: AsyncBrowserFetcher | None = None,
+    ):
+        self.http = http
+        self.limiter = limiter
+        self.fallback = fallback
+
+    @property
+    def name(self) -> str:
+        return self.http.name
+
+    @property
+    def pages(self) -> int:
+        return self.http.pages
+
+    @property
+    def elapsed(self) -> float:
+        return self.http.elapsed
+
+    async def fetch(
+        self, url: str, selector: str, timeout: int | None = None, reload: bool = False
+    ) -> str | None:
+        await self.limiter.wait(url)
+        html = await asyncio.to_thread(self.http.get, url)
+        if html is None:
+            # ページが無い（404/410）。sync の HttpFetcher と同じくブラウザで取り直さない
+            return None
+        if has_selector(html, selector):
+            return html
+        if self.fallback is None:
+            return None
+        logger.info("生 HTML に %s が無いためブラウザで取得します: %s", selector, url)
+        self.http.fallbacks += 1
+        METRICS.incr("browser_fallbacks")
+        return await self.fallback.fetch(url, selector, timeout=timeout, reload=reload)
+
+    async def close(self) -> None:
+        if self.fallback is not None:
+            await self.fallback.close()
+
+
+AsyncFetcher = (
+    AsyncBrowserFetcher | AsyncHttpFetcher | AsyncRetryingFetcher | AsyncCachingFetcher
+)
+
+
+# =========================
+# ページ操作（async 版）
+# =========================
+@METRICS.timed("extract_date_url", label_arg="hall_url")
+async def extract_date_url_async(
+    hall_url: str,
+    fetcher: AsyncFetcher,
+    period: int,
+    crawl_state: CrawlState | None = None,
+) -> list[tuple[str, str, str, str]]:
+    """scraping_hall_page.extract_date_url の async 版"""
+
+    logger.info("ホールのメインページにアクセス: %s", hall_url)
+    html = await fetcher.fetch(hall_url, HALL_LINK_CSS, reload=True)
+    if html is None:
+        logger.warning("日付リンクが見つかりません: %s", hall_url)
+        return []
+    h_name, pref, links = parse_hall_page(html)
+    logger.info("Hall: %s / Pref: %s", h_name, pref)
+
+    date_urls: list[tuple[str, str, str, str]] = []
+    for date_text, href in links[:period]:
+        date_iso = parse_date_text(date_text)
+        if date_iso is None:
+            logger.warning("日付文字列を解釈できません: %s", date_text)
+            continue
+        date_urls.append((pref, h_name, date_iso, urljoin(hall_url, href)))
+
+    if crawl_state is not None:
+        date_urls = crawl_state.filter_dates(date_urls)
+
+    logger.info("取得した日付URL: %d 件 (%s)", len(date_urls), h_name)
+    return date_urls
+
+
+@METRICS.timed("extract_model_url", label_arg="date_url")
+async def extract_model_url_async(
+    fetcher: AsyncFetcher,
+    hall_name: str,
+    pref: str,
+    date_url: str,
+    date: str,
+    crawl_state: CrawlState | None = None,
+) -> list[tuple[str, str, str, str, str]]:
+    """scraping_date_page.extract_model_url の async 版"""
+
+    logger.info("日付ページにアクセス: %s", date_url)
+    model_urls: list[tuple[str, str, str, str, str]] = []
+    html = await fetcher.fetch(date_url, MODEL_LINK_CSS, reload=True)
+    if html is None:
+        logger.warning("機種リンクが見つかりません: %s", date_url)
+        return model_urls
+
+    _, links = parse_date_page(html)
+    for _, href in CATALOG.filter_links(links):
+        model_urls.append((pref, hall_name, date, date_url, href))
+
+    if crawl_state is not None:
+        model_urls = crawl_state.filter_models(model_urls)
+
+    logger.info("機種リンク抽出: %d 件", len(model_urls))
+    return model_urls
+
+
+async def iter_model_data_async(
+    fetcher: AsyncFetcher, model_urls: list[tuple[str, str, str, str, str]]
+) -> AsyncIterator[tuple[tuple[str, str, str, str, str], pd.DataFrame | None]]:
+    """
+    scraping_model_page.iter_model_data の async 版
+    データなしのページは空の DataFrame、取得に失敗したページは None を返す
+    """
+
+    for model_key in model_urls:
+        pref, hall, date, date_url, model_url = model_key
+        url = urljoin(date_url, model_url)
+        logger.info("機種ページにアクセス: %s", url)
+        t0 = time.perf_counter()
+        try:
+            html = await fetcher.fetch(url, MODEL_ROW_CSS, reload=True)
+        except FetchError as e:
+            logger.error("機種ページを取得できません: %s", e)
+            METRICS.incr("model_pages_failed")
+            yield model_key, None
+            continue
+        if html is None:
+            logger.debug("テーブルが見つかりません。")
+            METRICS.observe("extract_model_page_seconds", time.perf_counter() - t0, url)
+            METRICS.incr("model_pages_without_table")
+            yield model_key, pd.DataFrame()
+            continue
+
+        titles, header, table = parse_model_page(html)
+        model = pick_model_name(titles)
+        if model:
+            logger.info("機種名: %s", model)
+        else:
+            logger.warning("機種タイトルが取得できませんでした: %s", url)
+        logger.info("%d 行の機種データを取得", len(table))
+
+        df = pd.DataFrame(table, columns=header)
+        df = df[~df["台番"].astype(str).str.contains("平均")]
+        df["pref"] = pref
+        df["hall"] = hall
+        df["model"] = model
+        df["date"] = date
+        METRICS.observe("extract_model_page_seconds", time.perf_counter() - t0, url)
+        METRICS.observe("model_page_rows", len(df), url)
+        yield model_key, df
+
+
+async def extract_model_data_async(
+    fetcher: AsyncFetcher, model_urls: list[tuple[str, str, str, str, str]]
+) -> pd.DataFrame:
+    """scraping_model_page.extract_model_data の async 版"""
+
+    frames: list[pd.DataFrame] = []
+    async for _, df in iter_model_data_async(fetcher, model_urls):
+        if df is not None and not df.empty:
+            frames.append(df)
+
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+# =========================
+# ワーカープール
+# =========================
+async def extract_result_data_async(
+    hall_url: str,
+    period: int,
+    fetcher: AsyncFetcher,
+    crawl_state: CrawlState | None = None,
+    checkpoint: RunCheckpoint | None = None,
+) -> pd.DataFrame:
+    """1 ホール分の処理（scraper.extract_result_data と同じ流れ）"""
+
+    df_frames: list[pd.DataFrame] = []
+    date_urls = await extract_date_url_async(hall_url, fetcher, period, crawl_state)
+    for pref, hall, date, date_url in date_urls:
+        try:
+            model_urls = await extract_model_url_async(fetcher, hall, pref, date_url, date)
+        except FetchError as e:
+            logger.error("日付ページを取得できません: %s", e)
+            METRICS.incr("date_pages_failed")
+            continue
+        if not model_urls:
+            # 対象機種が無い日付も、出力を書き終えてから rows=0 で記録する（一定時間後に取り直す）
+            if checkpoint is not None:
+                checkpoint.save([], [], pd.DataFrame(), completed=(hall, date))
+            continue
+        if crawl_state is not None:
+            model_urls = crawl_state.filter_models(model_urls)
+        if checkpoint is not None:
+            model_urls = checkpoint.filter_models(model_urls)
+        if not model_urls:
+            continue
+
+        done, failed, frames, rows = [], [], [], {}
+        async for key, df in iter_model_data_async(fetcher, model_urls):
+            if df is None:
+                failed.append(key)
+                continue
+            done.append(key)
+            rows[key[4]] = len(df)
+            if not df.empty:
+                frames.append(df)
+        df_model = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+        if not df_model.empty:
+            df_frames.append(df_model)
+        if "csv" in config.OUTPUT_FORMATS:
+            df_model.to_csv(f"data/csv/{pref}_{hall}_{date}.csv", index=False)
+        if checkpoint is not None:
+            # crawl_state には出力を書き終えてから checkpoint の内容を記録する
+            completed = None if failed else (hall, date)
+            checkpoint.save(done, failed, df_model, completed=completed, rows=rows)
+
+    return pd.concat(df_frames, ignore_index=True) if df_frames else pd.DataFrame()
+
+
+async def scrape_halls_async(
+    hall_list: list[config.HallInfo],
+    concurrency: int = config.ASYNC_CONCURRENCY,
+    rps: float = config.HOST_RPS,
+    fetch_mode: str = config.FETCH_MODE,
+    crawl_state: CrawlState | None = None,
+    checkpoint: RunCheckpoint | None = None,
+) -> list[pd.DataFrame]:
+    """
+    最大 concurrency ホールを同時に処理する
+    - ホスト単位で rps を超えないようにナビゲーションを間引く
+    - 1 ホールの失敗は他のホールに影響しない
+    """
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    limiter = HostRateLimiter(rps)
+    stats = FetchStats()
+    logger.info(
+        "async エンジン: concurrency=%d, rps=%.2f, fetch=%s", concurrency, rps, fetch_mode
+    )
+
+    with open_page_cache(fetch_mode) as page_cache:
+        async with async_playwright() as p:
+            browser = AsyncBrowser(p)
+            session = create_http_session() if fetch_mode == "http" else None
+
+            async def worker(i: int, h: config.HallInfo) -> pd.DataFrame:
+                hall_url = urljoin(config.MAIN_URL, quote(h.slug))
+                async with semaphore:
+                    logger.info("(%d/%d) 処理中: %s", i, len(hall_list), hall_url)
+                    # fetcher.create_fetcher と同じ順: キャッシュ → リトライ → HTTP → ブラウザ
+                    fetcher: AsyncFetcher = AsyncBrowserFetcher(browser, limiter)
+                    if fetch_mode == "replay":
+                        # キャッシュのみ（ネットワークに接続しないためレート制御も不要）
+                        fetcher = AsyncCachingFetcher(None, page_cache, replay=True)
+                    else:
+                        if session is not None:
+                            fetcher = AsyncHttpFetcher(
+                                HttpFetcher(session=session), limiter, fallback=fetcher
+                            )
+                        fetcher = AsyncRetryingFetcher(fetcher)
+                        if page_cache is not None:
+                            fetcher = AsyncCachingFetcher(fetcher, page_cache)
+                    try:
+                        with METRICS.timer("hall", hall_url):
+                            return await extract_result_data_async(
+                                hall_url, h.period, fetcher, crawl_state, checkpoint
+                            )
+                    except Exception as e:
+                        logger.exception("ホール処理でエラー: %s", e)
+                        return pd.DataFrame()
+                    finally:
+                        await fetcher.close()
+                        stats.add(fetcher)
+
+            try:
+                results = await asyncio.gather(
+                    *(worker(i, h) for i, h in enumerate(hall_list, start=1))
+                )
+            finally:
+                await browser.close()
+                if session is not None:
+                    session.close()
+
+    stats.log_summary()
+    return [df for df in results if not df.empty]
+
+
+def run_async(
+    hall_list: list[config.HallInfo],
+    concurrency: int = config.ASYNC_CONCURRENCY,
+    rps: float = config.HOST_RPS,
+    fetch_mode: str = config.FETCH_MODE,
+    crawl_state: CrawlState | None = None,
+    checkpoint: RunCheckpoint | None = None,
+) -> list[pd.DataFrame]:
+    """同期コードから async エンジンを呼び出す"""
+    return asyncio.run(
+        scrape_halls_async(hall_list, concurrency, rps, fetch_mode, crawl_state, checkpoint)
+    )
@@ -0,0 +1,160 @@
+from contextlib import contextmanager
+from playwright.sync_api import Browser, BrowserContext, Frame, Page, Playwright
+from playwright.sync_api import sync_playwright, Error as PWError
+import os
+import time
+
+import config
+from logger_steup import setup_logger
+from request_filter import RequestFilter
+
+# =========================
+# 設定・ロガー
+# =========================
+filename, ext = os.path.splitext(os.path.basename(__file__))
+logger = setup_logger(filename, log_file=config.LOG_PATH)
+
+
+# =========================
+# ブラウザ管理
+# =========================
+class BrowserManager:
+    """
+    Chromium を 1 回だけ起動し、ホールごとに新しい Page を払い出す
+    - BrowserContext は recycle_after 回のナビゲーションごとに作り直す（メモリ対策）
+    - ブラウザがクラッシュ（切断）したときだけ再起動する
+    - ホールの途中でも作り直せるよう、利用側はナビゲーションの前に is_stale() を確認する
+    """
+
+    def __init__(
+        self,
+        headless: bool = True,
+        recycle_after: int = config.CONTEXT_RECYCLE_NAVIGATIONS,
+    ):
+        self.headless = headless
+        self.recycle_after = recycle_after
+
+        self._pw: Playwright | None = None
+        self._browser: Browser | None = None
+        self._context: BrowserContext | None = None
+        self._context_navigations = 0
+        self.request_filter = RequestFilter()
+
+        # 計測値
+        self.startup_sec = 0.0
+        self.navigation_sec = 0.0
+        self.navigations = 0
+        self.launch_count = 0
+        self.context_count = 0
+
+    def __enter__(self) -> "BrowserManager":
+        # Playwright / Chromium は最初に page() が呼ばれるまで起動しない
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    # ---------- 内部処理 ----------
+    def _ensure_browser(self) -> Browser:
+        if self._browser is not None and self._browser.is_connected():
+            return self._browser
+
+        if self._browser is not None:
+            logger.warning("ブラウザが切断されたため再起動します")
+        self._context = None
+
+        t0 = time.perf_counter()
+        if self._pw is None:
+            self._pw = sync_playwright().start()
+        self._browser = self._pw.chromium.launch(headless=self.headless)
+        self.startup_sec += time.perf_counter() - t0
+        self.launch_count += 1
+        return self._browser
+
+    def _close_context(self) -> None:
+        if self._context is None:
+            return
+        try:
+            self._context.close()
+        except PWError:
+            pass
+        self._context = None
+
+    def _ensure_context(self) -> BrowserContext:
+        browser = self._ensure_browser()
+
+        if self._context is not None and self._context_navigations >= self.recycle_after:
+            logger.info(
+                "BrowserContext をリサイクルします (%d navigations)",
+                self._context_navigations,
+            )
+            self._close_context()
+
+        if self._context is None:
+            t0 = time.perf_counter()
+            self._context = browser.new_context()
+            self.request_filter.attach(self._context)
+            self.startup_sec += time.perf_counter() - t0
+            self._context_navigations = 0
+            self.context_count += 1
+        return self._context
+
+    def _on_navigated(self, page: Page, frame: Frame) -> None:
+        if frame == page.main_frame:
+            self._context_navigations += 1
+            self.navigations += 1
+
+    # ---------- 公開 API ----------
+    def is_stale(self) -> bool:
+        """払い出した Page を作り直すべきか（ブラウザ切断・リサイクル回数到達）"""
+        if self._browser is None:
+            return False
+        if not self._browser.is_connected():
+            return True
+        return self._context is not None and self._context_navigations >= self.recycle_after
+
+    @contextmanager
+    def page(self):
+        """ホール 1 件分の Page を払い出す（終了時に close）"""
+        context = self._ensure_context()
+        page = context.new_page()
+        page.on("framenavigated", lambda frame: self._on_navigated(page, frame))
+
+        t0 = time.perf_counter()
+        try:
+            yield page
+        finally:
+            self.navigation_sec += time.perf_counter() - t0
+            try:
+                page.close()
+            except PWError:
+                pass
+
+    def close(self) -> None:
+        self._close_context()
+        if self._browser is not None:
+            try:
+                self._browser.close()
+            except PWError:
+                pass
+            self._browser = None
+        if self._pw is not None:
+            self._pw.stop()
+            self._pw = None
+
+    def log_summary(self) -> None:
+        if not self.launch_count:
+            logger.info("ブラウザは起動されませんでした")
+            return
+        logger.info(
+            "ブラウザ起動時間: %.2f 秒 (launch %d 回 / context %d 個)",
+            self.startup_sec,
+            self.launch_count,
+            self.context_count,
+        )
+        logger.info(
+            "ナビゲーション時間: %.2f 秒 (%d navigations)",
+            self.navigation_sec,
+            self.navigations,
+        )
+        self.request_filter.log_summary()
@@ -0,0 +1,179 @@
+import json
+import os
+import shutil
+import threading
+import uuid
+
+import pandas as pd
+
+import config
+from logger_steup import setup_logger
+
+# =========================
+# 設定・ロガー
+# =========================
+filename, ext = os.path.splitext(os.path.basename(__file__))
+logger = setup_logger(filename, log_file=config.LOG_PATH)
+
+
+# =========================
+# チェックポイント
+# =========================
+class RunCheckpoint:
+    """
+    実行途中の取得結果を保存し、中断した実行を途中から再開できるようにする
+    - units.jsonl: 取得を終えた (hall, date, model_url)（1 行 = 1 機種ページ、追記のみ）
+    - frames/*.parquet: 日付ごとの取得データ（units.jsonl の part 列から参照）
+    取得に失敗した機種ページは status="failed" で残し、再開時に取り直す
+    全機種ページを取得し終えた日付は status="date_done" の行で残す
+    出力を書き終えたら CrawlState.mark_checkpoint で crawl_state に移し、clear() で削除する
+    （--stream は取り込み済みを crawl_state で直接管理するため使わない）
+    """
+
+    def __init__(self, root: str = config.CHECKPOINT_DIR, resume: bool = True):
+        self.root = root
+        self.units_path = os.path.join(root, "units.jsonl")
+        self.frames_dir = os.path.join(root, "frames")
+        if not resume:
+            self.clear()
+        os.makedirs(self.frames_dir, exist_ok=True)
+
+        self._done: dict[tuple[str, str, str], str | None] = {}  # unit -> part
+        self._rows: dict[tuple[str, str, str], int | None] = {}  # unit -> ページの行数
+        self._failed: set[tuple[str, str, str]] = set()
+        self._dates: set[tuple[str, str]] = set()  # 全機種ページを取得し終えた日付
+        self._lock = threading.Lock()
+        self._load()
+        self.resumed_units = len(self._done)
+        self.skipped = 0
+
+    def _load(self) -> None:
+        if not os.path.exists(self.units_path):
+            return
+        with open(self.units_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    # 書き込み途中で止まった最後の行
+                    break
+                unit = (row["hall"], row["date"], row["model_url"])
+                if row["status"] == "date_done":
+                    self._dates.add((row["hall"], row["date"]))
+                elif row["status"] == "done":
+                    self._done[unit] = row.get("part")
+                    self._rows[unit] = row.get("rows")
+                    self._failed.discard(unit)
+                else:
+                    self._failed.add(unit)
+
+    # ---------- 判定 ----------
+    def is_model_done(self, hall: str, date: str, model_url: str) -> bool:
+        return (hall, date, model_url) in self._done
+
+    def filter_models(self, model_urls: list[tuple]) -> list[tuple]:
+        """extract_model_url の結果から、この実行（または中断した実行）で取得済みのものを除く"""
+        todo = [m for m in model_urls if not self.is_model_done(m[1], m[2], m[4])]
+        self.skipped += len(model_urls) - len(todo)
+        if model_urls and not todo:
+            # 中断した実行で、日付の完了を記録する前に止まった場合
+            self.save([], [], pd.DataFrame(), completed=model_urls[0][1:3])
+        return todo
+
+    # ---------- 記録 ----------
+    def save(
+        self,
+        done: list[tuple],
+        failed: list[tuple],
+        df: pd.DataFrame,
+        completed: tuple[str, str] | None = None,
+        rows: dict[str, int] | None = None,
+    ) -> None:
+        """
+        1 日付分の結果を保存する（done / failed は model_urls の要素）
+        completed=(hall, date) を渡すと、その日付を取得完了として記録する
+        rows: model_url -> そのページの行数（0 はデータなし。crawl_state で取り直しの判定に使う）
+        データを書き終えてから units.jsonl に追記するため、途中で止まっても不整合にならない
+        """
+        part = None
+        if not df.empty:
+            part = f"part-{uuid.uuid4().hex}.parquet"
+            path = os.path.join(self.frames_dir, part)
+            df.to_parquet(path + ".tmp", index=False)
+            os.replace(path + ".tmp", path)
+
+        rows = rows or {}
+        lines = [
+            {
+                "hall": hall,
+                "date": date,
+                "model_url": model_url,
+                "status": status,
+                "part": part,
+                "rows": rows.get(model_url),
+            }
+            for status, units in (("done", done), ("failed", failed))
+            for _, hall, date, _, model_url in units
+        ]
+        if completed is not None:
+            hall, date = completed
+            lines.append(
+                {"hall": hall, "date": date, "model_url": "", "status": "date_done", "part": None}
+            )
+        with self._lock:
+            with open(self.units_path, "a", encoding="utf-8") as f:
+                for row in lines:
+                    f.write(json.dumps(row, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            for _, hall, date, _, model_url in done:
+                self._done[(hall, date, model_url)] = part
+                self._rows[(hall, date, model_url)] = rows.get(model_url)
+                self._failed.discard((hall, date, model_url))
+            for _, hall, date, _, model_url in failed:
+                self._failed.add((hall, date, model_url))
+            if completed is not None:
+                self._dates.add(completed)
+
+    # ---------- 読み込み・削除 ----------
+    def done_units(self) -> list[tuple[str, str, str, int | None]]:
+        """取得を終えた (hall, date, model_url, 行数)"""
+        return [(*unit, self._rows.get(unit)) for unit in self._done]
+
+    def done_dates(self) -> dict[tuple[str, str], int]:
+        """
+        全機種ページを取得し終えた (hall, date) -> この実行で取得した行数
+        対象機種が無かった日付は 0（crawl_state で一定時間後に取り直す）
+        """
+        totals = dict.fromkeys(self._dates, 0)
+        for (hall, date, _), n in self._rows.items():
+            if (hall, date) in totals:
+                totals[(hall, date)] += n or 0
+        return totals
+
+    def load_frames(self) -> list[pd.DataFrame]:
+        """中断した実行で保存したデータを読み込む"""
+        parts = dict.fromkeys(p for p in self._done.values() if p)
+        frames = []
+        for part in parts:
+            path = os.path.join(self.frames_dir, part)
+            if os.path.exists(path):
+                frames.append(pd.read_parquet(path))
+            else:
+                logger.warning("チェックポイントのデータがありません: %s", path)
+        return frames
+
+    def clear(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def log_summary(self) -> None:
+        if self.resumed_units:
+            logger.info(
+                "チェックポイントから再開: 取得済み %d 件（今回スキップ %d 件）",
+                self.resumed_units,
+                self.skipped,
+            )
+        if self._failed:
+            logger.warning(
+                "取得に失敗した機種ページ: %d 件（次回の実行で取り直します）", len(self._failed)
+            )
@@ -3,9 +3,157 @@ from dataclasses import dataclass
 
 MAIN_URL = "https://min-repo.com/tag/"
 HALLS_YAML = "scraper/halls.yaml"
+MODEL_CATALOG_YAML = "scraper/models.yaml"  # 取得対象の機種・正式名（model_catalog.py）
 OUTPUT_CSV = "data/csv/halls.csv"
+CLEAN_CSV = "data/csv/halls_date_cleaner.csv"
+REJECT_CSV = "data/csv/halls_rejected.csv"  # df_clean で除外した行
 LOG_PATH = "data/log/minrepo.log"
+# ログ（logger_steup.py）: LOG_MAX_BYTES ごとにローテーションし、LOG_BACKUP_COUNT 世代残す
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+# 1 行 1 レコードの JSON ログ（None で出力しない）。DEBUG は含めない
+LOG_JSON_PATH = "data/log/minrepo.jsonl"
+LOG_JSON_LEVEL = "INFO"
+LOG_ROW_SAMPLE = 3  # 機種ページの行データを DEBUG ログに出す件数（1 ページあたり）
 DB_PATH = "data/db/minrepo_02.db"
+# crawl_state（crawl_state.py）: データが無かった機種ページ・対象機種が無かった日付は
+# この秒数が過ぎたら取り直す（ホールがデータを掲載する前に取得した場合の取りこぼし対策）
+CRAWL_EMPTY_RECHECK_SEC = 12 * 60 * 60
+# date=.../hall=... でパーティション分割した results の Parquet
+PARQUET_DIR = "data/parquet/results"
+# 出力形式: "csv"（halls.csv / 日付ごとの CSV / halls_date_cleaner.csv）と "parquet"
+OUTPUT_FORMATS = ("csv", "parquet")
+# 分析用の列配列ストア（results_store.py）: 列ごとの .npy をメモリマップして読む
+RESULTS_STORE_DIR = "data/store/results"
+
+# SQLite 取り込みプロファイル（sqlite_profile.py）
+SQLITE_SYNCHRONOUS = "NORMAL"  # WAL と組み合わせる前提
+SQLITE_CACHE_SIZE = -64_000  # 負の値は KiB 単位（約 64MB）
+SQLITE_MMAP_SIZE = 256 * 1024 * 1024
+# この行数以上を取り込むときはセカンダリインデックスを外して作り直す
+SQLITE_INDEX_REBUILD_ROWS = 100_000
+
+# Supabase への取り込み: "rpc"（ingest_results 関数に名前のまま送り、ID は Postgres 側で引く）
+#                       "rest"（models / prefectures / halls / results をテーブルごとに upsert）
+# "rpc" は supabase/migrations/*_ingest_results.sql を適用したプロジェクトで使う
+SUPABASE_INGEST = "rpc"
+# Supabase への results upsert（df_to_supabase.BatchUploader）
+SUPABASE_WORKERS = 4  # 同時に送信するバッチ数
+SUPABASE_BATCH_SIZE = 500  # 初期バッチサイズ（レイテンシに応じて増減）
+SUPABASE_MIN_BATCH_SIZE = 100
+SUPABASE_MAX_BATCH_SIZE = 2000
+SUPABASE_TARGET_LATENCY = 2.0  # 秒
+SUPABASE_MAX_RETRIES = 4
+SUPABASE_RETRY_BASE_DELAY = 1.0  # 秒（指数バックオフ + ジッター）
+DEAD_LETTER_DIR = "data/dead_letter"
+# 名前 → ID のローカルキャッシュ（id_cache.py）
+ID_CACHE_PATH = "data/cache/supabase_ids.json"
+ID_CACHE_TTL_SEC = 7 * 24 * 60 * 60
+SUPABASE_IN_FILTER_SIZE = 100  # in_ フィルタ 1 回あたりの名前数
+SUPABASE_AGG_CHUNK = 500  # refresh_daily_aggregates 1 回あたりの (hall_id, date) 数
+
+# ブラウザ: この回数ナビゲーションしたら BrowserContext を作り直す
+CONTEXT_RECYCLE_NAVIGATIONS = 100
+
+# ブラウザの待ち時間（wait_policy.py）: ページ種別ごとの直近 WAIT_WINDOW 件の
+# 所要時間の p95 × WAIT_P95_FACTOR を [WAIT_MIN_MS, WAIT_MAX_MS] に収めて使う
+# 計測が WAIT_MIN_SAMPLES 件に満たない間は WAIT_INITIAL_MS
+WAIT_WINDOW = 50
+WAIT_MIN_SAMPLES = 10
+WAIT_P95_FACTOR = 3.0
+WAIT_MIN_MS = 2_000
+WAIT_MAX_MS = 30_000
+WAIT_INITIAL_MS = {"navigate": 30_000, "selector": 15_000}
+
+# ページ取得のリトライ（retry.py）: タイムアウト・ネットワークエラーを URL ごとにリトライ
+FETCH_MAX_RETRIES = 3
+FETCH_RETRY_BASE_DELAY = 1.0  # 秒（指数バックオフ + ジッター）
+# ホストごとのサーキットブレーカー: 連続 BREAKER_FAILURES 回失敗したら
+# BREAKER_COOLDOWN_SEC 秒はそのホストへの取得を止める
+BREAKER_FAILURES = 5
+BREAKER_COOLDOWN_SEC = 60
+
+# 実行途中のチェックポイント（checkpoint.py）: 中断した実行を途中から再開する
+CHECKPOINT_DIR = "data/checkpoint"
+
+# シャード分割（shard.py）: --shard i/N の結果を SHARD_DIR/<run_id>/ に書き、merge でまとめる
+SHARD_DIR = "data/shards"
+# ホールごとの 1 日あたりの所要時間（割り当ての重み）。merge のたびに指数移動平均で更新する
+HALL_RUNTIME_PATH = "data/shards/hall_runtime.json"
+HALL_RUNTIME_ALPHA = 0.3
+
+# 時間予算（scraper.py --time-budget 分）: 締め切りの TIME_BUDGET_MARGIN_SEC 秒前から新しい作業を始めない
+# 作業単位ごとの所要時間の見積もりは実行中の p95 → 前回レポートの p95 → UNIT_COST_DEFAULTS（秒）
+TIME_BUDGET_MARGIN_SEC = 120
+UNIT_COST_DEFAULTS = {"hall": 3.0, "date": 3.0, "model": 3.0}
+MODELS_PER_DATE = 5  # 日付ページ 1 件あたりの機種ページ数（計測が無いときの見積もり）
+# 時間内に終わらなかった作業。次回の実行で、そのホールを優先する
+REMAINING_WORK_PATH = "data/schedule/remaining.json"
+
+# ページ取得: "http"（生 HTML、必要時のみブラウザ）or "browser"（常に Playwright）
+#             "replay"（ページキャッシュのみ。ネットワークに接続しない）
+FETCH_MODE = "http"
+HTTP_TIMEOUT = 30
+HTTP_POOL_SIZE = 10
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+)
+
+# ページキャッシュ（page_cache.py）: 取得した HTML を gzip で保存する
+PAGE_CACHE_ENABLED = True
+PAGE_CACHE_DIR = "data/cache/pages"
+PAGE_CACHE_TTL_SEC = 6 * 60 * 60  # 同じ日にこの時間内に取得したページは再利用する
+PAGE_CACHE_MAX_BYTES = 2 * 1024 * 1024 * 1024
+PAGE_CACHE_MAX_AGE_DAYS = 90
+PAGE_CACHE_REPLAY_DATE = None  # replay で使う取得日 (YYYY-MM-DD)。None なら最新
+
+# リクエストフィルタ（Playwright の route で不要なリソースを読み込まない）
+BLOCK_RESOURCE_TYPES = ["image", "media", "font", "stylesheet"]
+BLOCK_URL_PATTERNS = [
+    r"googlesyndication\.com",
+    r"doubleclick\.net",
+    r"google-analytics\.com",
+    r"googletagmanager\.com",
+    r"googletagservices\.com",
+    r"adservice\.google\.",
+    r"amazon-adsystem\.com",
+    r"i-mobile\.co\.jp",
+    r"microad\.",
+    r"adingo\.jp",
+    r"fluct\.jp",
+    r"criteo\.",
+    r"facebook\.(net|com)",
+    r"platform\.twitter\.com",
+]
+# None 以外を指定すると、この種類以外はすべてブロック（許可リスト方式）
+ALLOW_RESOURCE_TYPES = None
+# ブロック条件より優先して許可する URL
+ALLOW_URL_PATTERNS = []
+# ブロックしたリクエストの推定サイズ（bytes、削減量のログ用）
+RESOURCE_SIZE_ESTIMATES = {
+    "image": 40_000,
+    "media": 200_000,
+    "font": 60_000,
+    "stylesheet": 30_000,
+    "script": 50_000,
+    "xhr": 5_000,
+    "fetch": 5_000,
+}
+
+# スクレイピングエンジン: "sync" or "async"（halls.yaml の settings で上書き可）
+ENGINE = "sync"
+# async エンジンで同時に処理するホール数
+ASYNC_CONCURRENCY = 3
+# 1 ホストあたりの最大リクエスト数/秒（min-repo.com への負荷対策）
+HOST_RPS = 2.0
+
+# 実行レポート（metrics.py）: <name>.json / <name>.prom を書き出す
+METRICS_DIR = "data/metrics"
+METRICS_SLOWEST = 10  # 系列ごとに残す遅いページの数
+
+# ストリーミング取り込み (--stream): この行数たまるごとに DB へ書き込みコミットする
+STREAM_BATCH_ROWS = 5_000
 
 
 @dataclass
@@ -0,0 +1,158 @@
+import datetime as dt
+import os
+import sqlite3
+
+import config
+from logger_steup import setup_logger
+
+# =========================
+# 設定・ロガー
+# =========================
+filename, ext = os.path.splitext(os.path.basename(__file__))
+logger = setup_logger(filename, log_file=config.LOG_PATH)
+
+# model_url にこの値を入れた行は「日付単位で取得完了」を表す
+DATE_DONE = ""
+
+
+# =========================
+# クロール状態
+# =========================
+class CrawlState:
+    """
+    取得済みの (hall, date, model_url) を SQLite の crawl_state テーブルで管理する
+    full_refresh=True の場合はスキップ判定を行わない（記録は行う）
+    記録は取り込み（出力）を書き終えてから行う（途中で止まった分は次回取り直す）
+    rows=0（データなし）の行は recheck_sec が過ぎたら取得済みとみなさない
+    """
+
+    def __init__(
+        self,
+        db_path: str = config.DB_PATH,
+        full_refresh: bool = False,
+        recheck_sec: float = config.CRAWL_EMPTY_RECHECK_SEC,
+    ):
+        self.full_refresh = full_refresh
+        self.recheck_sec = recheck_sec
+        # 初回の実行では data/db/ がまだ無い
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        # 既存の DB でも使えるようにテーブルを用意する（create_databese と同じ定義）
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS crawl_state (
+                hall TEXT NOT NULL,
+                date DATE NOT NULL,
+                model_url TEXT NOT NULL,
+                rows INTEGER,
+                ingested_at TEXT NOT NULL,
+                PRIMARY KEY (hall, date, model_url)
+            );
+            """
+        )
+        self.conn.commit()
+        self.skipped_dates = 0
+        self.skipped_models = 0
+
+    def __enter__(self) -> "CrawlState":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    # ---------- 判定 ----------
+    def _recheck_before(self) -> str:
+        """これより前に記録した rows=0 の行は取り直す（ingested_at と同じ ISO 形式）"""
+        cutoff = dt.datetime.now() - dt.timedelta(seconds=self.recheck_sec)
+        return cutoff.isoformat(timespec="seconds")
+
+    def is_date_done(self, hall: str, date: str) -> bool:
+        """日付の完了が記録されていて、取り直す時期になったデータなしのページが無いか"""
+        if self.full_refresh or not self.is_model_done(hall, date, DATE_DONE):
+            return False
+        cur = self.conn.execute(
+            "SELECT 1 FROM crawl_state WHERE hall = ? AND date = ? AND rows = 0"
+            " AND ingested_at < ? LIMIT 1",
+            (hall, date, self._recheck_before()),
+        )
+        return cur.fetchone() is None
+
+    def is_model_done(self, hall: str, date: str, model_url: str) -> bool:
+        if self.full_refresh:
+            return False
+        row = self.conn.execute(
+            "SELECT rows, ingested_at FROM crawl_state"
+            " WHERE hall = ? AND date = ? AND model_url = ?",
+            (hall, date, model_url),
+        ).fetchone()
+        if row is None:
+            return False
+        rows, ingested_at = row
+        return rows != 0 or ingested_at >= self._recheck_before()
+
+    def filter_dates(self, date_urls: list[tuple]) -> list[tuple]:
+        """extract_date_url の結果から取得済みの日付を除く"""
+        todo = [d for d in date_urls if not self.is_date_done(d[1], d[2])]
+        self.skipped_dates += len(date_urls) - len(todo)
+        return todo
+
+    def filter_models(self, model_urls: list[tuple]) -> list[tuple]:
+        """
+        extract_model_url の結果から取得済みの機種ページを除く
+        全部取り込み済みなら日付も記録する（前回、日付の完了を記録する前に止まった場合）
+        データなしのページがあっても、取り直す時期が来れば is_date_done が False を返す
+        """
+        todo = [m for m in model_urls if not self.is_model_done(m[1], m[2], m[4])]
+        self.skipped_models += len(model_urls) - len(todo)
+        if model_urls and not todo:
+            _, hall, date, _, _ = model_urls[0]
+            self.mark_date(hall, date)
+        return todo
+
+    def last_ingested(self, hall: str) -> str:
+        """ホールの最後の取得日時（ISO 形式。未取得なら ""）"""
+        row = self.conn.execute(
+            "SELECT MAX(ingested_at) FROM crawl_state WHERE hall = ?", (hall,)
+        ).fetchone()
+        return row[0] or ""
+
+    # ---------- 記録 ----------
+    def mark_model(self, hall: str, date: str, model_url: str, rows: int | None = None) -> None:
+        now = dt.datetime.now().isoformat(timespec="seconds")
+        self.conn.execute(
+            "INSERT OR REPLACE INTO crawl_state (hall, date, model_url, rows, ingested_at)"
+            " VALUES (?, ?, ?, ?, ?)",
+            (hall, date, model_url, rows, now),
+        )
+        self.conn.commit()
+
+    def mark_date(self, hall: str, date: str, rows: int | None = None) -> None:
+        self.mark_model(hall, date, DATE_DONE, rows)
+
+    def mark_checkpoint(self, checkpoint) -> None:
+        """
+        出力を書き終えた RunCheckpoint（checkpoint.py）の機種ページ・日付を取得済みとして記録する
+        checkpoint.clear() の前に呼ぶ（1 トランザクションでまとめて書く）
+        """
+        now = dt.datetime.now().isoformat(timespec="seconds")
+        rows = [(hall, date, url, n, now) for hall, date, url, n in checkpoint.done_units()]
+        rows += [
+            (hall, date, DATE_DONE, n, now) for (hall, date), n in checkpoint.done_dates().items()
+        ]
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO crawl_state (hall, date, model_url, rows, ingested_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+        logger.info("取得済みとして記録: %d 件", len(rows))
+
+    def log_summary(self) -> None:
+        logger.info(
+            "取得済みのためスキップ: 日付 %d 件 / 機種ページ %d 件",
+            self.skipped_dates,
+            self.skipped_models,
+        )
@@ -1,40 +1,174 @@
+import os
+
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+import config
+from logger_steup import setup_logger
+from metrics import METRICS
+
+# =========================
+# 設定・ロガー
+# =========================
+filename, ext = os.path.splitext(os.path.basename(__file__))
+logger = setup_logger(filename, log_file=config.LOG_PATH)
+
+
+# =========================
+# スキーマ・変換表（モジュール読み込み時に 1 回だけ作る）
+# =========================
+COLUMNS_RENAME_MAP = {
+    "pref": "pref",
+    "prefecture": "pref",
+    "h_name": "hall",
+    "m_name": "model",
+    "model_name": "model",
+    "date": "date",
+    "台番": "unit_no",
+    "G数": "game",
+    "BB": "bb",
+    "RB": "rb",
+    "差枚": "medal",
+}
+
+# 文字列の列（カテゴリ型にする）
+CATEGORY_COLUMNS = ["pref", "hall", "model"]
+# 数値の列: (dtype, 最小値, 最大値)
+NUMERIC_SCHEMA = {
+    "unit_no": ("int16", 0, np.iinfo("int16").max),
+    "game": ("int32", 0, np.iinfo("int32").max),
+    "bb": ("int16", 0, np.iinfo("int16").max),
+    "rb": ("int16", 0, np.iinfo("int16").max),
+    "medal": ("int32", np.iinfo("int32").min, np.iinfo("int32").max),
+}
+OUTPUT_COLUMNS = [*CATEGORY_COLUMNS, "date", *NUMERIC_SCHEMA]
+
+_DATE_RE = r"^\d{4}-\d{2}-\d{2}$"
+# 桁区切り・空白を除き、マイナス記号の異体字を "-" に揃える
+_THOUSANDS_RE = r"[,，\s]"
+_MINUS_RE = "[−－‐―ー]"
+_INT_RE = r"^-?[0-9]{1,10}$"
+
+
+def _to_float(text: pa.Array, normalize: bool = False) -> pa.Array:
+    """整数として解釈できない値は null にして float64 で返す"""
+    if normalize:
+        # 全角数字・全角カンマ・マイナス記号の異体字などを揃える（失敗した行だけに使う）
+        text = pc.utf8_normalize(text, "NFKC")
+        text = pc.replace_substring_regex(text, _THOUSANDS_RE, "")
+        text = pc.replace_substring_regex(text, _MINUS_RE, "-")
+    else:
+        # ほとんどのページは "1,234" 形式なので、まず桁区切りを外して一括変換する
+        text = pc.replace_substring(text, ",", "")
+        try:
+            return pc.cast(pc.cast(text, pa.int64()), pa.float64())
+        except pa.ArrowInvalid:
+            pass
+    ok = pc.match_substring_regex(text, _INT_RE)
+    return pc.cast(pc.if_else(ok, text, None), pa.float64())
+
+
+def _arrow_strings(s: pd.Series) -> pa.Array:
+    """文字列の Series を Arrow 配列にする（concat 後の複数チャンクも 1 つにまとめる）"""
+    arr = pa.array(s, type=pa.string(), from_pandas=True)
+    return arr.combine_chunks() if isinstance(arr, pa.ChunkedArray) else arr
+
+
+def _to_category(s: pd.Series) -> pd.Categorical:
+    """Arrow の辞書エンコードでカテゴリ型に変換する（欠損は NaN のまま）"""
+    encoded = _arrow_strings(s).dictionary_encode()
+    codes = pc.fill_null(encoded.indices, -1).to_numpy(zero_copy_only=False)
+    return pd.Categorical.from_codes(codes, categories=encoded.dictionary.to_pandas())
+
+
+def _parse_int(s: pd.Series) -> np.ndarray:
+    """'1,234' / '−1,234' / '１２３' のような文字列を数値に変換する（変換できなければ NaN）"""
+    if pd.api.types.is_numeric_dtype(s):
+        return s.to_numpy(dtype="float64", na_value=np.nan)
+
+    # 文字列処理は Arrow の compute 関数で行う（Python の行ループを回さない）
+    text = _arrow_strings(s.astype("str").mask(s.isna()))
+    values = _to_float(text).to_numpy(zero_copy_only=False)
+
+    # 全角数字などは失敗した行だけ NFKC で正規化して再変換する
+    retry = np.isnan(values) & ~s.isna().to_numpy()
+    if retry.any():
+        fixed = _to_float(text.filter(pa.array(retry)), normalize=True)
+        values[retry] = fixed.to_numpy(zero_copy_only=False)
+    return values
+
+
+# =========================
+# クリーニング
+# =========================
+@METRICS.timed("clean")
+def clean_results(df: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    列名の統一・数値変換・検証を 1 回で行う
+    機種名はスクレイピング時に正式名にしてある（model_catalog.py）ので置き換えない
+    returns: (整形済み, 除外した行 + reason 列)
+    - 数値は NUMERIC_SCHEMA の整数型、pref/hall/model はカテゴリ型
+    - 必須列が無い場合は ValueError
+    """
+    df = df.rename(columns=COLUMNS_RENAME_MAP)
+    missing = [c for c in OUTPUT_COLUMNS if c not in df.columns]
+    if missing:
+        raise ValueError(f"必須列がありません: {missing}")
+
+    out = pd.DataFrame(
+        {
+            "pref": _to_category(df["pref"]),
+            "hall": _to_category(df["hall"]),
+            "model": _to_category(df["model"]),
+            "date": df["date"].astype("string").to_numpy(),
+        },
+    )
+
+    # 行ごとに最初に見つかった不正の理由を残す
+    reasons = [(c, out[c].isna().to_numpy()) for c in CATEGORY_COLUMNS]
+    reasons.append(("date", ~out["date"].str.match(_DATE_RE).fillna(False).to_numpy(dtype=bool)))
+    for col, (dtype, lo, hi) in NUMERIC_SCHEMA.items():
+        values = _parse_int(df[col])
+        reasons.append((col, np.isnan(values) | (values < lo) | (values > hi)))
+        out[col] = values
+
+    bad = np.column_stack([np.asarray(mask, dtype=bool) for _, mask in reasons])
+    invalid = bad.any(axis=1)
+    first_bad = bad.argmax(axis=1)
+    names = np.array([f"invalid_{col}" for col, _ in reasons])
+
+    rejects = df.loc[invalid].assign(reason=names[first_bad[invalid]])
+    out = out.loc[~invalid].astype({c: dtype for c, (dtype, _, _) in NUMERIC_SCHEMA.items()})
+    out = out.reset_index(drop=True)
+
+    METRICS.incr("clean_rows", len(out))
+    METRICS.incr("clean_rejected_rows", len(rejects))
+    if len(rejects):
+        logger.warning(
+            "除外した行: %d 件 %s", len(rejects), rejects["reason"].value_counts().to_dict()
+        )
+    return out, rejects
 
 
-def df_data_clean(df):
-    ALIAS_MAP = {
-        "SミスタージャグラーKK": "ミスタージャグラー",
-        "S ミスタージャグラー KK": "ミスタージャグラー",
-        "SアイムジャグラーEX": "アイムジャグラーEX-TP",
-        "ファンキージャグラー2KT": "ファンキージャグラー2",
-        "ジャグラーガールズSS": "ジャグラーガールズ",
-        "S ネオアイムジャグラーEX KK": "ネオアイムジャグラーEX",
-    }
-
-    COULMNS_RENAME_MAP = {
-        "pref": "pref",
-        "prefecture": "pref",
-        "h_name": "hall",
-        "m_name": "model",
-        "model_name": "model",
-        "date": "date",
-        "台番": "unit_no",
-        "G数": "game",
-        "BB": "bb",
-        "RB": "rb",
-        "差枚": "medal",
-    }
-
-    df = df.rename(columns=COULMNS_RENAME_MAP)
-    df["model"] = df["model"].replace(ALIAS_MAP)
-    df["game"] = df["game"].str.replace(",", "").astype(int)
-    df["medal"] = df["medal"].str.replace(",", "").astype(int)
-
-
-    df.to_csv("data/csv/halls_date_cleaner.csv", index=False)
+def df_data_clean(
+    df: pd.DataFrame,
+    output_csv: str | None = config.CLEAN_CSV,
+    reject_csv: str | None = config.REJECT_CSV,
+) -> pd.DataFrame:
+    """
+    clean_results の整形済みデータだけを返す
+    output_csv / reject_csv を指定した場合は CSV にも書き出す（None なら書き出さない）
+    """
+    df, rejects = clean_results(df)
+    if output_csv:
+        df.to_csv(output_csv, index=False)
+    if reject_csv and len(rejects):
+        rejects.to_csv(reject_csv, index=False)
     return df
 
 
 if __name__ == "__main__":
-    df = pd.read_csv("data/csv/halls.csv")
+    df = pd.read_csv(config.OUTPUT_CSV)
     df_clean = df_data_clean(df)
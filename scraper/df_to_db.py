@@ -1,5 +1,21 @@
+import argparse
 import pandas as pd
 import sqlite3
+import os
+import time
+
+import config
+from logger_steup import setup_logger
+from metrics import METRICS
+from aggregates import refresh_aggregates
+from sqlite_profile import bulk_load
+from parquet_store import LOAD_COLUMNS, add_source_args, load_clean_data
+
+# =========================
+# 設定・ロガー
+# =========================
+filename, ext = os.path.splitext(os.path.basename(__file__))
+logger = setup_logger(filename, log_file=config.LOG_PATH)
 
 
 def add_model(df, conn, cursor):
@@ -53,92 +69,123 @@ def add_prefecture_and_hall(df, conn, cursor):
         print(f"・新規ホール: {new_hall_count} 件")
 
 
-def add_data_result(conn, cursor, df):
-    """--- データ登録 ---"""
-    new_result_count = 0
+RESULT_COLUMNS = ["unit_no", "game", "bb", "rb", "medal"]
 
-    prefectures = df["pref"].dropna().unique().tolist()
-    for pref in prefectures:
-        # 都道府県追加とIDの取得
-        cursor.execute("INSERT OR IGNORE INTO prefectures (name) VALUES (?)", (pref,))
-        cursor.execute("SELECT prefecture_id FROM prefectures WHERE name = ?", (pref,))
-        prefecture_id = cursor.fetchone()[0]
 
-        # ホールの登録
-        halls = df.loc[df["pref"] == pref, "hall"].dropna().unique().tolist()
-        for hall in halls:
-            cursor.execute(
-                "INSERT OR IGNORE INTO halls (name, prefecture_id) VALUES (?, ?)",
-                (hall, prefecture_id),
-            )
+def _resolve_ids(df: pd.DataFrame, cursor) -> pd.DataFrame:
+    """
+    都道府県・ホール・機種を登録（重複無視）し、ID を列として付与した DataFrame を返す
+    ID の取得は各テーブル 1 回ずつ、付与は pandas のベクトル演算で行う
+    """
+    prefectures = df["pref"].unique().tolist()
+    cursor.executemany(
+        "INSERT OR IGNORE INTO prefectures (name) VALUES (?)",
+        [(p,) for p in prefectures],
+    )
+    pref_map = dict(cursor.execute("SELECT name, prefecture_id FROM prefectures"))
 
-        df_pref = df[df["pref"] == pref]
-        for _, row in df_pref.iterrows():
-            h_name = row["hall"]
-            m_name = row["model"]
-            unit_no = int(row["unit_no"])
-            date = row["date"]
-            game = int(row["game"])
-            bb = int(row["bb"])
-            rb = int(row["rb"])
-            medal = int(row["medal"])
-
-            # 3-1) hall_id 取得
-            cursor.execute(
-                "SELECT hall_id FROM halls WHERE name = ? AND prefecture_id = ?",
-                (h_name, prefecture_id),
-            )
-            hall_row = cursor.fetchone()
-            if not hall_row:
-                # 念のため（通常は上の INSERT OR IGNORE で存在する想定）
-                cursor.execute(
-                    "INSERT OR IGNORE INTO halls (name, prefecture_id) VALUES (?, ?)",
-                    (h_name, prefecture_id),
-                )
-                cursor.execute(
-                    "SELECT hall_id FROM halls WHERE name = ? AND prefecture_id = ?",
-                    (h_name, prefecture_id),
-                )
-                hall_row = cursor.fetchone()
-            hall_id = hall_row[0]
-
-            # 3-2) model_id 取得（なければ作成）
-            cursor.execute("INSERT OR IGNORE INTO models (name) VALUES (?)", (m_name,))
-            cursor.execute("SELECT model_id FROM models WHERE name = ?", (m_name,))
-            model_id = cursor.fetchone()[0]
-
-            # 3-3) results へ登録（重複は無視）
-            cursor.execute(
-                """
+    df = df.assign(prefecture_id=df["pref"].map(pref_map))
+
+    hall_keys = df[["hall", "prefecture_id"]].drop_duplicates()
+    cursor.executemany(
+        "INSERT OR IGNORE INTO halls (name, prefecture_id) VALUES (?, ?)",
+        [(h, int(p)) for h, p in hall_keys.itertuples(index=False, name=None)],
+    )
+    hall_ids = pd.DataFrame(
+        cursor.execute("SELECT hall_id, name, prefecture_id FROM halls").fetchall(),
+        columns=["hall_id", "hall", "prefecture_id"],
+    )
+
+    models = df["model"].unique().tolist()
+    cursor.executemany(
+        "INSERT OR IGNORE INTO models (name) VALUES (?)", [(m,) for m in models]
+    )
+    model_map = dict(cursor.execute("SELECT name, model_id FROM models"))
+
+    df = df.merge(hall_ids, on=["hall", "prefecture_id"], how="left")
+    df["model_id"] = df["model"].map(model_map)
+    return df
+
+
+def add_data_result(conn, cursor, df):
+    """--- データ登録（一括） ---"""
+    start = time.perf_counter()
+
+    df = df.dropna(subset=["pref", "hall", "model", "date"])
+    if df.empty:
+        logger.info("データの新規登録はありません。")
+        return
+
+    # 数値列は "1,234" のような文字列でも受け付ける
+    numeric = df[RESULT_COLUMNS].apply(
+        lambda s: pd.to_numeric(s.astype(str).str.replace(",", ""), errors="coerce")
+    )
+    invalid = numeric.isna().any(axis=1)
+    if invalid.any():
+        logger.warning("数値変換できない行を除外: %d 件", int(invalid.sum()))
+    df = df.loc[~invalid].assign(**numeric.loc[~invalid].astype("int64"))
+
+    # 1 トランザクションで ID 解決 → results へ一括登録（重複は無視）
+    with conn:
+        df = _resolve_ids(df, cursor)
+        records = df[["hall_id", "model_id", "unit_no", "date", *RESULT_COLUMNS[1:]]]
+        records = records.assign(date=records["date"].astype(str))
+
+        before = conn.total_changes
+        cursor.executemany(
+            """
             INSERT OR IGNORE INTO results
             (hall_id, model_id, unit_no, date, game, bb, rb, medal)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?)
             """,
-                (hall_id, model_id, unit_no, date, game, bb, rb, medal),
+            records.itertuples(index=False, name=None),
+        )
+        new_result_count = conn.total_changes - before
+
+        # 新しい行が入った (hall_id, date) の集計テーブルを同じトランザクションで更新する
+        if new_result_count:
+            refresh_aggregates(
+                conn, records[["hall_id", "date"]].drop_duplicates().itertuples(index=False)
             )
-            if cursor.rowcount > 0:
-                new_result_count += 1
 
-    if new_result_count == 0:
-        print("データの新規登録はありません。")
-    else:
-        print(f"データ登録数: {new_result_count} 件")
+    elapsed = time.perf_counter() - start
+    duplicate_count = len(records) - new_result_count
+    METRICS.observe("load_sqlite_seconds", elapsed)
+    METRICS.observe("load_sqlite_rows_per_sec", len(records) / elapsed if elapsed else 0.0)
+    METRICS.incr("sqlite_rows_new", new_result_count)
+    METRICS.incr("sqlite_rows_duplicate", duplicate_count)
+    logger.info(
+        "データ登録: 新規 %d 件 / 重複 %d 件 (%.2f 秒, %.0f rows/sec)",
+        new_result_count,
+        duplicate_count,
+        elapsed,
+        len(records) / elapsed if elapsed else 0.0,
+    )
 
 
 if __name__ == "__main__":
 
-    DB_PATH = "data/db/minrepo_02.db"
-    CSV_PATH = "data/csv/halls_date_cleaner.csv"
+    parser = argparse.ArgumentParser(description="results を SQLite に取り込む")
+    add_source_args(parser)
+    args = parser.parse_args()
 
-    df = pd.read_csv(CSV_PATH)
+    # 取り込みに使う列だけ読み込む（Parquet の場合は日付・ホールをパーティションで絞る）
+    df = load_clean_data(
+        args.source,
+        columns=LOAD_COLUMNS,
+        date_from=args.date_from,
+        date_to=args.date_to,
+        halls=args.hall,
+    )
 
-    conn = sqlite3.connect(DB_PATH)
+    conn = sqlite3.connect(config.DB_PATH)
     cursor = conn.cursor()
 
-    add_model(df, conn, cursor)
-    add_prefecture_and_hall(df, conn, cursor)
-    add_data_result(conn, cursor, df)
-    
-    conn.commit()
-    conn.close()
+    with bulk_load(conn, rows=len(df)):
+        add_model(df, conn, cursor)
+        add_prefecture_and_hall(df, conn, cursor)
+        add_data_result(conn, cursor, df)
+        conn.commit()
 
+    conn.close()
+    METRICS.write_report("df_to_db")
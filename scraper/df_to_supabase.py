@@ -1,7 +1,29 @@
+import argparse
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import datetime as dt
+import json
 import os
+import random
+import threading
+import time
+import httpx
 import pandas as pd
+from postgrest.exceptions import APIError
 from supabase import create_client, Client
 
+import config
+from logger_steup import setup_logger
+from id_cache import IdCache
+from metrics import METRICS
+from aggregates import refresh_aggregates_supabase
+from parquet_store import LOAD_COLUMNS, add_source_args, load_clean_data
+
+# =========================
+# 設定・ロガー
+# =========================
+filename, ext = os.path.splitext(os.path.basename(__file__))
+logger = setup_logger(filename, log_file=config.LOG_PATH)
+
 
 def get_supabase_client() -> Client:
     url = os.environ.get("SUPABASE_URL")
@@ -13,143 +35,449 @@ def get_supabase_client() -> Client:
     return create_client(url, key)
 
 
-def add_model(df: pd.DataFrame, supabase: Client) -> None:
+def load_id_cache() -> IdCache:
+    """接続先ごとの 名前 → ID キャッシュを読み込む"""
+    return IdCache.load(source=os.environ.get("SUPABASE_URL", ""))
+
+
+def _chunks(items: list, size: int = config.SUPABASE_IN_FILTER_SIZE):
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+def add_model(df: pd.DataFrame, supabase: Client, cache: IdCache | None = None) -> None:
     """--- モデルの登録 (models) ---"""
+    cache = cache or load_id_cache()
     models = df["model"].dropna().unique().tolist()
     if not models:
         print("モデルなし")
         return
 
+    # キャッシュに無いものだけ upsert し、返ってきた行から ID を得る
+    new_models = [m for m in models if m not in cache.models]
+    if not new_models:
+        print(f"モデル: {len(models)} 件すべてキャッシュ済み")
+        return
+
     # UNIQUE(models.name) 前提で upsert
-    rows = [{"name": m} for m in models]
-    supabase.table("models").upsert(rows, on_conflict="name").execute()
+    rows = [{"name": m} for m in new_models]
+    res = supabase.table("models").upsert(rows, on_conflict="name").execute()
+    cache.models.update({r["name"]: r["model_id"] for r in res.data})
+    cache.save()
     print(f"モデル upsert: {len(rows)} 件（新規/既存含む）")
 
 
-def add_prefecture_and_hall(df: pd.DataFrame, supabase: Client) -> None:
+def add_prefecture_and_hall(
+    df: pd.DataFrame, supabase: Client, cache: IdCache | None = None
+) -> None:
     """--- 都道府県(prefectures) と ホール(halls) 登録 ---"""
+    cache = cache or load_id_cache()
     prefectures = df["pref"].dropna().unique().tolist()
     if not prefectures:
         print("pref カラムが空です。")
         return
 
-    # 1) prefectures upsert
-    pref_rows = [{"name": p} for p in prefectures]
-    supabase.table("prefectures").upsert(pref_rows, on_conflict="name").execute()
-    print(f"都道府県 upsert: {len(pref_rows)} 件")
-
-    # 2) prefecture_id を取得してマップ化
-    pref_res = supabase.table("prefectures").select("prefecture_id, name").execute()
-    pref_map = {row["name"]: row["prefecture_id"] for row in pref_res.data}
+    # 1) prefectures upsert（キャッシュに無いものだけ、ID は upsert の応答から取得）
+    new_prefs = [p for p in prefectures if p not in cache.prefectures]
+    if new_prefs:
+        pref_rows = [{"name": p} for p in new_prefs]
+        res = supabase.table("prefectures").upsert(pref_rows, on_conflict="name").execute()
+        cache.prefectures.update({r["name"]: r["prefecture_id"] for r in res.data})
+        print(f"都道府県 upsert: {len(pref_rows)} 件")
 
-    # 3) halls upsert（name + prefecture_id をユニークキー想定）
+    # 2) halls upsert（name + prefecture_id をユニークキー想定）
     hall_rows = []
-    for pref in prefectures:
-        pid = pref_map.get(pref)
+    pairs = df[["pref", "hall"]].dropna().drop_duplicates()
+    for pref, hall in pairs.itertuples(index=False, name=None):
+        pid = cache.prefectures.get(pref)
         if not pid:
             print(f"⚠ prefecture_id 取得失敗: {pref}")
             continue
-        halls = df.loc[df["pref"] == pref, "hall"].dropna().unique().tolist()
-        for hall in halls:
+        if (pid, hall) not in cache.halls:
             hall_rows.append({"name": hall, "prefecture_id": pid})
 
     if hall_rows:
-        supabase.table("halls").upsert(
+        res = supabase.table("halls").upsert(
             hall_rows,
             on_conflict="name,prefecture_id",
         ).execute()
+        cache.halls.update({(r["prefecture_id"], r["name"]): r["hall_id"] for r in res.data})
         print(f"ホール upsert: {len(hall_rows)} 件")
-    else:
+    elif pairs.empty:
         print("ホールなし")
+    else:
+        print(f"ホール: {len(pairs)} 件すべてキャッシュ済み")
+    cache.save()
 
 
-def add_data_result(df: pd.DataFrame, supabase: Client) -> None:
-    """--- results テーブルへデータ登録 ---"""
+def fetch_missing_ids(df: pd.DataFrame, supabase: Client, cache: IdCache) -> None:
+    """
+    キャッシュに無い名前だけを in_ フィルタで問い合わせてキャッシュに追加する
+    （add_model / add_prefecture_and_hall を通さずに results を登録する場合の保険）
+    """
+    prefs = [p for p in df["pref"].dropna().unique() if p not in cache.prefectures]
+    for chunk in _chunks(prefs):
+        res = supabase.table("prefectures").select("prefecture_id, name").in_("name", chunk).execute()
+        cache.prefectures.update({r["name"]: r["prefecture_id"] for r in res.data})
 
-    # 1) 最新の prefectures / halls / models を取得して ID マップを作る
-    pref_res = supabase.table("prefectures").select("prefecture_id, name").execute()
-    hall_res = supabase.table("halls").select("hall_id, name, prefecture_id").execute()
-    model_res = supabase.table("models").select("model_id, name").execute()
+    models = [m for m in df["model"].dropna().unique() if m not in cache.models]
+    for chunk in _chunks(models):
+        res = supabase.table("models").select("model_id, name").in_("name", chunk).execute()
+        cache.models.update({r["name"]: r["model_id"] for r in res.data})
 
-    pref_map = {p["name"]: p["prefecture_id"] for p in pref_res.data}
-    # (pref, hall) -> hall_id
-    hall_map = {(h["prefecture_id"], h["name"]): h["hall_id"] for h in hall_res.data}
-    model_map = {m["name"]: m["model_id"] for m in model_res.data}
+    pairs = df[["pref", "hall"]].dropna().drop_duplicates()
+    halls = sorted(
+        {
+            hall
+            for pref, hall in pairs.itertuples(index=False, name=None)
+            if (cache.prefectures.get(pref), hall) not in cache.halls
+        }
+    )
+    for chunk in _chunks(halls):
+        res = (
+            supabase.table("halls")
+            .select("hall_id, name, prefecture_id")
+            .in_("name", chunk)
+            .execute()
+        )
+        cache.halls.update({(r["prefecture_id"], r["name"]): r["hall_id"] for r in res.data})
 
-    # 2) DataFrame から results 用レコードを作成
-    records = []
-    for _, row in df.iterrows():
-        pref = row["pref"]
-        hall_name = row["hall"]
-        model_name = row["model"]
+    if prefs or models or halls:
+        logger.info(
+            "ID 問い合わせ: 都道府県 %d / 機種 %d / ホール %d", len(prefs), len(models), len(halls)
+        )
+        cache.save()
 
-        pid = pref_map.get(pref)
-        if not pid:
-            print(f"⚠ prefecture_id なし: {pref}")
-            continue
 
-        hall_id = hall_map.get((pid, hall_name))
-        if not hall_id:
-            print(f"⚠ hall_id なし: {pref} / {hall_name}")
-            continue
+RESULT_COLUMNS = ["hall_id", "model_id", "unit_no", "date", "game", "bb", "rb", "medal"]
+NUMERIC_COLUMNS = ["unit_no", "game", "bb", "rb", "medal"]
 
-        model_id = model_map.get(model_name)
-        if not model_id:
-            print(f"⚠ model_id なし: {model_name}")
-            continue
 
-        try:
-            unit_no = int(row["unit_no"])
-            game = int(row["game"])
-            bb = int(row["bb"])
-            rb = int(row["rb"])
-            medal = int(row["medal"])
-        except (TypeError, ValueError):
-            print(f"⚠ 数値変換エラー: {row}")
-            continue
+def _numeric_rows(df: pd.DataFrame) -> pd.DataFrame:
+    """NUMERIC_COLUMNS を int64 に変換し、変換できない行を除く"""
+    numeric = df[NUMERIC_COLUMNS].apply(
+        lambda s: pd.to_numeric(s.astype(str).str.replace(",", ""), errors="coerce")
+    )
+    invalid = numeric.isna().any(axis=1)
+    if invalid.any():
+        logger.warning("⚠ 数値変換エラー: %d 行", int(invalid.sum()))
+    return df.loc[~invalid].assign(**numeric.loc[~invalid].astype("int64"))
+
+
+def build_result_records(
+    df: pd.DataFrame,
+    pref_map: dict[str, int],
+    hall_map: dict[tuple[int, str], int],
+    model_map: dict[str, int],
+) -> list[dict]:
+    """ID マップを DataFrame にベクトル演算で付与し、results 用レコードを作る"""
+
+    df = df.assign(prefecture_id=df["pref"].map(pref_map), model_id=df["model"].map(model_map))
+    hall_ids = pd.DataFrame(
+        [(pid, name, hid) for (pid, name), hid in hall_map.items()],
+        columns=["prefecture_id", "hall", "hall_id"],
+    )
+    df = df.merge(hall_ids, on=["prefecture_id", "hall"], how="left")
+
+    for col, label in [("prefecture_id", "pref"), ("hall_id", "hall"), ("model_id", "model")]:
+        missing = df[col].isna()
+        if missing.any():
+            names = df.loc[missing, label].unique().tolist()
+            logger.warning("⚠ %s なし: %d 行 %s", col, int(missing.sum()), names[:5])
+            df = df.loc[~missing]
+
+    df = _numeric_rows(df)
+    df = df.assign(
+        hall_id=df["hall_id"].astype("int64"),
+        model_id=df["model_id"].astype("int64"),
+        date=df["date"].astype(str),  # 'YYYY-MM-DD' 文字列でOK
+    )
+    return df[RESULT_COLUMNS].to_dict("records")
+
+
+# リトライで直る見込みのある PostgreSQL の SQLSTATE / PostgREST のエラーコード（前方一致）
+# 08: 接続, 53: リソース不足, 57P0: 停止中, 57014: タイムアウト,
+# 40001 / 40P01: 直列化失敗・デッドロック, 55P03: ロック待ち,
+# PGRST00x: PostgREST から DB に接続できない・接続プールの待ちタイムアウト
+TRANSIENT_PG_CODES = ("08", "53", "57P0", "57014", "40001", "40P01", "55P03", "PGRST00")
+
+
+def is_transient(e: Exception) -> bool:
+    """接続エラー・タイムアウト・5xx・429 など、リトライで直る見込みのある失敗か"""
+    if isinstance(e, (httpx.TransportError, ConnectionError, TimeoutError)):
+        return True
+    if isinstance(e, httpx.HTTPStatusError):
+        status = e.response.status_code
+        return status == 429 or status >= 500
+    if isinstance(e, APIError):
+        if e.code is None:
+            # コードの無い応答はゲートウェイ（Kong など）の 5xx。PostgreSQL のエラーには必ずある
+            return True
+        code = str(e.code)
+        if code.isdigit() and len(code) == 3:
+            # 本文が JSON でない応答は HTTP ステータスがコードに入る
+            return code == "429" or code.startswith("5")
+        return code.startswith(TRANSIENT_PG_CODES)
+    return False
+
+
+class BatchUploader:
+    """
+    upsert をバッチに分けて並列送信する
+    - バッチサイズはレイテンシに合わせて増減する
+    - 一時的な失敗（is_transient）は指数バックオフでリトライし、
+      それでも失敗した行と、制約違反などリトライしても直らない失敗の行はデッドレターに保存
+    """
+
+    def __init__(
+        self,
+        supabase: Client,
+        table: str,
+        on_conflict: str,
+        workers: int = config.SUPABASE_WORKERS,
+        batch_size: int = config.SUPABASE_BATCH_SIZE,
+        min_batch_size: int = config.SUPABASE_MIN_BATCH_SIZE,
+        max_batch_size: int = config.SUPABASE_MAX_BATCH_SIZE,
+        target_latency: float = config.SUPABASE_TARGET_LATENCY,
+        max_retries: int = config.SUPABASE_MAX_RETRIES,
+        dead_letter_dir: str = config.DEAD_LETTER_DIR,
+    ):
+        self.supabase = supabase
+        self.table = table
+        self.on_conflict = on_conflict
+        self.workers = max(1, workers)
+        self.batch_size = batch_size
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max_batch_size
+        self.target_latency = target_latency
+        self.max_retries = max_retries
+        self.dead_letter_dir = dead_letter_dir
+
+        self.latencies: list[float] = []
+        self.retries = 0
+        self.sent = 0
+        self.failed: list[dict] = []
 
-        records.append(
-            {
-                "hall_id": hall_id,
-                "model_id": model_id,
-                "unit_no": unit_no,
-                "date": str(row["date"]),  # 'YYYY-MM-DD' 文字列でOK
-                "game": game,
-                "bb": bb,
-                "rb": rb,
-                "medal": medal,
-            }
+    def _call(self, batch: list[dict]) -> None:
+        self.supabase.table(self.table).upsert(
+            batch, on_conflict=self.on_conflict, returning="minimal"
+        ).execute()
+
+    def _send(self, batch: list[dict]) -> float:
+        """1 バッチを送信してレイテンシを返す（リトライ込み）"""
+        for attempt in range(self.max_retries + 1):
+            t0 = time.perf_counter()
+            try:
+                self._call(batch)
+                latency = time.perf_counter() - t0
+                METRICS.observe("supabase_batch_seconds", latency, self.table)
+                return latency
+            except Exception as e:
+                if attempt == self.max_retries or not is_transient(e):
+                    raise
+                self.retries += 1
+                METRICS.incr("supabase_retries")
+                delay = config.SUPABASE_RETRY_BASE_DELAY * 2**attempt
+                delay += random.uniform(0, delay)
+                logger.warning(
+                    "%s upsert 失敗 (%d 件, %d/%d 回目): %s → %.1f 秒後にリトライ",
+                    self.table,
+                    len(batch),
+                    attempt + 1,
+                    self.max_retries,
+                    e,
+                    delay,
+                )
+                time.sleep(delay)
+
+    def _adapt(self, latency: float) -> None:
+        if latency > self.target_latency * 1.5:
+            self.batch_size = max(self.min_batch_size, self.batch_size // 2)
+        elif latency < self.target_latency / 2:
+            self.batch_size = min(self.max_batch_size, self.batch_size * 2)
+
+    def run(self, records: list[dict]) -> int:
+        """records を送信し、送信に成功した件数を返す"""
+        pos = 0
+        pending = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while pos < len(records) or pending:
+                while pos < len(records) and len(pending) < self.workers:
+                    batch = records[pos : pos + self.batch_size]
+                    pos += len(batch)
+                    pending[pool.submit(self._send, batch)] = batch
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    batch = pending.pop(future)
+                    try:
+                        latency = future.result()
+                    except Exception as e:
+                        logger.error("%s upsert 失敗: %d 件: %s", self.table, len(batch), e)
+                        self.failed.extend(batch)
+                        METRICS.incr("supabase_failed_rows", len(batch))
+                        continue
+                    self.sent += len(batch)
+                    self.latencies.append(latency)
+                    logger.debug("%s batch %d 件: %.3f 秒", self.table, len(batch), latency)
+                    self._adapt(latency)
+
+        if self.failed:
+            self.write_dead_letter()
+        return self.sent
+
+    def write_dead_letter(self) -> str:
+        os.makedirs(self.dead_letter_dir, exist_ok=True)
+        stamp = dt.datetime.now().strftime("%Y%m%d_%H%M%S")
+        path = os.path.join(self.dead_letter_dir, f"{self.table}_{stamp}.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            for row in self.failed:
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        logger.error("送信できなかった %d 件をデッドレターに保存: %s", len(self.failed), path)
+        return path
+
+    def log_summary(self) -> None:
+        if not self.latencies:
+            return
+        lat = sorted(self.latencies)
+        logger.info(
+            "%s: %d batches / latency p50 %.3f 秒, max %.3f 秒 / retries %d / 最終 batch_size %d",
+            self.table,
+            len(lat),
+            lat[len(lat) // 2],
+            lat[-1],
+            self.retries,
+            self.batch_size,
         )
 
+
+class RpcBatchUploader(BatchUploader):
+    """
+    BatchUploader のテーブル upsert の代わりに、バッチごとに RPC（p_rows）を呼ぶ
+    応答の keys（取り込んだ (hall_id, date)）を self.keys に集める
+    """
+
+    def __init__(self, supabase: Client, function: str, **kwargs):
+        super().__init__(supabase, function, on_conflict="", **kwargs)
+        self.keys: list[tuple[int, str]] = []
+        self._keys_lock = threading.Lock()
+
+    def _call(self, batch: list[dict]) -> None:
+        res = self.supabase.rpc(self.table, {"p_rows": batch, "p_refresh": False}).execute()
+        keys = [(k["hall_id"], k["date"]) for k in (res.data or {}).get("keys", [])]
+        with self._keys_lock:
+            self.keys.extend(keys)
+
+
+def add_data_result(df: pd.DataFrame, supabase: Client, cache: IdCache | None = None) -> None:
+    """--- results テーブルへデータ登録 ---"""
+
+    # 1) ID マップはローカルキャッシュから（足りない名前だけ問い合わせる）
+    cache = cache or load_id_cache()
+    fetch_missing_ids(df, supabase, cache)
+
+    # 2) DataFrame から results 用レコードを作成
+    records = build_result_records(df, cache.prefectures, cache.halls, cache.models)
     if not records:
         print("results に挿入するデータがありません。")
         return
 
-    # 3) 一括 upsert（unique(hall_id, model_id, unit_no, date) を想定）
-    #    行数が多い場合はバッチに分けるとよい
-    batch_size = 500
-    inserted = 0
-    for i in range(0, len(records), batch_size):
-        batch = records[i : i + batch_size]
-        supabase.table("results").upsert(
-            batch,
-            on_conflict="hall_id,model_id,unit_no,date",
-        ).execute()
-        inserted += len(batch)
+    # 3) バッチに分けて並列 upsert（unique(hall_id, model_id, unit_no, date) を想定）
+    start = time.perf_counter()
+    uploader = BatchUploader(supabase, "results", "hall_id,model_id,unit_no,date")
+    inserted = uploader.run(records)
+    uploader.log_summary()
+    if uploader.failed:
+        # 外部キー違反などキャッシュの ID が古い可能性があるため、次回は取り直す
+        cache.invalidate()
+    # 取り込んだ (hall_id, date) の集計テーブルを更新する
+    refresh_aggregates_supabase(supabase, ((r["hall_id"], r["date"]) for r in records))
 
+    elapsed = time.perf_counter() - start
+    METRICS.observe("load_supabase_seconds", elapsed)
+    METRICS.observe("load_supabase_rows_per_sec", inserted / elapsed if elapsed else 0.0)
+    METRICS.incr("supabase_rows", inserted)
     print(f"results upsert: {inserted} 件（新規/既存含む）")
+    logger.info("results upsert: %.2f 秒", elapsed)
 
 
-def main():
-    CSV_PATH = "data/csv/halls_date_cleaner.csv"
+INGEST_COLUMNS = ["pref", "hall", "model", "unit_no", "date", *NUMERIC_COLUMNS[1:]]
+
+
+def build_ingest_records(df: pd.DataFrame) -> list[dict]:
+    """
+    ingest_results 用の名前つきレコード（ID は Postgres 側で引く）
+    同じ (hall, date) がなるべく同じバッチに入るよう並べる（集計テーブルの更新が重ならないように）
+    """
+    missing = df[["pref", "hall", "model"]].isna().any(axis=1)
+    if missing.any():
+        logger.warning("⚠ pref / hall / model なし: %d 行", int(missing.sum()))
+    df = _numeric_rows(df.loc[~missing])
+    df = df.assign(
+        pref=df["pref"].astype(str),
+        hall=df["hall"].astype(str),
+        model=df["model"].astype(str),
+        date=df["date"].astype(str),
+    )
+    df = df.sort_values(["pref", "hall", "date"], kind="stable")
+    return df[INGEST_COLUMNS].to_dict("records")
+
+
+def ingest_results(df: pd.DataFrame, supabase: Client) -> int:
+    """
+    --- results をまとめて取り込む（supabase/migrations の ingest_results 関数）---
+    都道府県・ホール・機種の登録と ID の解決、results の upsert を
+    Postgres の中でバッチごとに 1 トランザクションで行う（往復はバッチ数だけ）
+    集計テーブルは全バッチの後に、取り込んだ (hall_id, date) の分をまとめて更新する
+    returns: 送信に成功した行数
+    """
+    records = build_ingest_records(df)
+    if not records:
+        print("results に挿入するデータがありません。")
+        return 0
+
+    start = time.perf_counter()
+    uploader = RpcBatchUploader(supabase, "ingest_results")
+    inserted = uploader.run(records)
+    uploader.log_summary()
+    # バッチごとに更新すると並列のトランザクションで同じ集計行がぶつかるため、最後に 1 回
+    refresh_aggregates_supabase(supabase, uploader.keys)
+
+    elapsed = time.perf_counter() - start
+    METRICS.observe("load_supabase_seconds", elapsed)
+    METRICS.observe("load_supabase_rows_per_sec", inserted / elapsed if elapsed else 0.0)
+    METRICS.incr("supabase_rows", inserted)
+    print(f"results ingest: {inserted} 件（新規/既存含む）")
+    logger.info("results ingest: %.2f 秒 / %d batches", elapsed, len(uploader.latencies))
+    return inserted
+
 
-    df = pd.read_csv(CSV_PATH)
+def load_results(df: pd.DataFrame, supabase: Client, cache: IdCache | None = None) -> None:
+    """config.SUPABASE_INGEST に従って results を取り込む（"rpc" or "rest"）"""
+    if config.SUPABASE_INGEST == "rpc":
+        ingest_results(df, supabase)
+        return
+    cache = cache or load_id_cache()
+    add_model(df, supabase, cache)
+    add_prefecture_and_hall(df, supabase, cache)
+    add_data_result(df, supabase, cache)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="results を Supabase に取り込む")
+    add_source_args(parser)
+    args = parser.parse_args()
 
-    supabase = get_supabase_client()
+    df = load_clean_data(
+        args.source,
+        columns=LOAD_COLUMNS,
+        date_from=args.date_from,
+        date_to=args.date_to,
+        halls=args.hall,
+    )
 
-    add_model(df, supabase)
-    add_prefecture_and_hall(df, supabase)
-    add_data_result(df, supabase)
+    load_results(df, get_supabase_client())
+    METRICS.write_report("df_to_supabase")
 
 
 if __name__ == "__main__":
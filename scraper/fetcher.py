@@ -0,0 +1,267 @@
+from contextlib import ExitStack
+from playwright.sync_api import Page, TimeoutError as PWTimeout
+import os
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import config
+from browser_manager import BrowserManager
+from logger_steup import setup_logger
+from page_parser import PAGE_BODY_CSS, has_selector
+from metrics import METRICS
+from page_cache import CachingFetcher, PageCache
+from retry import FetchError, PermanentFetchError, RetryingFetcher
+from wait_policy import WAIT_POLICY
+
+# =========================
+# 設定・ロガー
+# =========================
+filename, ext = os.path.splitext(os.path.basename(__file__))
+logger = setup_logger(filename, log_file=config.LOG_PATH)
+
+
+# =========================
+# フェッチャー
+# =========================
+# どのフェッチャーも fetch(url, selector, ...) -> HTML | None を持つ
+#   selector: ページに必須の要素。見つからなければ None を返す（データなし）
+#   タイムアウト・ネットワークエラーは例外（RetryingFetcher がリトライし、FetchError にする）
+class BrowserFetcher:
+    """Playwright の Page で描画後の HTML を取得する"""
+
+    name = "browser"
+
+    def __init__(self, browser: BrowserManager | None = None, page: Page | None = None):
+        # page を直接渡すか、BrowserManager から必要になった時点で払い出す
+        self.browser = browser
+        self._page = page
+        self._stack = ExitStack()
+        self.pages = 0
+        self.elapsed = 0.0
+
+    def __enter__(self) -> "BrowserFetcher":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    @property
+    def page(self) -> Page:
+        if self._page is None:
+            self._page = self._stack.enter_context(self.browser.page())
+        return self._page
+
+    def _renew_page(self) -> bool:
+        """ブラウザ切断・リサイクル回数到達なら Page を閉じて払い出し直す"""
+        if self.browser is None or self._page is None or not self.browser.is_stale():
+            return False
+        self.close()
+        return True
+
+    def _navigate(self, url: str, reload: bool = False) -> None:
+        # 新しい Page には再読み込みする URL が無いので goto で開き直す
+        if self._renew_page():
+            reload = False
+        timeout = WAIT_POLICY.timeout_ms("navigate")
+        t0 = time.perf_counter()
+        try:
+            with METRICS.timer("navigate", url):
+                if reload:
+                    self.page.reload(timeout=timeout, wait_until="domcontentloaded")
+                else:
+                    self.page.goto(url, timeout=timeout, wait_until="domcontentloaded")
+        except PWTimeout:
+            WAIT_POLICY.observe("navigate", timeout / 1000)
+            raise
+        WAIT_POLICY.observe("navigate", time.perf_counter() - t0)
+
+    def _wait(self, url: str, selector: str, timeout: int | None) -> bool:
+        """必須要素（データ）が現れるまで待つ（現れなければ False）"""
+        timeout = timeout or WAIT_POLICY.timeout_ms(selector)
+        t0 = time.perf_counter()
+        try:
+            with METRICS.timer("wait_selector", url):
+                self.page.wait_for_selector(selector, timeout=timeout, state="attached")
+        except PWTimeout:
+            WAIT_POLICY.observe(selector, timeout / 1000)
+            METRICS.incr("selector_timeouts")
+            return False
+        WAIT_POLICY.observe(selector, time.perf_counter() - t0)
+        return True
+
+    def fetch(
+        self, url: str, selector: str, timeout: int | None = None, reload: bool = False
+    ) -> str | None:
+        """
+        timeout: 必須要素の待ち時間（ミリ秒）。None なら WAIT_POLICY で決める
+        reload: 必須要素が現れなかった場合に 1 回だけ再読み込みして待ち直す
+        （JS でテーブルを描画中のこともあるため、再読み込みしても無い場合だけデータなしとする）
+        """
+        t0 = time.perf_counter()
+        try:
+            self._navigate(url)
+            found = self._wait(url, selector, timeout)
+            if not found and reload:
+                METRICS.incr("reloads")
+                self._navigate(url, reload=True)
+                found = self._wait(url, selector, timeout)
+            if found:
+                return self.page.content()
+            body = PAGE_BODY_CSS.get(selector)
+            if body and self.page.query_selector(body) is not None:
+                logger.info("データのないページです: %s", url)
+                METRICS.incr("empty_pages")
+            return None
+        finally:
+            self.pages += 1
+            self.elapsed += time.perf_counter() - t0
+
+    def close(self) -> None:
+        self._stack.close()
+        self._page = None
+
+
+def create_http_session() -> requests.Session:
+    """keep-alive / コネクションプール付きのセッション"""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=config.HTTP_POOL_SIZE, pool_maxsize=config.HTTP_POOL_SIZE
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"User-Agent": config.USER_AGENT})
+    return session
+
+
+class HttpFetcher:
+    """
+    HTTP で生 HTML を取得する（ブラウザを使わない高速パス）
+    selector が生 HTML に無い場合だけ fallback（BrowserFetcher）で取り直す
+    """
+
+    name = "http"
+
+    def __init__(
+        self,
+        fallback: BrowserFetcher | None = None,
+        session: requests.Session | None = None,
+    ):
+        self.fallback = fallback
+        self.session = session or create_http_session()
+        self._own_session = session is None
+        self.pages = 0
+        self.fallbacks = 0
+        self.elapsed = 0.0
+
+    def __enter__(self) -> "HttpFetcher":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def get(self, url: str) -> str | None:
+        """
+        生 HTML を取得する（ページが無い 404/410 は None）
+        429 以外の 4xx は PermanentFetchError（リトライしない）、それ以外の失敗は FetchError
+        """
+        t0 = time.perf_counter()
+        try:
+            with METRICS.timer("http_get", url):
+                res = self.session.get(url, timeout=config.HTTP_TIMEOUT)
+            METRICS.incr("http_bytes", len(res.content))
+            if res.status_code in (404, 410):
+                # ページが無い（データなし）。リトライ・ブラウザでの取り直しはしない
+                logger.info("ページがありません (%d): %s", res.status_code, url)
+                return None
+            if 400 <= res.status_code < 500 and res.status_code != 429:
+                # 403 / 401 / 400 などはリトライしても変わらない
+                METRICS.incr("http_errors")
+                raise PermanentFetchError(f"{res.status_code} {res.reason}: {url}")
+            res.raise_for_status()
+            res.encoding = res.encoding or res.apparent_encoding
+            return res.text
+        except requests.RequestException as e:
+            # タイムアウト・5xx などは RetryingFetcher がリトライする
+            METRICS.incr("http_errors")
+            raise FetchError(str(e)) from e
+        finally:
+            self.pages += 1
+            self.elapsed += time.perf_counter() - t0
+
+    def fetch(
+        self, url: str, selector: str, timeout: int | None = None, reload: bool = False
+    ) -> str | None:
+        html = self.get(url)
+        if html is None:
+            return None
+        if has_selector(html, selector):
+            return html
+
+        if self.fallback is None:
+            return None
+        logger.info("生 HTML に %s が無いためブラウザで取得します: %s", selector, url)
+        self.fallbacks += 1
+        METRICS.incr("browser_fallbacks")
+        return self.fallback.fetch(url, selector, timeout=timeout, reload=reload)
+
+    def close(self) -> None:
+        if self.fallback is not None:
+            self.fallback.close()
+        if self._own_session:
+            self.session.close()
+
+
+def create_fetcher(
+    browser: BrowserManager,
+    mode: str = config.FETCH_MODE,
+    page_cache: PageCache | None = None,
+) -> RetryingFetcher | CachingFetcher:
+    """
+    config.FETCH_MODE に応じたフェッチャーを作る
+    ネットワークに接続するものは RetryingFetcher で包む（失敗時は FetchError）
+    page_cache を渡すとキャッシュを前に置く（mode="replay" はキャッシュのみ）
+    """
+    if mode == "replay":
+        return CachingFetcher(None, page_cache, replay=True)
+    if mode == "http":
+        fetcher = RetryingFetcher(HttpFetcher(fallback=BrowserFetcher(browser)))
+    else:
+        fetcher = RetryingFetcher(BrowserFetcher(browser))
+    if page_cache is not None:
+        return CachingFetcher(fetcher, page_cache)
+    return fetcher
+
+
+def as_fetcher(page_or_fetcher) -> RetryingFetcher | BrowserFetcher | CachingFetcher:
+    """Playwright の Page が渡された場合は BrowserFetcher（リトライ付き）で包む"""
+    if hasattr(page_or_fetcher, "fetch"):
+        return page_or_fetcher
+    return RetryingFetcher(BrowserFetcher(page=page_or_fetcher))
+
+
+class FetchStats:
+    """モード別の取得ページ数と pages/sec を集計する"""
+
+    def __init__(self):
+        self.pages: dict[str, int] = {}
+        self.elapsed: dict[str, float] = {}
+
+    def add(self, fetcher) -> None:
+        """キャッシュ (inner) とフォールバック (fallback) の先も合わせて集計する"""
+        if fetcher is None:
+            return
+        self.pages[fetcher.name] = self.pages.get(fetcher.name, 0) + fetcher.pages
+        self.elapsed[fetcher.name] = self.elapsed.get(fetcher.name, 0.0) + fetcher.elapsed
+        self.add(getattr(fetcher, "inner", None))
+        self.add(getattr(fetcher, "fallback", None))
+
+    def log_summary(self) -> None:
+        for name, pages in self.pages.items():
+            sec = self.elapsed[name]
+            rate = pages / sec if sec else 0.0
+            logger.info(
+                "取得 [%s]: %d ページ / %.2f 秒 (%.2f pages/sec)", name, pages, sec, rate
+            )
+        WAIT_POLICY.log_summary()
@@ -0,0 +1,93 @@
+import json
+import os
+import time
+
+import config
+from logger_steup import setup_logger
+
+# =========================
+# 設定・ロガー
+# =========================
+filename, ext = os.path.splitext(os.path.basename(__file__))
+logger = setup_logger(filename, log_file=config.LOG_PATH)
+
+
+# =========================
+# 名前 → ID キャッシュ
+# =========================
+class IdCache:
+    """
+    Supabase の prefectures / halls / models の 名前 → ID をローカルに保存する
+    - 接続先 (SUPABASE_URL) が変わった場合と TTL 切れの場合は破棄する
+    - halls のキーは (prefecture_id, name)
+    """
+
+    def __init__(self, source: str = "", path: str = config.ID_CACHE_PATH):
+        self.source = source
+        self.path = path
+        self.prefectures: dict[str, int] = {}
+        self.halls: dict[tuple[int, str], int] = {}
+        self.models: dict[str, int] = {}
+        self.saved_at = time.time()
+
+    @classmethod
+    def load(
+        cls,
+        source: str = "",
+        path: str = config.ID_CACHE_PATH,
+        ttl_sec: float = config.ID_CACHE_TTL_SEC,
+    ) -> "IdCache":
+        cache = cls(source, path)
+        if not os.path.exists(path):
+            return cache
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("ID キャッシュを読み込めません: %s", e)
+            return cache
+
+        if data.get("source") != source:
+            logger.info("接続先が変わったため ID キャッシュを破棄します")
+            return cache
+        if time.time() - data.get("saved_at", 0) > ttl_sec:
+            logger.info("ID キャッシュの有効期限切れ")
+            return cache
+
+        cache.saved_at = data["saved_at"]
+        cache.prefectures = data.get("prefectures", {})
+        cache.models = data.get("models", {})
+        cache.halls = {
+            (int(pid), name): hid for pid, name, hid in data.get("halls", [])
+        }
+        logger.info(
+            "ID キャッシュ: 都道府県 %d / ホール %d / 機種 %d",
+            len(cache.prefectures),
+            len(cache.halls),
+            len(cache.models),
+        )
+        return cache
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        data = {
+            "source": self.source,
+            "saved_at": self.saved_at,
+            "prefectures": self.prefectures,
+            "models": self.models,
+            "halls": [[pid, name, hid] for (pid, name), hid in self.halls.items()],
+        }
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    def invalidate(self) -> None:
+        """ID が DB と食い違っている可能性がある場合に呼ぶ"""
+        logger.warning("ID キャッシュを破棄します: %s", self.path)
+        self.prefectures.clear()
+        self.halls.clear()
+        self.models.clear()
+        self.saved_at = time.time()
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -1,13 +1,40 @@
 # ============================
 # logger_setup.py
 # ============================
+import atexit
+import datetime as dt
+import json
 import logging
+import logging.handlers
+import os
+import queue
 from colorlog import ColoredFormatter
 
+import config
 
-def setup_logger(name="scraper", log_file=None, level=logging.DEBUG):
-    """logのコンソール及び、ファイル出力"""
-    
+# ログ出力先（log_file）ごとに 1 つのキューとリスナーを共有する
+# 各モジュールのロガーは QueueHandler でキューに積むだけで、整形・ファイル書き込みは
+# リスナーのスレッドで行う（スクレイピングのループでファイル I/O を待たない）
+_QUEUES: dict[str | None, queue.Queue] = {}
+_LISTENERS: list[logging.handlers.QueueListener] = []
+
+
+class JsonFormatter(logging.Formatter):
+    """1 レコード 1 行の JSON（run レポートと突き合わせる用）"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": dt.datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def _console_handler() -> logging.Handler:
     formatter = ColoredFormatter(
         "%(log_color)s[%(asctime)s] [%(levelname)s]%(reset)s %(message)s",
         datefmt="%Y-%m-%d %H:%M:%S",
@@ -19,27 +46,111 @@ def setup_logger(name="scraper", log_file=None, level=logging.DEBUG):
             "CRITICAL": "bold_red",
         },
     )
-
-    logger = logging.getLogger(name)
-    logger.setLevel(level)
-    logger.handlers = []  # avoid duplicate logs
-
     stream_handler = logging.StreamHandler()
     stream_handler.setFormatter(formatter)
-    logger.addHandler(stream_handler)
+    return stream_handler
+
+
+def _file_handler(path: str, formatter: logging.Formatter) -> logging.Handler:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    file_handler = logging.handlers.RotatingFileHandler(
+        path,
+        maxBytes=config.LOG_MAX_BYTES,
+        backupCount=config.LOG_BACKUP_COUNT,
+        encoding="utf-8",
+    )
+    file_handler.setFormatter(formatter)
+    return file_handler
+
+
+def _shared_queue(log_file: str | None) -> queue.Queue:
+    """log_file 用のキューと、コンソール・ファイルに書き出すリスナー（初回のみ作る）"""
+    if log_file in _QUEUES:
+        return _QUEUES[log_file]
 
+    handlers = [_console_handler()]
     if log_file:
-        file_handler = logging.FileHandler(log_file, encoding="utf-8")
-        file_handler.setFormatter(
-            logging.Formatter("[%(asctime)s] [%(levelname)s] [%(name)s] %(message)s")
+        handlers.append(
+            _file_handler(
+                log_file,
+                logging.Formatter("[%(asctime)s] [%(levelname)s] [%(name)s] %(message)s"),
+            )
         )
-        logger.addHandler(file_handler)
+        if config.LOG_JSON_PATH:
+            json_handler = _file_handler(config.LOG_JSON_PATH, JsonFormatter())
+            json_handler.setLevel(config.LOG_JSON_LEVEL)
+            handlers.append(json_handler)
+
+    q: queue.Queue = queue.Queue(-1)
+    listener = logging.handlers.QueueListener(q, *handlers, respect_handler_level=True)
+    listener.start()
+    _QUEUES[log_file] = q
+    _LISTENERS.append(listener)
+    return q
+
+
+def split_log_files(suffix: str) -> None:
+    """
+    ログファイルを suffix 付きの別ファイルに切り替える（例: minrepo_shard1of4.log）
+    shard.py run のように同じマシンで並列に動くプロセスが 1 つのファイルを
+    RotatingFileHandler で共有すると、ローテーションで互いのログを消してしまうため
+    """
+    for listener in _LISTENERS:
+        # 書き込み中のハンドラを差し替えないよう、リスナーを止めてから入れ替える
+        listener.stop()
+        handlers = []
+        for handler in listener.handlers:
+            if isinstance(handler, logging.handlers.RotatingFileHandler):
+                root, ext = os.path.splitext(handler.baseFilename)
+                new_handler = _file_handler(root + suffix + ext, handler.formatter)
+                new_handler.setLevel(handler.level)
+                handler.close()
+                handler = new_handler
+            handlers.append(handler)
+        listener.handlers = tuple(handlers)
+        listener.start()
+
+
+@atexit.register
+def flush_logs() -> None:
+    """キューに残ったログを書き出してリスナーを止める（終了時に自動で呼ばれる）"""
+    while _LISTENERS:
+        _LISTENERS.pop().stop()
+    _QUEUES.clear()
+
+
+def setup_logger(name="scraper", log_file=None, level=logging.DEBUG):
+    """logのコンソール及び、ファイル出力（同じ log_file のロガーはハンドラを共有する）"""
+
+    logger = logging.getLogger(name)
+    logger.setLevel(level)
+    logger.handlers = []  # avoid duplicate logs
+    logger.addHandler(logging.handlers.QueueHandler(_shared_queue(log_file)))
 
     return logger
 
 
+def log_rows_sampled(logger: logging.Logger, rows: list, label: str = "") -> None:
+    """
+    行データの DEBUG ログは先頭 config.LOG_ROW_SAMPLE 行だけを 1 レコードにまとめて出す
+    DEBUG が無効なら何もしない（行の文字列化もしない）
+    """
+    if not rows or not logger.isEnabledFor(logging.DEBUG):
+        return
+    sample = rows[: config.LOG_ROW_SAMPLE]
+    rest = len(rows) - len(sample)
+    logger.debug(
+        "%s 行データ %d 件中 %d 件:\n%s%s",
+        label,
+        len(rows),
+        len(sample),
+        "\n".join(map(str, sample)),
+        f"\n... 他 {rest} 行" if rest else "",
+    )
+
+
 if __name__ == "__main__":
-    
+
     log_path = "C:\python\slotDataAnalysis\minrepo_01\data\log\log_test.log"
     logger = setup_logger("logger_setup", log_file=log_path)
-    logger.info("log_test")
\ No newline at end of file
+    logger.info("log_test")
@@ -0,0 +1,196 @@
+from contextlib import contextmanager
+import datetime as dt
+import functools
+import inspect
+import json
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+import config
+from logger_steup import setup_logger
+
+# =========================
+# 設定・ロガー
+# =========================
+filename, ext = os.path.splitext(os.path.basename(__file__))
+logger = setup_logger(filename, log_file=config.LOG_PATH)
+
+
+# =========================
+# 計測
+# =========================
+class Metrics:
+    """
+    処理段階ごとの計測値（秒数・行数など）とカウンタを集める
+    - observe(series, value, label): 分布として記録し、p50/p95/max を出す
+      label には URL やホール名を渡す（遅いページの特定用）
+    - incr(counter, n): 合計値（リトライ回数・転送バイト数など）
+    sync / async / スレッドのどこから呼んでもよい
+    """
+
+    def __init__(self, slowest: int = config.METRICS_SLOWEST):
+        self.slowest = slowest
+        self.series: dict[str, list[tuple[float, str]]] = {}
+        self.counters: dict[str, float] = {}
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+
+    def observe(self, series: str, value: float, label: str = "") -> None:
+        with self._lock:
+            self.series.setdefault(series, []).append((value, label))
+
+    def incr(self, counter: str, n: float = 1) -> None:
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + n
+
+    @contextmanager
+    def timer(self, stage: str, label: str = ""):
+        """with ブロックの経過時間を <stage>_seconds に記録する"""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(f"{stage}_seconds", time.perf_counter() - t0, label)
+
+    def timed(self, stage: str, label_arg: str | None = None):
+        """
+        関数（async 関数も可）の実行時間を記録するデコレータ
+        label_arg: ラベルに使う引数名（例: "hall_url"）
+        """
+
+        def decorator(func):
+            sig = inspect.signature(func)
+
+            def label_of(args, kwargs) -> str:
+                if label_arg is None:
+                    return ""
+                bound = sig.bind_partial(*args, **kwargs)
+                return str(bound.arguments.get(label_arg, ""))
+
+            if inspect.iscoroutinefunction(func):
+
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    with self.timer(stage, label_of(args, kwargs)):
+                        return await func(*args, **kwargs)
+
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(stage, label_of(args, kwargs)):
+                    return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def samples(self, series: str) -> list[tuple[float, str]]:
+        """series の (値, ラベル) をすべて返す"""
+        with self._lock:
+            return list(self.series.get(series, []))
+
+    def reset(self) -> None:
+        with self._lock:
+            self.series.clear()
+            self.counters.clear()
+            self.started_at = time.time()
+
+    # ---------- 集計 ----------
+    def summary(self) -> dict:
+        with self._lock:
+            series = {k: list(v) for k, v in self.series.items()}
+            counters = dict(self.counters)
+
+        stats = {}
+        for name, samples in sorted(series.items()):
+            values = np.array([v for v, _ in samples], dtype="float64")
+            worst = sorted(samples, key=lambda s: s[0], reverse=True)[: self.slowest]
+            stats[name] = {
+                "count": int(values.size),
+                "sum": float(values.sum()),
+                "p50": float(np.percentile(values, 50)),
+                "p95": float(np.percentile(values, 95)),
+                "max": float(values.max()),
+                "slowest": [{"value": v, "label": label} for v, label in worst if label],
+            }
+        return {
+            "started_at": dt.datetime.fromtimestamp(self.started_at).isoformat(timespec="seconds"),
+            "elapsed_seconds": time.time() - self.started_at,
+            "series": stats,
+            "counters": counters,
+        }
+
+    # ---------- 出力 ----------
+    def write_report(self, name: str, out_dir: str = config.METRICS_DIR) -> dict:
+        """
+        <out_dir>/<name>.json と <name>.prom（node_exporter textfile 形式）を書き出す
+        JSON は <name>_<日時>.json としても残し、実行ごとの比較に使う
+        """
+        report = {"run": name, **self.summary()}
+        os.makedirs(out_dir, exist_ok=True)
+
+        payload = json.dumps(report, ensure_ascii=False, indent=2)
+        stamp = dt.datetime.now().strftime("%Y%m%d_%H%M%S")
+        for path in (
+            os.path.join(out_dir, f"{name}.json"),
+            os.path.join(out_dir, f"{name}_{stamp}.json"),
+        ):
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(payload)
+
+        prom_path = os.path.join(out_dir, f"{name}.prom")
+        tmp = prom_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(to_prometheus(report))
+        os.replace(tmp, prom_path)  # textfile collector が書きかけを読まないように
+
+        self.log_summary(report)
+        return report
+
+    def log_summary(self, report: dict | None = None) -> None:
+        report = report or self.summary()
+        for name, s in report["series"].items():
+            logger.info(
+                "%s: n=%d p50=%.3f p95=%.3f max=%.3f",
+                name,
+                s["count"],
+                s["p50"],
+                s["p95"],
+                s["max"],
+            )
+        for name, value in sorted(report["counters"].items()):
+            logger.info("%s: %g", name, value)
+
+
+def _metric_name(name: str) -> str:
+    return "minrepo_" + re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+def to_prometheus(report: dict) -> str:
+    """run report を Prometheus の textfile 形式に変換する（分布は summary 型）"""
+    run = report["run"]
+    lines: list[str] = []
+    for name, s in report["series"].items():
+        metric = _metric_name(name)
+        lines.append(f"# TYPE {metric} summary")
+        for q, key in (("0.5", "p50"), ("0.95", "p95"), ("1", "max")):
+            lines.append(f'{metric}{{run="{run}",quantile="{q}"}} {s[key]:.6g}')
+        lines.append(f'{metric}_sum{{run="{run}"}} {s["sum"]:.6g}')
+        lines.append(f'{metric}_count{{run="{run}"}} {s["count"]}')
+    for name, value in sorted(report["counters"].items()):
+        metric = _metric_name(name) + "_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f'{metric}{{run="{run}"}} {value:.6g}')
+    metric = _metric_name("run_elapsed_seconds")
+    lines.append(f"# TYPE {metric} gauge")
+    lines.append(f'{metric}{{run="{run}"}} {report["elapsed_seconds"]:.6g}')
+    return "\n".join(lines) + "\n"
+
+
+# プロセス全体で共有する計測値
+METRICS = Metrics()
@@ -0,0 +1,77 @@
+import os
+import re
+
+import yaml
+
+import config
+from logger_steup import setup_logger
+from utils import normalize_model_name
+
+# =========================
+# 設定・ロガー
+# =========================
+filename, ext = os.path.splitext(os.path.basename(__file__))
+logger = setup_logger(filename, log_file=config.LOG_PATH)
+
+
+# =========================
+# 機種カタログ（models.yaml）
+# =========================
+# 日付ページの機種リンクの絞り込みと、機種名の正式名への置き換えを 1 か所で行う
+# 照合キーは 正規化（NFKC + 空白の整理）+ 空白除去 した文字列
+def match_key(text: str) -> str:
+    return normalize_model_name(text).replace(" ", "")
+
+
+class ModelCatalog:
+    """
+    series（対象シリーズ）と models（正式名・表記ゆれ）から作る照合器
+    - is_target(text): 取得対象の機種か（シリーズ名・正式名・表記ゆれを 1 つの正規表現で探す）
+    - canonical(name): 正式名（カタログに無ければ正規化した名前）
+    読み込み時に 1 回だけ組み立て、ページごとには作り直さない
+    """
+
+    def __init__(self, series: list[str], models: list[dict]):
+        self.series = [normalize_model_name(s) for s in series]
+        self._names: dict[str, str] = {}
+        for m in models:
+            name = normalize_model_name(m["name"])
+            for alias in [m["name"], *(m.get("aliases") or [])]:
+                key = match_key(alias)
+                if self._names.get(key, name) != name:
+                    raise ValueError(f"表記ゆれが複数の機種に登録されています: {alias}")
+                self._names[key] = name
+
+        # 長いものから並べる（同じ位置で短い語に先に一致しないように）
+        words = {match_key(s) for s in self.series} | set(self._names)
+        words = sorted((w for w in words if w), key=len, reverse=True)
+        self._pattern = re.compile("|".join(map(re.escape, words))) if words else None
+
+    @classmethod
+    def load(cls, path: str = config.MODEL_CATALOG_YAML) -> "ModelCatalog":
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"YAMLが見つかりません: {path}")
+        with open(path, "r", encoding="utf-8") as f:
+            cfg = yaml.safe_load(f) or {}
+        catalog = cls(cfg.get("series") or [], cfg.get("models") or [])
+        logger.debug(
+            "機種カタログ: シリーズ %d 件 / 表記 %d 件", len(catalog.series), len(catalog._names)
+        )
+        return catalog
+
+    def is_target(self, text: str) -> bool:
+        if self._pattern is None:
+            return False
+        return self._pattern.search(match_key(text)) is not None
+
+    def canonical(self, name: str) -> str:
+        norm = normalize_model_name(name)
+        return self._names.get(norm.replace(" ", ""), norm)
+
+    def filter_links(self, links: list[tuple[str, str]]) -> list[tuple[str, str]]:
+        """parse_date_page の (model_text, href) から取得対象の機種だけ残す"""
+        return [(text, href) for text, href in links if self.is_target(text)]
+
+
+# プロセス全体で共有するカタログ
+CATALOG = ModelCatalog.load()
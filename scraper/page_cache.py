@@ -0,0 +1,302 @@
+import asyncio
+from contextlib import contextmanager
+import datetime as dt
+import gzip
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import config
+from logger_steup import setup_logger
+from page_parser import has_selector
+from metrics import METRICS
+
+# =========================
+# 設定・ロガー
+# =========================
+filename, ext = os.path.splitext(os.path.basename(__file__))
+logger = setup_logger(filename, log_file=config.LOG_PATH)
+
+
+# =========================
+# ページキャッシュ
+# =========================
+class PageCache:
+    """
+    取得した HTML を gzip で保存するディスクキャッシュ
+    - 本文は内容の SHA-256 をファイル名にして保存（同じ内容は 1 つだけ）
+    - 索引 (index.db) は (url, 取得日) -> SHA-256
+    - ttl_sec より古いものは通常の取得ではヒットしない（replay では使う）
+    - max_age_days より古いもの、max_bytes を超えた分（使われていない順）は削除する
+    """
+
+    def __init__(
+        self,
+        root: str = config.PAGE_CACHE_DIR,
+        ttl_sec: float = config.PAGE_CACHE_TTL_SEC,
+        max_bytes: int = config.PAGE_CACHE_MAX_BYTES,
+        max_age_days: int = config.PAGE_CACHE_MAX_AGE_DAYS,
+    ):
+        self.root = root
+        self.ttl_sec = ttl_sec
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+
+        # async エンジンではスレッドから呼ばれるためロックで直列化する
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(root, "index.db"), check_same_thread=False)
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT NOT NULL,
+                fetch_date DATE NOT NULL,
+                sha256 TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (url, fetch_date)
+            );
+            CREATE TABLE IF NOT EXISTS objects (
+                sha256 TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            );
+            """
+        )
+        self.conn.commit()
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+
+    def __enter__(self) -> "PageCache":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def _object_path(self, sha256: str) -> str:
+        return os.path.join(self.root, "objects", sha256[:2], sha256 + ".html.gz")
+
+    # ---------- 読み込み ----------
+    def get(self, url: str, fetch_date: str | None = None, replay: bool = False) -> str | None:
+        """
+        通常: 今日取得した ttl_sec 以内のページだけ返す
+        replay: fetch_date 指定があればその日、無ければ最後に取得したページを返す
+        """
+        if replay:
+            sql = "SELECT sha256 FROM pages WHERE url = ?"
+            params: tuple = (url,)
+            if fetch_date:
+                sql += " AND fetch_date = ?"
+                params += (fetch_date,)
+            sql += " ORDER BY fetched_at DESC LIMIT 1"
+        else:
+            sql = "SELECT sha256 FROM pages WHERE url = ? AND fetch_date = ? AND fetched_at >= ?"
+            params = (url, dt.date.today().isoformat(), time.time() - self.ttl_sec)
+
+        with self._lock:
+            row = self.conn.execute(sql, params).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            sha256 = row[0]
+            try:
+                with gzip.open(self._object_path(sha256), "rt", encoding="utf-8") as f:
+                    html = f.read()
+            except OSError:
+                # 索引だけ残っている（手動削除など）場合は無かったことにする
+                self.conn.execute("DELETE FROM pages WHERE sha256 = ?", (sha256,))
+                self.conn.execute("DELETE FROM objects WHERE sha256 = ?", (sha256,))
+                self.conn.commit()
+                self.misses += 1
+                return None
+            self.conn.execute(
+                "UPDATE objects SET last_used = ? WHERE sha256 = ?", (time.time(), sha256)
+            )
+            self.conn.commit()
+            self.hits += 1
+            return html
+
+    # ---------- 書き込み ----------
+    def put(self, url: str, html: str) -> str:
+        """HTML を保存して SHA-256 を返す"""
+        data = html.encode("utf-8")
+        sha256 = hashlib.sha256(data).hexdigest()
+        path = self._object_path(sha256)
+        now = time.time()
+
+        with self._lock:
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp = path + ".tmp"
+                with gzip.open(tmp, "wb") as f:
+                    f.write(data)
+                os.replace(tmp, path)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO objects (sha256, size, last_used) VALUES (?, ?, ?)",
+                (sha256, os.path.getsize(path), now),
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO pages (url, fetch_date, sha256, fetched_at)"
+                " VALUES (?, ?, ?, ?)",
+                (url, dt.date.today().isoformat(), sha256, now),
+            )
+            self.conn.commit()
+            self.stored += 1
+        return sha256
+
+    # ---------- 削除 ----------
+    def evict(self) -> int:
+        """古いページと容量超過分を削除し、削除したファイル数を返す"""
+        removed = 0
+        with self._lock:
+            cutoff = time.time() - self.max_age_days * 24 * 60 * 60
+            self.conn.execute("DELETE FROM pages WHERE fetched_at < ?", (cutoff,))
+            orphans = self.conn.execute(
+                "SELECT sha256 FROM objects WHERE sha256 NOT IN (SELECT sha256 FROM pages)"
+            ).fetchall()
+
+            total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM objects").fetchone()[0]
+            over = [] if total <= self.max_bytes else self.conn.execute(
+                "SELECT sha256, size FROM objects ORDER BY last_used"
+            ).fetchall()
+
+            targets = {sha for (sha,) in orphans}
+            for sha256, size in over:
+                if total <= self.max_bytes:
+                    break
+                targets.add(sha256)
+                total -= size
+
+            for sha256 in targets:
+                self.conn.execute("DELETE FROM pages WHERE sha256 = ?", (sha256,))
+                self.conn.execute("DELETE FROM objects WHERE sha256 = ?", (sha256,))
+                try:
+                    os.remove(self._object_path(sha256))
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+            self.conn.commit()
+
+        if removed:
+            logger.info("ページキャッシュを削除: %d ファイル", removed)
+        return removed
+
+    def log_summary(self) -> None:
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM objects").fetchone()[0]
+        logger.info(
+            "ページキャッシュ: ヒット %d / ミス %d / 保存 %d (%.1f MB)",
+            self.hits,
+            self.misses,
+            self.stored,
+            total / 1024 / 1024,
+        )
+
+
+@contextmanager
+def open_page_cache(fetch_mode: str = config.FETCH_MODE):
+    """
+    fetch_mode が "replay" か config.PAGE_CACHE_ENABLED の場合に PageCache を開く
+    終了時に古いページ・容量超過分を削除する
+    """
+    if fetch_mode != "replay" and not config.PAGE_CACHE_ENABLED:
+        yield None
+        return
+    cache = PageCache()
+    try:
+        yield cache
+    finally:
+        cache.log_summary()
+        if fetch_mode != "replay":
+            cache.evict()
+        cache.close()
+
+
+# =========================
+# フェッチャー
+# =========================
+class CachingFetcher:
+    """
+    別のフェッチャーの前にページキャッシュを置く
+    replay=True の場合はキャッシュだけを使い、ネットワークには一切アクセスしない
+    """
+
+    name = "cache"
+
+    def __init__(
+        self,
+        inner=None,
+        cache: PageCache | None = None,
+        replay: bool = False,
+        replay_date: str | None = config.PAGE_CACHE_REPLAY_DATE,
+    ):
+        self.inner = inner
+        self.cache = cache or PageCache()
+        self.replay = replay
+        self.replay_date = replay_date
+        self.pages = 0
+        self.fallbacks = 0
+        self.elapsed = 0.0
+
+    def __enter__(self) -> "CachingFetcher":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def _cached(self, url: str, selector: str) -> str | None:
+        """キャッシュにあり、selector を含むページ（無ければ None）"""
+        t0 = time.perf_counter()
+        html = self.cache.get(url, self.replay_date, replay=self.replay)
+        self.elapsed += time.perf_counter() - t0
+        if html is not None and has_selector(html, selector):
+            self.pages += 1
+            METRICS.incr("page_cache_hits")
+            return html
+        METRICS.incr("page_cache_misses")
+        if self.replay or self.inner is None:
+            logger.warning("キャッシュにありません: %s", url)
+        return None
+
+    def fetch(
+        self, url: str, selector: str, timeout: int | None = None, reload: bool = False
+    ) -> str | None:
+        html = self._cached(url, selector)
+        if html is not None or self.replay or self.inner is None:
+            return html
+
+        html = self.inner.fetch(url, selector, timeout=timeout, reload=reload)
+        if html is not None:
+            self.cache.put(url, html)
+        return html
+
+    def close(self) -> None:
+        if self.inner is not None:
+            self.inner.close()
+
+
+class AsyncCachingFetcher(CachingFetcher):
+    """
+    CachingFetcher の async 版（async_scraper のフェッチャーを包む）
+    キャッシュの読み書きはスレッドで行い、イベントループを止めない
+    """
+
+    async def fetch(
+        self, url: str, selector: str, timeout: int | None = None, reload: bool = False
+    ) -> str | None:
+        html = await asyncio.to_thread(self._cached, url, selector)
+        if html is not None or self.replay or self.inner is None:
+            return html
+
+        html = await self.inner.fetch(url, selector, timeout=timeout, reload=reload)
+        if html is not None:
+            await asyncio.to_thread(self.cache.put, url, html)
+        return html
+
+    async def close(self) -> None:
+        if self.inner is not None:
+            await self.inner.close()
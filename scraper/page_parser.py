@@ -0,0 +1,126 @@
+import re
+
+from bs4 import BeautifulSoup
+
+from model_catalog import CATALOG, ModelCatalog
+from utils import _norm_text, extract_model_name
+
+# lxml があれば高速なパーサーを使う
+try:
+    import lxml  # noqa: F401
+
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+
+
+# =========================
+# セレクタ
+# =========================
+# ブラウザが補完する tbody に依存しないよう、生 HTML でも描画後の DOM でも
+# 一致する形で書く（wait_for_selector と BeautifulSoup で共用）
+HALL_LINK_CSS = "#content div table tr td a"
+MODEL_LINK_CSS = "table.kishu tr td a"
+MODEL_TITLE_CSS = "div.tab_content > h2"
+MODEL_ROW_CSS = "div > div.table_wrap > table tr"
+
+def _marker(*parts: str) -> re.Pattern:
+    """parts がこの順に現れるかを調べる正規表現"""
+    return re.compile(".*?".join(parts), re.S | re.I)
+
+
+# 生 HTML に必須要素があるかを解析せずに調べる目印（必須要素 -> 正規表現）
+# テーブルの外枠の後に、中身（リンクのあるセル・行）が続くかだけを見る
+_CELL_LINK = r"<td\b[^>]*>\s*<a\b"
+SELECTOR_MARKERS = {
+    HALL_LINK_CSS: _marker(r"""id=["']?content\b""", r"<table\b", _CELL_LINK),
+    MODEL_LINK_CSS: _marker(r"""<table\b[^>]*class=["']?[^"'>]*\bkishu\b""", _CELL_LINK),
+    MODEL_ROW_CSS: _marker(r"""class=["']?[^"'>]*\btable_wrap\b""", r"<table\b", r"<tr\b"),
+}
+
+# ページ本体が描画されたことを示す要素（必須要素 -> 本体）
+# 本体は domcontentloaded の時点で DOM にあるため、待つのは必須要素だけ
+# 待ち直し（再読み込み）ても必須要素が無く、本体がある場合に「データなし」としてログに出す
+PAGE_BODY_CSS = {
+    HALL_LINK_CSS: "#content h1",
+    MODEL_LINK_CSS: "h1",
+    MODEL_ROW_CSS: MODEL_TITLE_CSS,
+}
+
+
+# =========================
+# HTML 解析
+# =========================
+def _soup(html: str) -> BeautifulSoup:
+    return BeautifulSoup(html, HTML_PARSER)
+
+
+def _text(tag) -> str:
+    return _norm_text(tag.get_text()) if tag is not None else ""
+
+
+def has_selector(html: str, css: str) -> bool:
+    """
+    HTML に css の要素が含まれるか
+    セレクタの目印（SELECTOR_MARKERS）があれば正規表現で調べ、HTML は解析しない
+    （フェッチャー・キャッシュが 1 ページごとに呼ぶため。解析は parse_* で 1 回だけ行う）
+    """
+    marker = SELECTOR_MARKERS.get(css)
+    if marker is not None:
+        return marker.search(html) is not None
+    return _soup(html).select_one(css) is not None
+
+
+def parse_hall_page(html: str) -> tuple[str, str, list[tuple[str, str]]]:
+    """
+    ホールページの HTML を 1 回で解析する
+    returns: (h_name, pref, [(date_text, href)])
+    """
+    soup = _soup(html)
+    h_name = _text(soup.select_one("#content h1"))
+    pref = _text(soup.select_one("#content div span.todofuken"))
+    links = [(_text(a), a.get("href") or "") for a in soup.select(HALL_LINK_CSS)]
+    return h_name, pref, links
+
+
+def parse_date_page(html: str) -> tuple[str, list[tuple[str, str]]]:
+    """
+    日付ページの HTML を 1 回で解析する
+    returns: (title, [(model_text, href)])
+    """
+    soup = _soup(html)
+    title = _text(soup.select_one("h1"))
+    links = [(_text(a), a.get("href") or "") for a in soup.select(MODEL_LINK_CSS)]
+    return title, links
+
+
+def parse_model_page(html: str) -> tuple[list[str], list[str], list[list[str]]]:
+    """
+    機種ページの HTML を 1 回で解析する
+    returns: (h2 のテキスト一覧, header, rows)
+    """
+    soup = _soup(html)
+    titles = [_text(h2) for h2 in soup.select(MODEL_TITLE_CSS)]
+
+    header: list[str] = []
+    rows: list[list[str]] = []
+    trs = soup.select(MODEL_ROW_CSS)
+    if trs:
+        header = [_text(th) for th in trs[0].find_all("th", recursive=False)]
+        for tr in trs:
+            row = [_text(td) for td in tr.find_all("td", recursive=False)]
+            if row:  # 空行(th 行)スキップ
+                rows.append(row)
+    return titles, header, rows
+
+
+def pick_model_name(titles: list[str], catalog: ModelCatalog = CATALOG) -> str | None:
+    """
+    h2 のうちカタログの対象機種を優先し、なければ最後の h2 を機種名とする
+    returns: 正式名（h2 が無ければ None）
+    """
+    names = [extract_model_name(t) for t in titles]
+    for name in names:
+        if catalog.is_target(name):
+            return catalog.canonical(name)
+    return (catalog.canonical(names[-1]) if names else "") or None
@@ -0,0 +1,176 @@
+from functools import reduce
+import operator
+import os
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+import config
+from logger_steup import setup_logger
+
+# =========================
+# 設定・ロガー
+# =========================
+filename, ext = os.path.splitext(os.path.basename(__file__))
+logger = setup_logger(filename, log_file=config.LOG_PATH)
+
+
+# df_clean 後の results データのスキーマ
+# - 数値列は int32（"1,234" のような文字列は変換してから保存）
+# - pref / model は辞書エンコード
+# - date / hall はパーティション列（ディレクトリ名 date=.../hall=... に入る）
+NUMERIC_COLUMNS = ["unit_no", "game", "bb", "rb", "medal"]
+PARTITION_COLUMNS = ["date", "hall"]
+# 同じ台の重複判定に使う列（SQLite の idx_results_unique と同じ考え方）
+KEY_COLUMNS = ["date", "hall", "model", "unit_no"]
+# 取り込みに使う列
+LOAD_COLUMNS = ["pref", "hall", "model", "date", *NUMERIC_COLUMNS]
+
+SCHEMA = pa.schema(
+    [
+        ("pref", pa.dictionary(pa.int32(), pa.string())),
+        ("hall", pa.string()),
+        ("model", pa.dictionary(pa.int32(), pa.string())),
+        ("date", pa.string()),
+        *[(c, pa.int32()) for c in NUMERIC_COLUMNS],
+    ]
+)
+PARTITIONING = ds.partitioning(
+    pa.schema([("date", pa.string()), ("hall", pa.string())]), flavor="hive"
+)
+
+
+# =========================
+# 変換
+# =========================
+def to_arrow_table(df: pd.DataFrame) -> pa.Table:
+    """df_clean 後の DataFrame を SCHEMA の Arrow テーブルに変換する"""
+
+    df = df.dropna(subset=["pref", "hall", "model", "date"])
+    numeric = df[NUMERIC_COLUMNS].apply(
+        lambda s: pd.to_numeric(s.astype(str).str.replace(",", ""), errors="coerce")
+    )
+    invalid = numeric.isna().any(axis=1)
+    if invalid.any():
+        logger.warning("数値変換できない行を除外: %d 件", int(invalid.sum()))
+
+    df = df.loc[~invalid, ["pref", "hall", "model", "date"]].astype(str)
+    df = df.assign(**numeric.loc[~invalid].astype("int32"))
+    return pa.Table.from_pandas(df, schema=SCHEMA, preserve_index=False)
+
+
+def _partition_filter(keys: pd.DataFrame) -> ds.Expression:
+    """(date, hall) の組み合わせに一致する行だけを選ぶ条件"""
+    exprs = [
+        (ds.field("date") == d) & (ds.field("hall") == h)
+        for d, h in keys.itertuples(index=False, name=None)
+    ]
+    return reduce(operator.or_, exprs)
+
+
+# =========================
+# 読み書き
+# =========================
+def append_results(df: pd.DataFrame, root: str = config.PARQUET_DIR) -> int:
+    """
+    results データを date/hall パーティションの Parquet に追記する
+    書き込むパーティションだけを既存データとマージして置き換えるため、
+    同じ日付・ホールを取り直しても行は重複しない（新しいデータを優先）
+    returns: 書き込んだパーティションの行数
+    """
+    start = time.perf_counter()
+    table = to_arrow_table(df)
+    if table.num_rows == 0:
+        return 0
+
+    new = table.to_pandas()
+    keys = new[PARTITION_COLUMNS].drop_duplicates()
+    if os.path.isdir(root):
+        existing = ds.dataset(root, schema=SCHEMA, format="parquet", partitioning=PARTITIONING)
+        old = existing.to_table(filter=_partition_filter(keys))
+        if old.num_rows:
+            new = pd.concat([new, old.to_pandas()], ignore_index=True)
+    merged = new.drop_duplicates(subset=KEY_COLUMNS, keep="first")
+    table = pa.Table.from_pandas(merged, schema=SCHEMA, preserve_index=False)
+
+    pq.write_to_dataset(
+        table,
+        root,
+        partitioning=PARTITIONING,
+        existing_data_behavior="delete_matching",
+    )
+    logger.info(
+        "Parquet 書き込み: %d 行 / %d パーティション (%.2f 秒)",
+        table.num_rows,
+        len(keys),
+        time.perf_counter() - start,
+    )
+    return table.num_rows
+
+
+def read_results(
+    root: str = config.PARQUET_DIR,
+    columns: list[str] | None = None,
+    date_from: str | None = None,
+    date_to: str | None = None,
+    halls: list[str] | None = None,
+    models: list[str] | None = None,
+) -> pd.DataFrame:
+    """
+    Parquet から results データを読み込む
+    - columns で読む列を絞る（不要な列はディスクから読まない）
+    - date / hall の条件はパーティション単位で、model は行グループ統計で絞り込む
+    """
+    dataset = ds.dataset(root, schema=SCHEMA, format="parquet", partitioning=PARTITIONING)
+
+    conditions = []
+    if date_from:
+        conditions.append(ds.field("date") >= date_from)
+    if date_to:
+        conditions.append(ds.field("date") <= date_to)
+    if halls:
+        conditions.append(ds.field("hall").isin(halls))
+    if models:
+        conditions.append(ds.field("model").isin(models))
+    condition = reduce(operator.and_, conditions) if conditions else None
+
+    table = dataset.to_table(columns=columns, filter=condition)
+    return table.to_pandas()
+
+
+def load_clean_data(source: str = "auto", **filters) -> pd.DataFrame:
+    """
+    df_to_db / df_to_supabase の入力を読み込む
+    source: "parquet" / "csv" / "auto"（Parquet があれば Parquet）
+    filters は read_results の引数（CSV の場合は読み込み後に同じ条件で絞る）
+    """
+    if source == "auto":
+        source = "parquet" if os.path.isdir(config.PARQUET_DIR) else "csv"
+
+    if source == "parquet":
+        df = read_results(config.PARQUET_DIR, **filters)
+    else:
+        df = pd.read_csv(config.CLEAN_CSV, usecols=filters.get("columns"))
+        if filters.get("date_from"):
+            df = df[df["date"].astype(str) >= filters["date_from"]]
+        if filters.get("date_to"):
+            df = df[df["date"].astype(str) <= filters["date_to"]]
+        if filters.get("halls"):
+            df = df[df["hall"].isin(filters["halls"])]
+        if filters.get("models"):
+            df = df[df["model"].isin(filters["models"])]
+    logger.info("入力データ [%s]: %d 行", source, len(df))
+    return df
+
+
+def add_source_args(parser) -> None:
+    """load_clean_data 用のコマンドライン引数を追加する"""
+    parser.add_argument(
+        "--source", choices=["auto", "parquet", "csv"], default="auto", help="入力データ"
+    )
+    parser.add_argument("--date-from", default=None, help="この日付以降 (YYYY-MM-DD)")
+    parser.add_argument("--date-to", default=None, help="この日付以前 (YYYY-MM-DD)")
+    parser.add_argument("--hall", action="append", default=None, help="対象ホール（複数指定可）")
@@ -0,0 +1,239 @@
+from dataclasses import dataclass
+import os
+import sqlite3
+import time
+from typing import Iterator
+from urllib.parse import quote, urljoin
+
+import pandas as pd
+
+import config
+from logger_steup import setup_logger
+from browser_manager import BrowserManager
+from crawl_state import CrawlState
+from df_clean import clean_results
+import df_to_db
+from fetcher import FetchStats, create_fetcher
+from page_cache import open_page_cache
+from retry import FetchError
+from metrics import METRICS
+from parquet_store import LOAD_COLUMNS, append_results
+from scraping_hall_page import extract_date_url
+from scraping_date_page import extract_model_url
+from scraping_model_page import iter_model_data
+from sqlite_profile import connect_for_ingest
+
+# =========================
+# 設定・ロガー
+# =========================
+filename, ext = os.path.splitext(os.path.basename(__file__))
+logger = setup_logger(filename, log_file=config.LOG_PATH)
+
+
+
+@dataclass
+class PageFrame:
+    """機種ページ 1 件分のデータ"""
+
+    hall: str
+    date: str
+    model_url: str | None  # None は対象機種が無かった日付（df は空）
+    df: pd.DataFrame | None  # None は取得失敗（空の DataFrame はデータなし）
+    last_in_date: bool  # その日付の最後の機種ページか
+
+
+# =========================
+# ステージ 1: 取得
+# =========================
+def iter_page_frames(
+    hall_list: list[config.HallInfo],
+    fetch_mode: str = config.FETCH_MODE,
+    crawl_state: CrawlState | None = None,
+) -> Iterator[PageFrame]:
+    """ホール → 日付 → 機種ページを順に取得し、機種ページ単位で返す"""
+
+    stats = FetchStats()
+    with BrowserManager() as browser, open_page_cache(fetch_mode) as page_cache:
+        for i, h in enumerate(hall_list, start=1):
+            hall_url = urljoin(config.MAIN_URL, quote(h.slug))
+            logger.info("(%d/%d) 処理中: %s", i, len(hall_list), hall_url)
+            hall_start = time.perf_counter()
+            waited = 0.0
+            try:
+                with create_fetcher(browser, fetch_mode, page_cache) as fetcher:
+                    date_urls = extract_date_url(hall_url, fetcher, h.period, crawl_state)
+                    for pref, hall, date, date_url in date_urls:
+                        try:
+                            model_urls = extract_model_url(fetcher, hall, pref, date_url, date)
+                        except FetchError as e:
+                            logger.error("日付ページを取得できません: %s", e)
+                            METRICS.incr("date_pages_failed")
+                            continue
+                        if not model_urls:
+                            # 取り込み後に rows=0 で記録するため、日付だけのフレームを流す
+                            yield PageFrame(hall, date, None, pd.DataFrame(), True)
+                            continue
+                        if crawl_state is not None:
+                            model_urls = crawl_state.filter_models(model_urls)
+                        for n, (key, df) in enumerate(
+                            iter_model_data(fetcher, model_urls), start=1
+                        ):
+                            t0 = time.perf_counter()
+                            yield PageFrame(hall, date, key[4], df, n == len(model_urls))
+                            waited += time.perf_counter() - t0
+                    stats.add(fetcher)
+            except Exception as e:
+                logger.exception("ホール処理でエラー: %s", e)
+            # 取り込み側の時間を含まないよう、yield 中の時間は hall_seconds に入れない
+            METRICS.observe("hall_seconds", time.perf_counter() - hall_start - waited, hall_url)
+        browser.log_summary()
+    stats.log_summary()
+
+
+# =========================
+# ステージ 2: クリーニング・検証
+# =========================
+def clean_and_validate(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    df_clean で整形・検証し、取り込める行だけを返す（不正な行は除外してログに残す）
+    必須列が無いページは空の DataFrame を返す（パイプラインは止めない）
+    """
+    try:
+        df, _ = clean_results(df)
+    except ValueError as e:
+        logger.warning("クリーニングできないページを除外: %s", e)
+        return pd.DataFrame(columns=LOAD_COLUMNS)
+    return df
+
+
+# =========================
+# ステージ 3: 取り込み
+# =========================
+class StreamLoader:
+    """
+    検証済みの行を batch_size 行ためてから各シンクへ書き込み、都度コミットする
+    書き込みが終わった機種ページ・日付だけを crawl_state に記録する
+    """
+
+    def __init__(
+        self,
+        batch_size: int = config.STREAM_BATCH_ROWS,
+        conn: sqlite3.Connection | None = None,
+        supabase=None,
+        crawl_state: CrawlState | None = None,
+        parquet_dir: str | None = None,
+    ):
+        self.batch_size = batch_size
+        self.conn = conn
+        self.supabase = supabase
+        self.crawl_state = crawl_state
+        self.parquet_dir = parquet_dir
+        self.id_cache = None
+        if supabase is not None:
+            import df_to_supabase
+
+            self.id_cache = df_to_supabase.load_id_cache()
+
+        self._frames: list[pd.DataFrame] = []
+        self._pages: list[PageFrame] = []
+        self._incomplete: set[tuple[str, str]] = set()  # 取得に失敗したページがあった日付
+        self._rows = 0
+        self.total_rows = 0
+        self.flushes = 0
+
+    def add(self, page: PageFrame, df: pd.DataFrame) -> None:
+        if not df.empty:
+            self._frames.append(df)
+            self._rows += len(df)
+        self._pages.append(page)
+        if self._rows >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._frames:
+            batch = pd.concat(self._frames, ignore_index=True)
+            if self.conn is not None:
+                cursor = self.conn.cursor()
+                df_to_db.add_data_result(self.conn, cursor, batch)
+            if self.parquet_dir is not None:
+                append_results(batch, self.parquet_dir)
+            if self.supabase is not None:
+                import df_to_supabase
+
+                df_to_supabase.load_results(batch, self.supabase, self.id_cache)
+            self.total_rows += len(batch)
+            self.flushes += 1
+
+        if self.crawl_state is not None:
+            for page in self._pages:
+                key = (page.hall, page.date)
+                if page.df is None:
+                    # 取得に失敗したページとその日付は次回も取り直す
+                    self._incomplete.add(key)
+                elif page.model_url is None:
+                    # 対象機種が無い日付（rows=0 のため一定時間後に取り直す）
+                    self.crawl_state.mark_date(page.hall, page.date, 0)
+                    continue
+                else:
+                    # データなし（rows=0）のページは一定時間後に取り直す
+                    self.crawl_state.mark_model(
+                        page.hall, page.date, page.model_url, len(page.df)
+                    )
+                if page.last_in_date and key not in self._incomplete:
+                    self.crawl_state.mark_date(page.hall, page.date)
+
+        self._frames.clear()
+        self._pages.clear()
+        self._rows = 0
+
+
+def run_stream(
+    hall_list: list[config.HallInfo],
+    fetch_mode: str = config.FETCH_MODE,
+    crawl_state: CrawlState | None = None,
+    sinks: tuple[str, ...] = ("sqlite",),
+    batch_size: int = config.STREAM_BATCH_ROWS,
+) -> int:
+    """
+    取得 → クリーニング・検証 → 取り込み を機種ページ単位で流す
+    メモリ上に保持するのは最大 batch_size 行 + 1 ページ分
+    returns: 取り込んだ行数
+    """
+
+    start = time.perf_counter()
+    conn = None
+    if "sqlite" in sinks:
+        conn = connect_for_ingest(config.DB_PATH)
+        if not conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'results'"
+        ).fetchone():
+            conn.close()
+            raise RuntimeError(
+                f"results テーブルがありません。utils/create_databese.py で作成してください: {config.DB_PATH}"
+            )
+
+    supabase = None
+    if "supabase" in sinks:
+        import df_to_supabase
+
+        supabase = df_to_supabase.get_supabase_client()
+
+    parquet_dir = config.PARQUET_DIR if "parquet" in sinks else None
+    loader = StreamLoader(batch_size, conn, supabase, crawl_state, parquet_dir)
+    try:
+        for page in iter_page_frames(hall_list, fetch_mode, crawl_state):
+            has_rows = page.df is not None and not page.df.empty
+            df = clean_and_validate(page.df) if has_rows else pd.DataFrame()
+            loader.add(page, df)
+        loader.flush()
+    finally:
+        if conn is not None:
+            conn.close()
+
+    logger.info(
+        "ストリーム取り込み: %d 行 / %d 回コミット (%.2f 秒)",
+        loader.total_rows,
+        loader.flushes,
+        time.perf_counter() - start,
+    )
+    return loader.total_rows
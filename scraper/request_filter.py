@@ -0,0 +1,116 @@
+import os
+import re
+
+import config
+from logger_steup import setup_logger
+from metrics import METRICS
+
+# =========================
+# 設定・ロガー
+# =========================
+filename, ext = os.path.splitext(os.path.basename(__file__))
+logger = setup_logger(filename, log_file=config.LOG_PATH)
+
+
+# =========================
+# リクエストフィルタ
+# =========================
+def _compile(patterns: list[str]) -> re.Pattern | None:
+    if not patterns:
+        return None
+    return re.compile("|".join(f"(?:{p})" for p in patterns))
+
+
+class RequestFilter:
+    """
+    page.route / context.route 用のリクエストフィルタ
+    判定順: allow_patterns > allow_types(許可リスト) > block_types / block_patterns
+    """
+
+    def __init__(
+        self,
+        block_types: list[str] = config.BLOCK_RESOURCE_TYPES,
+        block_patterns: list[str] = config.BLOCK_URL_PATTERNS,
+        allow_types: list[str] | None = config.ALLOW_RESOURCE_TYPES,
+        allow_patterns: list[str] = config.ALLOW_URL_PATTERNS,
+    ):
+        self.block_types = set(block_types)
+        self.allow_types = set(allow_types) if allow_types else None
+        self._block_re = _compile(block_patterns)
+        self._allow_re = _compile(allow_patterns)
+
+        # 計測値
+        self.allowed = 0
+        self.blocked = 0
+        self.blocked_by_type: dict[str, int] = {}
+        self.allowed_bytes = 0
+        self.saved_bytes = 0  # 推定値（config.RESOURCE_SIZE_ESTIMATES）
+
+    def should_block(self, url: str, resource_type: str) -> bool:
+        if self._allow_re is not None and self._allow_re.search(url):
+            return False
+        if self.allow_types is not None and resource_type not in self.allow_types:
+            return True
+        if resource_type in self.block_types:
+            return True
+        return self._block_re is not None and self._block_re.search(url) is not None
+
+    def _record(self, request) -> bool:
+        resource_type = request.resource_type
+        if self.should_block(request.url, resource_type):
+            self.blocked += 1
+            self.blocked_by_type[resource_type] = (
+                self.blocked_by_type.get(resource_type, 0) + 1
+            )
+            self.saved_bytes += config.RESOURCE_SIZE_ESTIMATES.get(resource_type, 0)
+            METRICS.incr("browser_blocked_requests")
+            return True
+        self.allowed += 1
+        return False
+
+    def _on_response(self, response) -> None:
+        # content-length が無いレスポンス（chunked など）は数えない
+        size = response.headers.get("content-length")
+        if size and size.isdigit():
+            self.allowed_bytes += int(size)
+            METRICS.incr("browser_bytes", int(size))
+
+    # ---------- sync API ----------
+    def handle(self, route) -> None:
+        if self._record(route.request):
+            route.abort()
+        else:
+            route.continue_()
+
+    def attach(self, target) -> None:
+        """BrowserContext または Page に route を登録する"""
+        target.route("**/*", self.handle)
+        target.on("response", self._on_response)
+
+    # ---------- async API ----------
+    async def handle_async(self, route) -> None:
+        if self._record(route.request):
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def attach_async(self, target) -> None:
+        await target.route("**/*", self.handle_async)
+        target.on("response", self._on_response)
+
+    def log_summary(self) -> None:
+        total = self.allowed + self.blocked
+        if not total:
+            return
+        logger.info(
+            "リクエスト: 許可 %d 件 / ブロック %d 件 (%.1f%%)",
+            self.allowed,
+            self.blocked,
+            self.blocked / total * 100,
+        )
+        logger.info("ブロック内訳: %s", self.blocked_by_type)
+        logger.info(
+            "転送量: %.2f MB / 削減（推定）: %.2f MB",
+            self.allowed_bytes / 1024 / 1024,
+            self.saved_bytes / 1024 / 1024,
+        )
@@ -0,0 +1,645 @@
+import argparse
+import datetime as dt
+import json
+import os
+import shutil
+import sqlite3
+import time
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+
+import config
+from logger_steup import setup_logger
+from parquet_store import PARTITIONING, SCHEMA
+
+# =========================
+# 設定・ロガー
+# =========================
+filename, ext = os.path.splitext(os.path.basename(__file__))
+logger = setup_logger(filename, log_file=config.LOG_PATH)
+
+
+# =========================
+# ストア
+# =========================
+# 分析用に results を NumPy の列配列で持つ（読み取り専用）
+# - 都道府県・ホール・機種は DB と同じ ID の整数で持ち、名前は辞書で引く
+# - date は 1970-01-01 からの日数 (int32)
+# - 行は (hall_id, date, model_id, unit_no) 順に並べる
+#   ホール × 日付: hall_offsets[h]:hall_offsets[h + 1] の範囲で date を二分探索
+#   機種 × 日付: model_order（(model_id, date) 順の行番号）と model_offsets で同様に引く
+# - save() した .npy は load() でメモリマップして読む（必要なページだけ読み込まれる）
+#
+#   python scraper/results_store.py [--source auto|sqlite|parquet] [--rebuild]
+COLUMNS = {
+    "hall_id": np.int32,
+    "model_id": np.int32,
+    "unit_no": np.int32,
+    "date": np.int32,
+    "game": np.int32,
+    "bb": np.int32,
+    "rb": np.int32,
+    "medal": np.int32,
+}
+VALUE_COLUMNS = ["game", "bb", "rb", "medal"]
+INDEX_ARRAYS = ["hall_offsets", "model_order", "model_offsets"]
+# group_by / top_k のキー
+GROUP_KEYS = ["pref", "hall", "model", "date", "weekday", "digit", "unit"]
+
+
+def to_days(value) -> int:
+    """'YYYY-MM-DD' / date -> 1970-01-01 からの日数"""
+    return int(np.datetime64(str(value), "D").astype(np.int64))
+
+
+def from_days(days: np.ndarray) -> np.ndarray:
+    """日数 -> 'YYYY-MM-DD' の配列"""
+    return np.datetime_as_string(np.asarray(days).astype("datetime64[D]"))
+
+
+def _as_list(value) -> list:
+    if value is None:
+        return []
+    if isinstance(value, (str, int, np.integer)):
+        return [value]
+    return list(value)
+
+
+def _lookup(mapping: dict[int, object], fill) -> np.ndarray:
+    """ID -> 値 の辞書を ID で引ける配列にする"""
+    size = max(mapping, default=-1) + 1
+    out = np.full(size, fill, dtype=object if isinstance(fill, str) else np.int32)
+    for key, value in mapping.items():
+        out[key] = value
+    return out
+
+
+class ResultsStore:
+    """
+    results の列配列と名前の辞書
+    作成: from_sqlite / from_parquet / from_arrays、読み込み: open / load
+    """
+
+    def __init__(
+        self,
+        columns: dict[str, np.ndarray],
+        index: dict[str, np.ndarray],
+        prefectures: dict[int, str],
+        halls: dict[int, tuple[str, int]],
+        models: dict[int, str],
+        source: str = "",
+    ):
+        self.columns = columns
+        self.index = index
+        self.prefectures = prefectures
+        self.halls = halls
+        self.models = models
+        self.source = source
+
+        # ID -> 名前（ID で添字アクセスする）
+        self._pref_names = _lookup(prefectures, "")
+        self._hall_names = _lookup({h: name for h, (name, _) in halls.items()}, "")
+        self._hall_pref = _lookup({h: pref for h, (_, pref) in halls.items()}, -1)
+        self._model_names = _lookup(models, "")
+
+    def __len__(self) -> int:
+        return len(self.columns["date"])
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (*self.columns.values(), *self.index.values()))
+
+    # ---------- 作成 ----------
+    @classmethod
+    def from_arrays(
+        cls,
+        columns: dict[str, np.ndarray],
+        prefectures: dict[int, str],
+        halls: dict[int, tuple[str, int]],
+        models: dict[int, str],
+        source: str = "",
+    ) -> "ResultsStore":
+        """列配列を並べ替えてインデックスを作る"""
+        columns = {c: np.asarray(columns[c], dtype=t) for c, t in COLUMNS.items()}
+        order = np.lexsort(
+            (columns["unit_no"], columns["model_id"], columns["date"], columns["hall_id"])
+        )
+        columns = {c: a[order] for c, a in columns.items()}
+        del order
+
+        hall_id, model_id = columns["hall_id"], columns["model_id"]
+        n_halls = max(int(hall_id.max(initial=-1)), max(halls, default=-1)) + 1
+        n_models = max(int(model_id.max(initial=-1)), max(models, default=-1)) + 1
+        model_order = np.lexsort((columns["date"], model_id))
+        model_order = model_order.astype(np.int32 if len(model_order) < 2**31 else np.int64)
+        index = {
+            "hall_offsets": np.searchsorted(hall_id, np.arange(n_halls + 1)),
+            "model_order": model_order,
+            "model_offsets": np.searchsorted(model_id[model_order], np.arange(n_models + 1)),
+        }
+        return cls(columns, index, prefectures, halls, models, source)
+
+    @classmethod
+    def from_sqlite(cls, db_path: str = config.DB_PATH, chunk: int = 500_000) -> "ResultsStore":
+        """SQLite の results から作る（ID は DB のもの）"""
+        start = time.perf_counter()
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            # COUNT と SELECT を同じスナップショットで読む
+            conn.execute("BEGIN")
+            prefectures, halls, models = _read_dictionaries(conn)
+
+            n = conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+            columns = {c: np.empty(n, dtype=t) for c, t in COLUMNS.items()}
+            # 数値列の NULL は 0 として読む（df_to_db は数値変換できない行を登録しない）
+            cur = conn.execute(
+                """
+                SELECT hall_id, model_id, unit_no,
+                       CAST(julianday(date) - 2440587.5 AS INTEGER),
+                       COALESCE(game, 0), COALESCE(BB, 0), COALESCE(RB, 0), COALESCE(medal, 0)
+                FROM results
+                """
+            )
+            pos = 0
+            while rows := cur.fetchmany(chunk):
+                block = np.array(rows, dtype=np.int64)
+                for j, c in enumerate(COLUMNS):
+                    columns[c][pos : pos + len(block)] = block[:, j]
+                pos += len(block)
+        finally:
+            conn.close()
+
+        store = cls.from_arrays(columns, prefectures, halls, models, source=f"sqlite:{db_path}")
+        logger.info("SQLite から読み込み: %d 行 (%.2f 秒)", len(store), time.perf_counter() - start)
+        return store
+
+    @classmethod
+    def from_parquet(
+        cls, root: str = config.PARQUET_DIR, db_path: str | None = config.DB_PATH
+    ) -> "ResultsStore":
+        """
+        Parquet の results から作る（ファイルはメモリマップして行バッチ単位で読む）
+        db_path の DB があれば名前 -> ID はその辞書を使い、無い名前には続きの ID を振る
+        """
+        start = time.perf_counter()
+        prefectures, halls, models = {}, {}, {}
+        if db_path and os.path.exists(db_path):
+            conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+            try:
+                prefectures, halls, models = _read_dictionaries(conn)
+            finally:
+                conn.close()
+        pref_ids = _IdCoder(prefectures)
+        hall_ids = _IdCoder(halls)
+        model_ids = _IdCoder(models)
+
+        dataset = ds.dataset(
+            root,
+            schema=SCHEMA,
+            format="parquet",
+            partitioning=PARTITIONING,
+            filesystem=pafs.LocalFileSystem(use_mmap=True),
+        )
+        parts: dict[str, list[np.ndarray]] = {c: [] for c in COLUMNS}
+        read = ["pref", "hall", "model", "date", "unit_no", *VALUE_COLUMNS]
+        for batch in dataset.to_batches(columns=read):
+            if batch.num_rows == 0:
+                continue
+            pref_codes, pref_names = _dictionary(batch.column("pref"))
+            pref = np.array(pref_ids.encode(pref_names), dtype=np.int32)[pref_codes]
+
+            # ホールは (名前, 都道府県) で 1 件
+            hall_codes, hall_names = _dictionary(batch.column("hall"))
+            pairs, inverse = np.unique(
+                pref.astype(np.int64) * len(hall_names) + hall_codes, return_inverse=True
+            )
+            keys = [(hall_names[p % len(hall_names)], int(p // len(hall_names))) for p in pairs]
+            parts["hall_id"].append(np.array(hall_ids.encode(keys), dtype=np.int32)[inverse])
+
+            model_codes, model_names = _dictionary(batch.column("model"))
+            model = np.array(model_ids.encode(model_names), dtype=np.int32)[model_codes]
+            parts["model_id"].append(model)
+
+            date_codes, dates = _dictionary(batch.column("date"))
+            parts["date"].append(np.array([to_days(d) for d in dates], dtype=np.int32)[date_codes])
+            for c in ["unit_no", *VALUE_COLUMNS]:
+                values = pc.fill_null(batch.column(c), 0)
+                parts[c].append(values.to_numpy().astype(COLUMNS[c], copy=False))
+
+        columns = {
+            c: np.concatenate(p) if p else np.empty(0, dtype=COLUMNS[c]) for c, p in parts.items()
+        }
+        del parts
+        store = cls.from_arrays(
+            columns,
+            pref_ids.mapping,
+            hall_ids.mapping,
+            model_ids.mapping,
+            source=f"parquet:{root}",
+        )
+        logger.info("Parquet から読み込み: %d 行 (%.2f 秒)", len(store), time.perf_counter() - start)
+        return store
+
+    # ---------- 保存・読み込み ----------
+    def save(self, root: str = config.RESULTS_STORE_DIR, source_version: str = "") -> None:
+        """列ごとの .npy と辞書 (meta.json) を書き出す（書き終えてからディレクトリを置き換える）"""
+        tmp = root + ".tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        for name, array in (*self.columns.items(), *self.index.items()):
+            np.save(os.path.join(tmp, f"{name}.npy"), array)
+        meta = {
+            "rows": len(self),
+            "source": self.source,
+            "source_version": source_version,
+            "built_at": dt.datetime.now().isoformat(timespec="seconds"),
+            "prefectures": self.prefectures,
+            "halls": self.halls,
+            "models": self.models,
+        }
+        with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        shutil.rmtree(root, ignore_errors=True)
+        os.replace(tmp, root)
+
+    @classmethod
+    def load(cls, root: str = config.RESULTS_STORE_DIR, mmap: bool = True) -> "ResultsStore":
+        mode = "r" if mmap else None
+        with open(os.path.join(root, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        columns = {c: np.load(os.path.join(root, f"{c}.npy"), mmap_mode=mode) for c in COLUMNS}
+        index = {i: np.load(os.path.join(root, f"{i}.npy"), mmap_mode=mode) for i in INDEX_ARRAYS}
+        return cls(
+            columns,
+            index,
+            {int(k): v for k, v in meta["prefectures"].items()},
+            {int(k): tuple(v) for k, v in meta["halls"].items()},
+            {int(k): v for k, v in meta["models"].items()},
+            source=meta["source"],
+        )
+
+    @classmethod
+    def open(
+        cls,
+        source: str = "auto",
+        root: str = config.RESULTS_STORE_DIR,
+        rebuild: bool = False,
+    ) -> "ResultsStore":
+        """
+        保存済みのストアをメモリマップで開く
+        無い場合・元データ（SQLite / Parquet）が新しくなっている場合は作り直して保存する
+        source: "sqlite" / "parquet" / "auto"（DB があれば SQLite）
+        """
+        if source == "auto":
+            source = "sqlite" if os.path.exists(config.DB_PATH) else "parquet"
+        path = config.DB_PATH if source == "sqlite" else config.PARQUET_DIR
+        version = _source_version(source, path)
+
+        meta_path = os.path.join(root, "meta.json")
+        if not rebuild and os.path.exists(meta_path):
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta["source"] == f"{source}:{path}" and meta.get("source_version") == version:
+                store = cls.load(root)
+                logger.info("ストアを開きました: %s (%d 行)", root, len(store))
+                return store
+
+        if source == "sqlite":
+            store = cls.from_sqlite(path)
+        else:
+            store = cls.from_parquet(path, db_path=config.DB_PATH)
+        store.save(root, source_version=version)
+        logger.info("ストアを保存しました: %s (%.1f MB)", root, store.nbytes / 1e6)
+        # 作成時の配列は手放し、保存したファイルをメモリマップで使う
+        return cls.load(root)
+
+    # ---------- 名前 -> ID ----------
+    def hall_ids(self, halls) -> list[int]:
+        """ホール名または hall_id（同名のホールは都道府県が違ってもすべて）"""
+        out = []
+        for h in _as_list(halls):
+            if isinstance(h, str):
+                out += [i for i, (name, _) in self.halls.items() if name == h]
+            else:
+                out.append(int(h))
+        return out
+
+    def model_ids(self, models) -> list[int]:
+        out = []
+        for m in _as_list(models):
+            if isinstance(m, str):
+                out += [i for i, name in self.models.items() if name == m]
+            else:
+                out.append(int(m))
+        return out
+
+    def pref_ids(self, prefs) -> list[int]:
+        out = []
+        for p in _as_list(prefs):
+            if isinstance(p, str):
+                out += [i for i, name in self.prefectures.items() if name == p]
+            else:
+                out.append(int(p))
+        return out
+
+    # ---------- 範囲 ----------
+    def select(
+        self,
+        hall=None,
+        model=None,
+        pref=None,
+        date_from=None,
+        date_to=None,
+    ) -> np.ndarray:
+        """
+        条件に合う行番号（昇順）を返す
+        hall / model / pref は名前・ID・そのリスト、日付は 'YYYY-MM-DD'（両端を含む）
+        ホールか都道府県の指定があれば hall_offsets、機種だけなら model_order で範囲を引く
+        """
+        lo = to_days(date_from) if date_from else np.iinfo(np.int32).min
+        hi = to_days(date_to) if date_to else np.iinfo(np.int32).max
+        date = self.columns["date"]
+
+        hall_ids = self.hall_ids(hall) if hall is not None else None
+        if pref is not None:
+            prefs = set(self.pref_ids(pref))
+            in_pref = {h for h, (_, p) in self.halls.items() if p in prefs}
+            hall_ids = list(in_pref) if hall_ids is None else [h for h in hall_ids if h in in_pref]
+
+        if hall_ids is not None:
+            offsets = self.index["hall_offsets"]
+            parts = []
+            for h in sorted(set(hall_ids)):
+                if not 0 <= h < len(offsets) - 1:
+                    continue
+                a, b = int(offsets[h]), int(offsets[h + 1])
+                d = date[a:b]
+                start, stop = np.searchsorted(d, lo, "left"), np.searchsorted(d, hi, "right")
+                parts.append(np.arange(a + start, a + stop))
+            idx = np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+            if model is not None:
+                idx = idx[np.isin(self.columns["model_id"][idx], self.model_ids(model))]
+            return idx
+
+        if model is not None:
+            offsets = self.index["model_offsets"]
+            order = self.index["model_order"]
+            parts = []
+            for m in sorted(set(self.model_ids(model))):
+                if not 0 <= m < len(offsets) - 1:
+                    continue
+                rows = order[int(offsets[m]) : int(offsets[m + 1])]
+                d = date[rows]
+                parts.append(rows[np.searchsorted(d, lo, "left") : np.searchsorted(d, hi, "right")])
+            # 元の並び（ホール × 日付順）に戻して読み出しを連続にする
+            return np.sort(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int64)
+
+        if date_from or date_to:
+            return np.flatnonzero((date >= lo) & (date <= hi))
+        return np.arange(len(self))
+
+    def frame(self, idx: np.ndarray | None = None, **filters) -> pd.DataFrame:
+        """行番号（省略時は select(**filters)）の行を、名前付きの DataFrame にする"""
+        if idx is None:
+            idx = self.select(**filters)
+        hall_id = self.columns["hall_id"][idx]
+        model_id = self.columns["model_id"][idx]
+        df = pd.DataFrame(
+            {
+                "hall_id": hall_id,
+                "model_id": model_id,
+                "pref": self._pref_names[self._hall_pref[hall_id]],
+                "hall": self._hall_names[hall_id],
+                "model": self._model_names[model_id],
+                "date": from_days(self.columns["date"][idx]),
+            }
+        )
+        for c in ["unit_no", *VALUE_COLUMNS]:
+            df[c] = self.columns[c][idx]
+        return df
+
+    # ---------- 集計 ----------
+    def _key(self, key: str, idx: np.ndarray) -> tuple[np.ndarray, int, int]:
+        """キー列（0 始まりの整数）, 種類数, オフセット"""
+        if key in ("hall", "model", "pref"):
+            if key == "pref":
+                values = self._hall_pref[self.columns["hall_id"][idx]]
+            else:
+                values = self.columns[f"{key}_id"][idx]
+            return values, int(values.max(initial=0)) + 1, 0
+        if key == "digit":
+            return self.columns["unit_no"][idx] % 10, 10, 0
+        if key == "unit":
+            unit_no = self.columns["unit_no"][idx]
+            base = int(unit_no.min(initial=0))
+            return unit_no - base, int(unit_no.max(initial=0)) - base + 1, base
+        date = self.columns["date"][idx]
+        if key == "weekday":
+            # 1970-01-01 は木曜日（月曜日 = 0）
+            return (date + 3) % 7, 7, 0
+        if key == "date":
+            base = int(date.min(initial=0))
+            return date - base, int(date.max(initial=0)) - base + 1, base
+        raise ValueError(f"集計キーが不正です: {key}（{GROUP_KEYS}）")
+
+    def group_by(self, by: str | list[str], **filters) -> pd.DataFrame:
+        """
+        by ごとの units（台数）と game / bb / rb / medal の合計、win_units（差枚 > 0 の台数）
+        by: GROUP_KEYS のいずれか、またはそのリスト。filters は select() の引数
+        """
+        by = _as_list(by)
+        idx = self.select(**filters)
+
+        # キーを 1 つの整数にまとめる（混合基数）
+        code = np.zeros(len(idx), dtype=np.int64)
+        radices, bases = [], []
+        for key in by:
+            values, radix, base = self._key(key, idx)
+            code = code * radix + values
+            radices.append(radix)
+            bases.append(base)
+
+        size = int(np.prod(radices, dtype=np.float64))
+        if size <= 4 * max(len(idx), 1 << 16):
+            # 種類数が少なければ直接数える
+            units = np.bincount(code, minlength=size)
+            groups = np.flatnonzero(units)
+            units = units[groups]
+            sums = {
+                c: np.bincount(code, self.columns[c][idx], minlength=size)[groups]
+                for c in VALUE_COLUMNS
+            }
+            wins = np.bincount(code, self.columns["medal"][idx] > 0, minlength=size)[groups]
+        else:
+            groups, inverse = np.unique(code, return_inverse=True)
+            units = np.bincount(inverse)
+            sums = {c: np.bincount(inverse, self.columns[c][idx]) for c in VALUE_COLUMNS}
+            wins = np.bincount(inverse, self.columns["medal"][idx] > 0)
+
+        out = {}
+        rest = groups
+        for key, radix, base in reversed(list(zip(by, radices, bases))):
+            values = rest % radix + base
+            rest = rest // radix
+            if key == "hall":
+                out["hall"] = self._hall_names[values]
+                out["hall_id"] = values
+            elif key == "model":
+                out["model"] = self._model_names[values]
+                out["model_id"] = values
+            elif key == "pref":
+                out["pref"] = self._pref_names[values]
+            elif key == "date":
+                out["date"] = from_days(values)
+            elif key == "unit":
+                out["unit_no"] = values
+            else:
+                out[key] = values
+        df = pd.DataFrame({k: out[k] for k in reversed(list(out))})
+        df["units"] = units
+        for c in VALUE_COLUMNS:
+            df[c] = sums[c].astype(np.int64)
+        df["win_units"] = wins.astype(np.int64)
+        return df
+
+    def top_k(
+        self,
+        by: str | list[str] | None = "model",
+        value: str = "medal",
+        k: int = 10,
+        agg: str = "mean",
+        min_units: int = 1,
+        ascending: bool = False,
+        **filters,
+    ) -> pd.DataFrame:
+        """
+        value の上位 k 件（ascending=True なら下位）
+        by=None: 台（行）単位。それ以外: group_by(by) の agg ("sum" / "mean" / "rate") 順
+        rate は win_units / units（value は使わない）
+        """
+        if by is None:
+            idx = self.select(**filters)
+            values = self.columns[value][idx].astype(np.int64)
+            if not ascending:
+                values = -values
+            k = min(k, len(idx))
+            if k == 0:
+                return self.frame(idx[:0])
+            top = np.argpartition(values, k - 1)[:k]
+            top = top[np.argsort(values[top], kind="stable")]
+            return self.frame(idx[top]).reset_index(drop=True)
+
+        df = self.group_by(by, **filters)
+        df = df[df["units"] >= min_units]
+        if agg == "sum":
+            column = value
+        elif agg == "mean":
+            column = f"{value}_mean"
+            df = df.assign(**{column: df[value] / df["units"]})
+        elif agg == "rate":
+            column = "win_rate"
+            df = df.assign(win_rate=df["win_units"] / df["units"])
+        else:
+            raise ValueError(f"agg が不正です: {agg}（sum / mean / rate）")
+        pick = df.nsmallest if ascending else df.nlargest
+        return pick(k, column).reset_index(drop=True)
+
+    def log_summary(self) -> None:
+        dates = self.columns["date"]
+        span = from_days([dates.min(), dates.max()]) if len(self) else ["-", "-"]
+        logger.info(
+            "ストア: %d 行 / ホール %d / 機種 %d / %s 〜 %s / %.1f MB (%s)",
+            len(self),
+            len(self.halls),
+            len(self.models),
+            span[0],
+            span[1],
+            self.nbytes / 1e6,
+            self.source,
+        )
+
+
+# =========================
+# 補助
+# =========================
+class _IdCoder:
+    """名前 -> ID（既存の辞書に無い名前には続きの ID を振る）"""
+
+    def __init__(self, mapping: dict[int, object]):
+        self.mapping = dict(mapping)
+        self._ids = {v: k for k, v in self.mapping.items()}
+        self._next = max(self.mapping, default=0) + 1
+
+    def encode(self, keys: Iterable) -> list[int]:
+        out = []
+        for key in keys:
+            if key not in self._ids:
+                self._ids[key] = self._next
+                self.mapping[self._next] = key
+                self._next += 1
+            out.append(self._ids[key])
+        return out
+
+
+def _read_dictionaries(conn: sqlite3.Connection) -> tuple[dict, dict, dict]:
+    """DB の 都道府県 / ホール / 機種 の ID -> 名前（テーブルが無い DB なら空）"""
+    tables = {
+        name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+    }
+    if not {"prefectures", "halls", "models"} <= tables:
+        return {}, {}, {}
+    prefectures = dict(conn.execute("SELECT prefecture_id, name FROM prefectures"))
+    halls = {
+        h: (name, pref)
+        for h, name, pref in conn.execute("SELECT hall_id, name, prefecture_id FROM halls")
+    }
+    models = dict(conn.execute("SELECT model_id, name FROM models"))
+    return prefectures, halls, models
+
+
+def _dictionary(column) -> tuple[np.ndarray, list]:
+    """Arrow の列 -> (コード, 値の一覧)"""
+    if not hasattr(column, "dictionary"):
+        column = pc.dictionary_encode(column)
+    return column.indices.to_numpy(zero_copy_only=False), column.dictionary.to_pylist()
+
+
+def _source_version(source: str, path: str) -> str:
+    """
+    元データが変わったかの判定用
+    SQLite: results の行数と最大 rowid（results は追記のみ。読むだけでも WAL のチェックポイントで
+    ファイルの更新時刻は変わるため使わない）
+    Parquet: ディレクトリ以下のファイル数と最新の更新時刻
+    """
+    if source == "sqlite":
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            count, max_rowid = conn.execute("SELECT COUNT(*), MAX(rowid) FROM results").fetchone()
+        finally:
+            conn.close()
+        return f"{count}:{max_rowid}"
+    count, latest = 0, 0.0
+    for dirpath, _, names in os.walk(path):
+        count += len(names)
+        for name in names:
+            latest = max(latest, os.path.getmtime(os.path.join(dirpath, name)))
+    return f"{count}:{latest}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="results の列配列ストアを作る")
+    parser.add_argument("--source", choices=["auto", "sqlite", "parquet"], default="auto")
+    parser.add_argument("--rebuild", action="store_true", help="元データが古くなくても作り直す")
+    args = parser.parse_args()
+
+    store = ResultsStore.open(args.source, rebuild=args.rebuild)
+    store.log_summary()
+
+
+if __name__ == "__main__":
+    main()
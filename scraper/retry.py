@@ -0,0 +1,216 @@
+from playwright.sync_api import Error as PWError
+import asyncio
+import os
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+
+import config
+from logger_steup import setup_logger
+from metrics import METRICS
+
+# =========================
+# 設定・ロガー
+# =========================
+filename, ext = os.path.splitext(os.path.basename(__file__))
+logger = setup_logger(filename, log_file=config.LOG_PATH)
+
+
+class FetchError(Exception):
+    """ページを取得できなかった（リトライしても失敗した / サーキットが開いている）"""
+
+
+class CircuitOpenError(FetchError):
+    """サーキットが開いているホストへの取得"""
+
+
+class PermanentFetchError(FetchError):
+    """リトライしても直らない失敗（429 以外の 4xx）。リトライせず、サーキットの失敗にも数えない"""
+
+
+# リトライする例外（タイムアウト・ネットワークエラー）
+# テーブルが無いページ（fetch が None を返す）はリトライしない
+RETRYABLE_ERRORS = (FetchError, PWError, requests.RequestException)
+
+
+def retry_delay(attempt: int, base_delay: float = config.FETCH_RETRY_BASE_DELAY) -> float:
+    """指数バックオフ + ジッター（df_to_supabase.BatchUploader と同じ式）"""
+    delay = base_delay * 2**attempt
+    return delay + random.uniform(0, delay)
+
+
+# =========================
+# サーキットブレーカー
+# =========================
+class CircuitBreaker:
+    """
+    ホストごとに連続した失敗を数え、failures 回続いたら cooldown_sec の間そのホストへの取得を止める
+    cooldown 後は 1 件だけ試し、成功すれば元に戻す（失敗すればまた止める）
+    sync / async / スレッドのどこから呼んでもよい
+    """
+
+    def __init__(
+        self,
+        failures: int = config.BREAKER_FAILURES,
+        cooldown_sec: float = config.BREAKER_COOLDOWN_SEC,
+    ):
+        self.failures = failures
+        self.cooldown_sec = cooldown_sec
+        self._failures: dict[str, int] = {}
+        self._opened_at: dict[str, float] = {}
+        self._trial: set[str] = set()
+        self._lock = threading.Lock()
+
+    def check(self, url: str) -> None:
+        """サーキットが開いている場合は CircuitOpenError"""
+        host = urlsplit(url).netloc
+        with self._lock:
+            opened_at = self._opened_at.get(host)
+            if opened_at is None:
+                return
+            if time.monotonic() - opened_at < self.cooldown_sec or host in self._trial:
+                METRICS.incr("circuit_rejected")
+                raise CircuitOpenError(f"取得を停止中のホストです: {host} ({url})")
+            self._trial.add(host)
+
+    def success(self, url: str) -> None:
+        host = urlsplit(url).netloc
+        with self._lock:
+            self._failures.pop(host, None)
+            self._trial.discard(host)
+            if self._opened_at.pop(host, None) is not None:
+                logger.info("取得を再開します: %s", host)
+
+    def failure(self, url: str) -> None:
+        host = urlsplit(url).netloc
+        with self._lock:
+            count = self._failures.get(host, 0) + 1
+            self._failures[host] = count
+            reopen = host in self._trial
+            self._trial.discard(host)
+            if count >= self.failures or reopen:
+                if host not in self._opened_at or reopen:
+                    logger.error(
+                        "%s: %d 回連続で失敗したため %.0f 秒間取得を止めます",
+                        host,
+                        count,
+                        self.cooldown_sec,
+                    )
+                    METRICS.incr("circuit_opened")
+                self._opened_at[host] = time.monotonic()
+
+
+# プロセス全体で共有する（ホール・エンジンをまたいでホストの状態を持つ）
+BREAKER = CircuitBreaker()
+
+
+# =========================
+# フェッチャー
+# =========================
+class RetryingFetcher:
+    """
+    フェッチャーを包み、タイムアウト・ネットワークエラーをリトライする
+    リトライしても失敗した場合・サーキットが開いている場合は FetchError
+    name / pages などは包んだフェッチャーのものを返す（FetchStats での集計用）
+    """
+
+    def __init__(
+        self,
+        fetcher,
+        breaker: CircuitBreaker = BREAKER,
+        max_retries: int = config.FETCH_MAX_RETRIES,
+        base_delay: float = config.FETCH_RETRY_BASE_DELAY,
+    ):
+        self.fetcher = fetcher
+        self.breaker = breaker
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+
+    def __enter__(self) -> "RetryingFetcher":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    @property
+    def name(self) -> str:
+        return self.fetcher.name
+
+    @property
+    def pages(self) -> int:
+        return self.fetcher.pages
+
+    @property
+    def elapsed(self) -> float:
+        return self.fetcher.elapsed
+
+    @property
+    def inner(self):
+        return getattr(self.fetcher, "inner", None)
+
+    @property
+    def fallback(self):
+        return getattr(self.fetcher, "fallback", None)
+
+    def _failed(self, url: str, attempt: int, e: Exception) -> float:
+        """失敗を記録し、次に待つ秒数を返す（リトライ上限なら FetchError）"""
+        self.breaker.failure(url)
+        if attempt == self.max_retries:
+            METRICS.incr("fetch_failures")
+            raise FetchError(f"取得に失敗しました: {url} ({e})") from e
+        METRICS.incr("fetch_retries")
+        delay = retry_delay(attempt, self.base_delay)
+        logger.warning(
+            "取得失敗 (%d/%d 回目): %s: %s → %.1f 秒後にリトライ",
+            attempt + 1,
+            self.max_retries,
+            url,
+            str(e).splitlines()[0] if str(e) else type(e).__name__,
+            delay,
+        )
+        return delay
+
+    def fetch(
+        self, url: str, selector: str, timeout: int | None = None, reload: bool = False
+    ) -> str | None:
+        for attempt in range(self.max_retries + 1):
+            self.breaker.check(url)
+            try:
+                html = self.fetcher.fetch(url, selector, timeout=timeout, reload=reload)
+            except PermanentFetchError:
+                METRICS.incr("fetch_failures")
+                raise
+            except RETRYABLE_ERRORS as e:
+                time.sleep(self._failed(url, attempt, e))
+                continue
+            self.breaker.success(url)
+            return html
+
+    def close(self) -> None:
+        self.fetcher.close()
+
+
+class AsyncRetryingFetcher(RetryingFetcher):
+    """RetryingFetcher の async 版（async_scraper のフェッチャーを包む）"""
+
+    async def fetch(
+        self, url: str, selector: str, timeout: int | None = None, reload: bool = False
+    ) -> str | None:
+        for attempt in range(self.max_retries + 1):
+            self.breaker.check(url)
+            try:
+                html = await self.fetcher.fetch(url, selector, timeout=timeout, reload=reload)
+            except PermanentFetchError:
+                METRICS.incr("fetch_failures")
+                raise
+            except RETRYABLE_ERRORS as e:
+                await asyncio.sleep(self._failed(url, attempt, e))
+                continue
+            self.breaker.success(url)
+            return html
+
+    async def close(self) -> None:
+        await self.fetcher.close()
@@ -0,0 +1,190 @@
+from dataclasses import asdict, dataclass
+import datetime as dt
+import json
+import math
+import os
+import time
+
+import numpy as np
+
+import config
+from logger_steup import setup_logger
+from crawl_state import CrawlState
+from metrics import METRICS
+
+# =========================
+# 設定・ロガー
+# =========================
+filename, ext = os.path.splitext(os.path.basename(__file__))
+logger = setup_logger(filename, log_file=config.LOG_PATH)
+
+
+# =========================
+# 時間予算つきスケジューラ（--time-budget）
+# =========================
+# 作業単位: ホールのメインページ / (ホール, 日付) の日付ページ / 機種ページ
+# 種類ごとの所要時間（p95）を見積もり、締め切りまでに終わらない作業は始めない
+# 始めなかった作業は REMAINING_WORK_PATH に書き出し、次回の実行で優先する
+UNIT_SERIES = {
+    "hall": "extract_date_url_seconds",
+    "date": "extract_model_url_seconds",
+    "model": "extract_model_page_seconds",
+}
+
+
+@dataclass
+class DateUnit:
+    """(ホール, 日付) の作業単位（機種ページは日付ページを取得してから決まる）"""
+
+    slug: str
+    pref: str
+    hall: str
+    date: str
+    date_url: str
+
+
+class CostModel:
+    """
+    作業単位の種類ごとの所要時間の見積もり（秒）
+    この実行の計測が min_samples 件以上あればその p95、無ければ前回の実行レポートの p95、
+    それも無ければ config.UNIT_COST_DEFAULTS
+    """
+
+    def __init__(
+        self,
+        report_path: str = os.path.join(config.METRICS_DIR, "scraper.json"),
+        min_samples: int = config.WAIT_MIN_SAMPLES,
+    ):
+        self.min_samples = min_samples
+        self.prior = dict(config.UNIT_COST_DEFAULTS)
+        if os.path.exists(report_path):
+            with open(report_path, encoding="utf-8") as f:
+                series = json.load(f).get("series", {})
+            for kind, name in UNIT_SERIES.items():
+                if name in series:
+                    self.prior[kind] = series[name]["p95"]
+        self.models_per_date: list[int] = []
+
+    def estimate(self, kind: str) -> float:
+        values = [v for v, _ in METRICS.samples(UNIT_SERIES[kind])]
+        if len(values) >= self.min_samples:
+            return float(np.percentile(values, 95))
+        return self.prior[kind]
+
+    def estimate_date(self) -> float:
+        """日付 1 件分（日付ページ + 機種ページの平均件数）"""
+        models = (
+            float(np.mean(self.models_per_date))
+            if self.models_per_date
+            else config.MODELS_PER_DATE
+        )
+        return self.estimate("date") + models * self.estimate("model")
+
+
+class Scheduler:
+    """
+    締め切り（開始から budget_sec - margin_sec 秒後）までに終わる作業だけを始める
+    budget_sec=None なら締め切りなし（順番だけ決める）
+    """
+
+    def __init__(
+        self,
+        budget_sec: float | None,
+        margin_sec: float = config.TIME_BUDGET_MARGIN_SEC,
+        costs: CostModel | None = None,
+        remaining_path: str = config.REMAINING_WORK_PATH,
+    ):
+        self.started = time.monotonic()
+        self.deadline = None if budget_sec is None else self.started + budget_sec - margin_sec
+        self.costs = costs or CostModel()
+        self.remaining_path = remaining_path
+        self.remaining: list[dict] = []
+        self.stopped = False
+        # 前回の実行で残った作業（そのホールは「データが古い」扱いにして優先する）
+        self.carried_over = self._load_remaining()
+
+    def _load_remaining(self) -> list[dict]:
+        if not os.path.exists(self.remaining_path):
+            return []
+        with open(self.remaining_path, encoding="utf-8") as f:
+            units = json.load(f).get("units", [])
+        if units:
+            logger.info("前回の実行で残った作業: %d 件", len(units))
+        return units
+
+    # ---------- 締め切り ----------
+    def time_left(self) -> float:
+        if self.deadline is None:
+            return math.inf
+        return self.deadline - time.monotonic()
+
+    def can_start(self, kind: str) -> bool:
+        """kind の作業を今から始めて締め切りに間に合うか（間に合わなければ以降は何も始めない）"""
+        if self.stopped:
+            return False
+        if self.deadline is None:
+            return True
+        cost = self.costs.estimate(kind)
+        if kind == "date":
+            # 日付ページと機種ページ 1 件が終われば途中まででも保存できる
+            cost += self.costs.estimate("model")
+        if time.monotonic() + cost <= self.deadline:
+            return True
+        self.stopped = True
+        METRICS.incr("schedule_stopped")
+        logger.warning(
+            "時間予算の残り %.0f 秒（%s の見積もり %.1f 秒）: 新しい作業を始めずに終了します",
+            max(self.time_left(), 0),
+            kind,
+            cost,
+        )
+        return False
+
+    # ---------- 順番 ----------
+    def order(self, units: list[DateUnit], crawl_state: CrawlState | None) -> list[DateUnit]:
+        """新しい日付 → 同じ日付ならデータの古いホール（前回残ったホールを最優先）の順"""
+        carried = {u["hall"] for u in self.carried_over if u.get("hall")}
+        last: dict[str, str] = {}
+        for u in units:
+            if u.hall not in last:
+                stale = u.hall in carried or crawl_state is None
+                last[u.hall] = "" if stale else crawl_state.last_ingested(u.hall)
+        units = sorted(units, key=lambda u: (last[u.hall], u.slug))
+        units = sorted(units, key=lambda u: u.date, reverse=True)
+
+        if self.deadline is not None:
+            total = len(units) * self.costs.estimate_date()
+            logger.info(
+                "日付 %d 件（見積もり %.0f 秒 / 残り時間 %.0f 秒）",
+                len(units),
+                total,
+                self.time_left(),
+            )
+        return units
+
+    # ---------- 残りの作業 ----------
+    def defer(self, kind: str, **unit) -> None:
+        self.remaining.append({"kind": kind, **unit})
+        METRICS.incr(f"schedule_deferred_{kind}")
+
+    def defer_date(self, unit: DateUnit) -> None:
+        self.defer("date", **asdict(unit))
+
+    def write_remaining(self) -> None:
+        """残った作業を書き出す（無ければ前回のファイルを消す）"""
+        if not self.remaining:
+            if os.path.exists(self.remaining_path):
+                os.remove(self.remaining_path)
+            return
+        os.makedirs(os.path.dirname(self.remaining_path) or ".", exist_ok=True)
+        payload = {
+            "generated_at": dt.datetime.now().isoformat(timespec="seconds"),
+            "units": self.remaining,
+        }
+        tmp = self.remaining_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.remaining_path)
+        logger.warning(
+            "時間内に終わらなかった作業: %d 件 → %s", len(self.remaining), self.remaining_path
+        )
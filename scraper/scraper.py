@@ -8,16 +8,29 @@ import time
 import os
 import yaml
 import sqlite3
+import argparse
 from dataclasses import dataclass
 
 import config
-from logger_steup import setup_logger
+from logger_steup import setup_logger, split_log_files
 from utils import _norm_text
 from scraping_hall_page import extract_date_url
 from scraping_date_page import extract_model_url
-from scraping_model_page import extract_model_data
+from scraping_model_page import iter_model_data
 from df_clean import df_data_clean
 import df_to_db
+from browser_manager import BrowserManager
+from async_scraper import run_async
+from fetcher import FetchStats, create_fetcher
+from crawl_state import CrawlState
+from checkpoint import RunCheckpoint
+from retry import FetchError
+from metrics import METRICS
+from page_cache import PageCache, open_page_cache
+from pipeline import run_stream
+from scheduler import DateUnit, Scheduler
+from parquet_store import append_results
+from shard import default_run_id, parse_shard, plan_shards, write_partial
 
 # =========================
 # 設定・ロガー
@@ -29,67 +42,322 @@ logger = setup_logger(filename, log_file=config.LOG_PATH)
 # =========================
 # ページ操作
 # =========================
-def extract_result_data(hall_url: str, period: int = 1) -> pd.DataFrame:
+def extract_result_data(
+    hall_url: str,
+    period: int = 1,
+    browser: BrowserManager | None = None,
+    fetch_mode: str = config.FETCH_MODE,
+    stats: FetchStats | None = None,
+    crawl_state: CrawlState | None = None,
+    page_cache: PageCache | None = None,
+    checkpoint: RunCheckpoint | None = None,
+) -> pd.DataFrame:
     
     """
     ホールURLと期間を受けて、そのホールの対象日・対象機種の全データを返す
+    browser を渡すと起動済みの Chromium を使い回す（未指定なら単独で起動）
+    fetch_mode: "http"（生 HTML 優先）or "browser"
+    crawl_state を渡すと取得済みのページを飛ばす
+    page_cache を渡すと取得した HTML をキャッシュし、キャッシュがあれば再利用する
+    checkpoint を渡すと日付ごとに取得結果を保存し、保存済みの機種ページは飛ばす
+    （crawl_state への記録は、出力を書き終えてから checkpoint の内容で行う）
+    取得に失敗した日付・機種ページは飛ばして続ける（次回の実行で取り直す）
     """
     
-    df_frames: list[pd.DataFrame] = []
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        page = browser.new_page()
+    if browser is None:
+        with BrowserManager() as bm:
+            return extract_result_data(
+                hall_url, period, bm, fetch_mode, stats, crawl_state, page_cache, checkpoint
+            )
 
+    df_frames: list[pd.DataFrame] = []
+    with create_fetcher(browser, fetch_mode, page_cache) as fetcher:
         try:
-            date_urls = extract_date_url(hall_url, page, period=period)
+            date_urls = extract_date_url(hall_url, fetcher, period, crawl_state)
             for pref, hall, date, date_url in date_urls:
-                model_urls = extract_model_url(page, hall, pref, date_url, date)
-                if not model_urls:
-                    continue
-                df_model = extract_model_data(page, model_urls)
+                df_model = scrape_date(
+                    fetcher, pref, hall, date, date_url, crawl_state, checkpoint
+                )
                 if not df_model.empty:
                     df_frames.append(df_model)
-                df_model.to_csv(f"data/csv/{pref}_{hall}_{date}.csv", index=False)
 
         finally:
-            browser.close()
-            df_frames = pd.concat(df_frames, ignore_index=True)
+            df_frames = pd.concat(df_frames, ignore_index=True) if df_frames else pd.DataFrame()
+            if stats is not None:
+                stats.add(fetcher)
         # df_frames.to_csv(f"data/csv/{pref}_{hall}.csv", index=False)
 
     return df_frames
 
 
-def main(test_mode=False) -> pd.DataFrame:
-    start = time.perf_counter()
+def scrape_date(
+    fetcher,
+    pref: str,
+    hall: str,
+    date: str,
+    date_url: str,
+    crawl_state: CrawlState | None = None,
+    checkpoint: RunCheckpoint | None = None,
+    scheduler: Scheduler | None = None,
+) -> pd.DataFrame:
+    """
+    1 日付分の機種ページを取得して返す（取得に失敗した日付は空の DataFrame）
+    scheduler を渡すと機種ページごとに締め切りを確認し、間に合わない分は残りの作業にする
+    """
+    try:
+        model_urls = extract_model_url(fetcher, hall, pref, date_url, date)
+    except FetchError as e:
+        logger.error("日付ページを取得できません: %s", e)
+        METRICS.incr("date_pages_failed")
+        return pd.DataFrame()
+    if not model_urls:
+        # 対象機種が無い日付も、出力を書き終えてから rows=0 で記録する（一定時間後に取り直す）
+        if checkpoint is not None:
+            checkpoint.save([], [], pd.DataFrame(), completed=(hall, date))
+        return pd.DataFrame()
+    if crawl_state is not None:
+        model_urls = crawl_state.filter_models(model_urls)
+    if checkpoint is not None:
+        model_urls = checkpoint.filter_models(model_urls)
+    if not model_urls:
+        return pd.DataFrame()
+    if scheduler is not None:
+        scheduler.costs.models_per_date.append(len(model_urls))
 
-    # yaml  読み込み
+    done, failed, deferred, frames, rows = [], [], [], [], {}
+    for i, model_key in enumerate(model_urls):
+        if scheduler is not None and not scheduler.can_start("model"):
+            deferred = model_urls[i:]
+            for _, _, _, _, model_url in deferred:
+                scheduler.defer(
+                    "model", hall=hall, date=date, date_url=date_url, model_url=model_url
+                )
+            break
+        # 1 件ずつ取得する（締め切りを機種ページごとに確認するため）
+        for key, df in iter_model_data(fetcher, [model_key]):
+            if df is None:
+                failed.append(key)
+                continue
+            done.append(key)
+            rows[key[4]] = len(df)
+            if not df.empty:
+                frames.append(df)
+    df_model = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    if "csv" in config.OUTPUT_FORMATS:
+        df_model.to_csv(f"data/csv/{pref}_{hall}_{date}.csv", index=False)
+    if checkpoint is not None:
+        # crawl_state には出力を書き終えてから checkpoint の内容を記録する
+        completed = (hall, date) if not failed and not deferred else None
+        checkpoint.save(done, failed, df_model, completed=completed, rows=rows)
+    return df_model
+
+
+def scrape_halls_sync(
+    hall_list: list[config.HallInfo],
+    fetch_mode: str = config.FETCH_MODE,
+    crawl_state: CrawlState | None = None,
+    checkpoint: RunCheckpoint | None = None,
+) -> list[pd.DataFrame]:
+    """ホールを 1 件ずつ順番に処理する（従来の同期エンジン）"""
+
+    frames: list[pd.DataFrame] = []
+    stats = FetchStats()
+    # Chromium は（必要になれば）1 回だけ起動し、全ホールで使い回す
+    with BrowserManager() as browser, open_page_cache(fetch_mode) as page_cache:
+        for i, h in enumerate(hall_list, start=1):
+            try:
+                encoded_slug = quote(h.slug)
+                hall_url = urljoin(config.MAIN_URL, encoded_slug)
+                logger.info("(%d/%d) 処理中: %s", i, len(hall_list), hall_url)
+                with METRICS.timer("hall", hall_url):
+                    df_hall = extract_result_data(
+                        hall_url,
+                        h.period,
+                        browser,
+                        fetch_mode,
+                        stats,
+                        crawl_state,
+                        page_cache,
+                        checkpoint,
+                    )
+                logger.debug(df_hall.shape)
+                if not df_hall.empty:
+                    frames.append(df_hall)
+            except Exception as e:
+                logger.exception("ホール処理でエラー: %s", e)
+        browser.log_summary()
+    stats.log_summary()
+
+    return frames
+
+
+def load_halls(test_mode: bool = False) -> tuple[list[config.HallInfo], dict]:
+    """halls.yaml のホール一覧と settings（test_mode なら先頭 2 件）"""
     if not os.path.exists(config.HALLS_YAML):
         raise FileNotFoundError(f"YAMLが見つかりません: {config.HALLS_YAML}")
     with open(config.HALLS_YAML, "r", encoding="utf-8") as f:
-        halls_cfg = yaml.safe_load(f).get("halls", [])
+        yaml_cfg = yaml.safe_load(f)
+    halls_cfg = yaml_cfg.get("halls", [])
+    settings = yaml_cfg.get("settings") or {}
 
     hall_list: list[config.HallInfo] = [
         config.HallInfo(slug=h["slug"], period=int(h["period"])) for h in halls_cfg
     ]
-    
     if test_mode:
         hall_list = hall_list[:2]
+    return hall_list, settings
+
+
+def scrape_halls_scheduled(
+    hall_list: list[config.HallInfo],
+    scheduler: Scheduler,
+    fetch_mode: str = config.FETCH_MODE,
+    crawl_state: CrawlState | None = None,
+    checkpoint: RunCheckpoint | None = None,
+) -> list[pd.DataFrame]:
+    """
+    時間予算つきの同期エンジン（--time-budget）
+    1) 全ホールのメインページから (ホール, 日付) を集める
+    2) 新しい日付 → データの古いホールの順に、日付ページ・機種ページを取得する
+    締め切りまでに終わらない作業は始めず、scheduler.remaining に残す
+    """
 
     frames: list[pd.DataFrame] = []
-    for i, h in enumerate(hall_list, start=1):
-        try:
-            encoded_slug = quote(h.slug)
-            hall_url = urljoin(config.MAIN_URL, encoded_slug)
-            logger.info("(%d/%d) 処理中: %s", i, len(hall_list), hall_url)
-            df_hall = extract_result_data(hall_url, h.period)
-            logger.debug(df_hall.shape)
-            if not df_hall.empty:
-                frames.append(df_hall)
-        except Exception as e:
-            logger.exception("ホール処理でエラー: %s", e)
+    stats = FetchStats()
+    hall_seconds: dict[str, float] = {}
+    # 前回残ったホールから先にメインページを取得する
+    carried = {u.get("slug") for u in scheduler.carried_over}
+    hall_list = sorted(hall_list, key=lambda h: h.slug not in carried)
+
+    with BrowserManager() as browser, open_page_cache(fetch_mode) as page_cache:
+        with create_fetcher(browser, fetch_mode, page_cache) as fetcher:
+            try:
+                units: list[DateUnit] = []
+                for i, h in enumerate(hall_list, start=1):
+                    if not scheduler.can_start("hall"):
+                        scheduler.defer("hall", slug=h.slug, period=h.period)
+                        continue
+                    hall_url = urljoin(config.MAIN_URL, quote(h.slug))
+                    logger.info("(%d/%d) 日付を取得中: %s", i, len(hall_list), hall_url)
+                    t0 = time.perf_counter()
+                    try:
+                        date_urls = extract_date_url(hall_url, fetcher, h.period, crawl_state)
+                    except FetchError as e:
+                        logger.error("ホールのメインページを取得できません: %s", e)
+                        continue
+                    finally:
+                        hall_seconds[h.slug] = time.perf_counter() - t0
+                    units += [DateUnit(h.slug, *d) for d in date_urls]
+
+                for unit in scheduler.order(units, crawl_state):
+                    if not scheduler.can_start("date"):
+                        scheduler.defer_date(unit)
+                        continue
+                    t0 = time.perf_counter()
+                    df = scrape_date(
+                        fetcher,
+                        unit.pref,
+                        unit.hall,
+                        unit.date,
+                        unit.date_url,
+                        crawl_state,
+                        checkpoint,
+                        scheduler,
+                    )
+                    hall_seconds[unit.slug] += time.perf_counter() - t0
+                    if not df.empty:
+                        frames.append(df)
+            finally:
+                stats.add(fetcher)
+                # ホールをまたいで取得するため、ホールごとの合計を hall_seconds に入れる
+                for slug, seconds in hall_seconds.items():
+                    METRICS.observe("hall_seconds", seconds, urljoin(config.MAIN_URL, quote(slug)))
+        browser.log_summary()
+    stats.log_summary()
+
+    return frames
+
+
+def commit_checkpoint(checkpoint: RunCheckpoint) -> None:
+    """出力を書き終えたあと、取得した分を crawl_state に記録してチェックポイントを削除する"""
+    with CrawlState(config.DB_PATH) as crawl_state:
+        crawl_state.mark_checkpoint(checkpoint)
+    checkpoint.clear()
+
+
+def main(
+    test_mode=False,
+    engine: str | None = None,
+    concurrency: int | None = None,
+    fetch_mode: str | None = None,
+    full_refresh: bool = False,
+    stream: bool = False,
+    sinks: tuple[str, ...] = ("sqlite",),
+    checkpoint: RunCheckpoint | None = None,
+    hall_list: list[config.HallInfo] | None = None,
+    time_budget: float | None = None,
+) -> pd.DataFrame:
+    """
+    stream=True の場合は取得したページを順にクリーニング・取り込みし、
+    DataFrame は組み立てない（空の DataFrame を返す）
+    checkpoint を渡すと中断した実行の続きから取得し、保存済みのデータも返す
+    （出力を書き終えたら呼び出し側で commit_checkpoint(checkpoint) する）
+    hall_list を渡すと halls.yaml のホール一覧の代わりに使う（--shard）
+    time_budget（秒）を渡すと新しい日付から順に取得し、締め切りの前に新しい作業を止める
+    （sync エンジンのみ。終わらなかった作業は config.REMAINING_WORK_PATH に書き出す）
+    """
+    start = time.perf_counter()
+
+    # yaml  読み込み
+    halls_from_yaml, settings = load_halls(test_mode)
+    if hall_list is None:
+        hall_list = halls_from_yaml
+
+    # 優先順位: 引数 > halls.yaml の settings > config
+    engine = engine or settings.get("engine", config.ENGINE)
+    concurrency = concurrency or int(settings.get("concurrency", config.ASYNC_CONCURRENCY))
+    rps = float(settings.get("rps", config.HOST_RPS))
+    fetch_mode = fetch_mode or settings.get("fetch_mode", config.FETCH_MODE)
+    if fetch_mode == "replay":
+        # キャッシュから解析し直すため、取得済みのページも飛ばさない
+        full_refresh = True
+
+    # 取得済みの (hall, date, model_url) は飛ばす（full_refresh で無効化）
+    with CrawlState(config.DB_PATH, full_refresh=full_refresh) as crawl_state:
+        if stream:
+            run_stream(hall_list, fetch_mode, crawl_state, sinks)
+            crawl_state.log_summary()
+            logger.info("全体処理時間: %.2f 秒", time.perf_counter() - start)
+            return pd.DataFrame()
+        frames = checkpoint.load_frames() if checkpoint is not None else []
+        if time_budget is not None and engine == "async":
+            logger.warning("--time-budget は sync エンジンのみ対応のため、sync で実行します")
+            engine = "sync"
+        if time_budget is not None:
+            scheduler = Scheduler(time_budget, remaining_path=config.REMAINING_WORK_PATH)
+            frames += scrape_halls_scheduled(
+                hall_list, scheduler, fetch_mode, crawl_state, checkpoint
+            )
+            scheduler.write_remaining()
+        elif engine == "async":
+            frames += run_async(
+                hall_list,
+                concurrency=concurrency,
+                rps=rps,
+                fetch_mode=fetch_mode,
+                crawl_state=crawl_state,
+                checkpoint=checkpoint,
+            )
+        else:
+            frames += scrape_halls_sync(hall_list, fetch_mode, crawl_state, checkpoint)
+        crawl_state.log_summary()
+        if checkpoint is not None:
+            checkpoint.log_summary()
 
     df_all = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
-    df_all.to_csv(config.OUTPUT_CSV)
+    if "csv" in config.OUTPUT_FORMATS:
+        df_all.to_csv(config.OUTPUT_CSV)
 
     # 列の順番を固定（下流の処理を安定化）
     cols = ["pref", "hall", "model", "date", "台番", "G数", "BB", "RB", "差枚"]
@@ -104,10 +372,128 @@ def main(test_mode=False) -> pd.DataFrame:
     return df_all
 
 
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="min-repo スクレイパー")
+    parser.add_argument(
+        "--all-halls", action="store_true", help="test_mode を解除して全ホールを処理"
+    )
+    parser.add_argument(
+        "--engine", choices=["sync", "async"], default=None, help="スクレイピングエンジン"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=None, help="async: 同時に処理するホール数"
+    )
+    parser.add_argument(
+        "--fetch",
+        choices=["http", "browser", "replay"],
+        default=None,
+        help="ページ取得方法（replay: ページキャッシュのみでネットワークに接続しない）",
+    )
+    parser.add_argument(
+        "--full-refresh",
+        action="store_true",
+        help="取得済みのページも含めて再取得する",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="ページ単位でクリーニングし、一定行数ごとに DB へ取り込む",
+    )
+    parser.add_argument(
+        "--sink",
+        nargs="+",
+        choices=["sqlite", "supabase", "parquet"],
+        default=["sqlite"],
+        help="--stream の取り込み先（複数指定可）",
+    )
+    parser.add_argument(
+        "--no-resume",
+        action="store_true",
+        help="中断した実行のチェックポイントを破棄して最初から取得する",
+    )
+    parser.add_argument(
+        "--shard",
+        type=parse_shard,
+        default=None,
+        metavar="i/N",
+        help="ホールを N 分割した i 番目だけ取得し、結果をシャードの出力に書く（shard.py merge でまとめる）",
+    )
+    parser.add_argument(
+        "--run-id",
+        default=default_run_id(),
+        help="--shard の出力先の識別子（同じ実行のシャードで揃える）",
+    )
+    parser.add_argument(
+        "--time-budget",
+        type=float,
+        default=None,
+        metavar="MINUTES",
+        help="時間予算（分）。新しい日付から順に取得し、締め切りまでに終わらない作業は次回に回す",
+    )
+    args = parser.parse_args()
+    if args.shard and args.stream:
+        parser.error("--shard と --stream は同時に指定できません")
+    if args.time_budget is not None and args.stream:
+        parser.error("--time-budget と --stream は同時に指定できません")
+    return args
+
+
 if __name__ == "__main__":
     
-    df = main(test_mode=True)
-    df = df_data_clean(df)
+    args = parse_args()
+    started_at = dt.datetime.now().isoformat(timespec="seconds")
+    hall_list = None
+    checkpoint_dir = config.CHECKPOINT_DIR
+    if args.shard:
+        index, shards = args.shard
+        # shard.py run で並列に動かしてもログのローテーションがぶつからないよう、シャードごとに分ける
+        split_log_files(f"_shard{index}of{shards}")
+        hall_list, _ = load_halls(test_mode=not args.all_halls)
+        plan = plan_shards(hall_list, shards)
+        hall_list = plan.halls(hall_list, index)
+        logger.info(
+            "シャード %d/%d: %d ホール（見積もり %.0f 秒, plan %s）",
+            index,
+            shards,
+            len(hall_list),
+            plan.estimates[index - 1],
+            plan.digest,
+        )
+        # 同じマシンで並列に動かしても混ざらないよう、シャードごとに分ける
+        checkpoint_dir = os.path.join(config.CHECKPOINT_DIR, f"shard-{index}-of-{shards}")
+        config.OUTPUT_CSV = config.OUTPUT_CSV.replace(".csv", f"_shard{index}of{shards}.csv")
+        config.REMAINING_WORK_PATH = config.REMAINING_WORK_PATH.replace(
+            ".json", f"_shard{index}of{shards}.json"
+        )
+    # --stream は取り込み済みを crawl_state で管理するためチェックポイントは使わない
+    checkpoint = None if args.stream else RunCheckpoint(checkpoint_dir, resume=not args.no_resume)
+    df = main(
+        test_mode=not args.all_halls,
+        engine=args.engine,
+        concurrency=args.concurrency,
+        fetch_mode=args.fetch,
+        full_refresh=args.full_refresh,
+        stream=args.stream,
+        sinks=tuple(args.sink),
+        checkpoint=checkpoint,
+        hall_list=hall_list,
+        time_budget=None if args.time_budget is None else args.time_budget * 60,
+    )
+    if args.shard:
+        # 出力・取り込みは shard.py merge でまとめて行う
+        df = df_data_clean(df, output_csv=None, reject_csv=None)
+        write_partial(df, args.run_id, index, plan, hall_list, started_at)
+        commit_checkpoint(checkpoint)
+    elif not args.stream:
+        clean_csv = config.CLEAN_CSV if "csv" in config.OUTPUT_FORMATS else None
+        df = df_data_clean(df, output_csv=clean_csv)
+        if "parquet" in config.OUTPUT_FORMATS:
+            append_results(df)
+        # 出力を書き終えたので取得済みとして記録し、次回は最初から取得する
+        commit_checkpoint(checkpoint)
+
+    # 段階ごとの p50/p95/max・カウンタを data/metrics/scraper.{json,prom} に出力
+    METRICS.write_report(f"scraper_shard{index}of{shards}" if args.shard else "scraper")
     
     # conn = sqlite3.connect(config.DB_PATH)
     # # cursor = conn.cursor()
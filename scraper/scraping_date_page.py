@@ -10,6 +10,11 @@ import config
 from logger_steup import setup_logger
 from utils import _norm_text
 from scraping_hall_page import extract_date_url
+from page_parser import MODEL_LINK_CSS, parse_date_page
+from model_catalog import CATALOG
+from fetcher import as_fetcher
+from crawl_state import CrawlState
+from metrics import METRICS
 
 # =========================
 # 設定・ロガー
@@ -21,36 +26,41 @@ logger = setup_logger(filename, log_file=config.LOG_PATH)
 # =========================
 # ページ操作
 # =========================
+@METRICS.timed("extract_model_url", label_arg="date_url")
 def extract_model_url(
-    page: Page, hall_name: str, pref: str, date_url: str, date: str
+    page: Page,
+    hall_name: str,
+    pref: str,
+    date_url: str,
+    date: str,
+    crawl_state: CrawlState | None = None,
 ) -> list[tuple[str, str, str, str, str]]:
     
     """
-    日付ページから、"ジャグラー" を含む機種リンクを抽出
+    日付ページから、機種カタログ（models.yaml）の対象機種のリンクを抽出
+    page には Playwright の Page かフェッチャー (fetcher.py) を渡す
+    crawl_state を渡すと取得済みの機種ページは除外する
     returns: List[(pref, hall_name, date, date_url, model_url)]
     """
     
+    fetcher = as_fetcher(page)
     logger.info("日付ページにアクセス: %s", date_url)
-    page.goto(date_url, timeout=90_000, wait_until="domcontentloaded")
-
-    title = _norm_text(page.locator("h1").first.text_content())
-    logger.info("Page title: %s", title)
 
     model_urls: list[tuple[str, str, str, str, str]] = []
-    css = "table.kishu tbody tr td a"
-    try:
-        page.wait_for_selector(css, timeout=10_000)
-    except PWTimeout:
+    html = fetcher.fetch(date_url, MODEL_LINK_CSS, reload=True)
+    if html is None:
         logger.warning("機種リンクが見つかりません: %s", date_url)
         return model_urls
 
-    links = page.locator(css)
-    count = links.count()
-    for j in range(count):
-        model_text = _norm_text(links.nth(j).inner_text())
-        if "ジャグラー" in model_text:
-            href = links.nth(j).get_attribute("href") or ""
-            model_urls.append((pref, hall_name, date, date_url, href))
+    # HTML を 1 回だけ取得して解析
+    title, links = parse_date_page(html)
+    logger.info("Page title: %s", title)
+
+    for _, href in CATALOG.filter_links(links):
+        model_urls.append((pref, hall_name, date, date_url, href))
+
+    if crawl_state is not None:
+        model_urls = crawl_state.filter_models(model_urls)
 
     logger.info("機種リンク抽出: %d 件", len(model_urls))
     if model_urls:
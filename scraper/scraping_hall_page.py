@@ -7,8 +7,12 @@ import datetime as dt
 import os
 
 import config
-from utils import _norm_text
+from utils import _norm_text, parse_date_text
 from logger_steup import setup_logger
+from page_parser import HALL_LINK_CSS, parse_hall_page
+from fetcher import as_fetcher
+from crawl_state import CrawlState
+from metrics import METRICS
 
 # =========================
 # 設定・ロガー
@@ -20,50 +24,46 @@ logger = setup_logger(filename, log_file=config.LOG_PATH)
 # =========================
 # ページ操作
 # =========================
-def extract_date_url(hall_url, page, period) -> list[tuple[str, str, str, str]]:
+@METRICS.timed("extract_date_url", label_arg="hall_url")
+def extract_date_url(
+    hall_url, page, period, crawl_state: CrawlState | None = None
+) -> list[tuple[str, str, str, str]]:
     
     """
     ホールのメインページから、直近 period 件の日付リンクを取得
+    page には Playwright の Page かフェッチャー (fetcher.py) を渡す
+    crawl_state を渡すと取得済みの日付は除外する
     returns: List[(prefecture, h_name, date(YYYY-MM-DD), date_url)]
     """
     
+    fetcher = as_fetcher(page)
     logger.info(f"ホールのメインページにアクセス: {hall_url}")
-    page.goto(hall_url, timeout=90_000, wait_until="domcontentloaded")
 
-    # ホール名・県名
-    h_name = _norm_text(page.locator("#content h1").first.text_content())
-    pref = _norm_text(page.locator("#content div span.todofuken").first.text_content())
+    # 日付リンク（HTML を 1 回だけ取得して解析）
+    html = fetcher.fetch(hall_url, HALL_LINK_CSS, reload=True)
+    if html is None:
+        logger.warning("日付リンクが見つかりません: %s", hall_url)
+        return []
+    h_name, pref, links = parse_hall_page(html)
     logger.info("Hall: %s / Pref: %s", h_name, pref)
 
-    # 日付リンク
-    css = "#content div table tbody tr td a"
-    page.wait_for_selector(css, timeout=15_000)
-    links = page.locator(css)
-    count = links.count()
+    count = len(links)
     logger.debug(f"link取得数: {count}")
     take = min(period, count)
     logger.debug(f"take: {take}")
 
     date_urls: list[tuple[str, str, str, str]] = []
-    for i in range(take):
-        href = links.nth(i).get_attribute("href") or ""
-        date_text = _norm_text(links.nth(i).inner_text())
-
+    for date_text, href in links[:take]:
         # "YYYY/MM/DD" or "M/D" に対応
-        m = re.match(r"(?:(\d{4})/)?(\d{1,2})/(\d{1,2})", date_text)
-        if not m:
+        date_iso = parse_date_text(date_text)
+        if date_iso is None:
             logger.warning("日付文字列を解釈できません: %s", date_text)
             continue
-        y, mth, d = m.groups()
-        if y is None:
-            y = str(dt.date.today().year)
-        try:
-            date_iso = dt.date(int(y), int(mth), int(d)).strftime("%Y-%m-%d")
-        except ValueError:
-            logger.warning("日付に変換できません: %s", date_text)
-            continue
 
-        date_urls.append((pref, h_name, date_iso, href))
+        date_urls.append((pref, h_name, date_iso, urljoin(hall_url, href)))
+
+    if crawl_state is not None:
+        date_urls = crawl_state.filter_dates(date_urls)
 
     logger.info("取得した日付URL: %d 件", len(date_urls))
     if date_urls:
@@ -5,12 +5,18 @@ from urllib.parse import quote, urljoin
 import re
 import datetime as dt
 import os
+import time
+from typing import Iterator
 
 import config
-from logger_steup import setup_logger
+from logger_steup import log_rows_sampled, setup_logger
 from utils import _norm_text, extract_model_name
 from scraping_hall_page import extract_date_url
 from scraping_date_page import extract_model_url
+from page_parser import MODEL_ROW_CSS, parse_model_page, pick_model_name
+from fetcher import as_fetcher
+from retry import FetchError
+from metrics import METRICS
 
 # =========================
 # 設定・ロガー
@@ -22,67 +28,52 @@ logger = setup_logger(filename, log_file=config.LOG_PATH)
 # =========================
 # ページ操作
 # =========================
-def extract_model_data(
+def iter_model_data(
     page: Page, model_urls: list[tuple[str, str, str, str, str]]
-) -> pd.DataFrame:
+) -> Iterator[tuple[tuple[str, str, str, str, str], pd.DataFrame | None]]:
     
     """
-    各機種ページに移動し、台データを DataFrame で返す
-    返却列: 台番/G数/差枚/BB/RB + pref/hall/model/date
+    機種ページを 1 件ずつ取得し、(model_urls の要素, DataFrame) を順に返す
+    - テーブルが無いページ（データなし）は空の DataFrame
+    - 取得に失敗したページ（リトライ後も失敗）は None（次回の実行で取り直す）
+    1 ページの失敗で同じ日付の他の機種ページは止めない
     """
 
-    frames: list[pd.DataFrame] = []
+    fetcher = as_fetcher(page)
 
-    for pref, hall, date, date_url, model_url in model_urls:
+    for model_key in model_urls:
+        pref, hall, date, date_url, model_url = model_key
         url = urljoin(date_url, model_url)
         logger.info(f"機種ページにアクセス: {url}")
-        page.goto(url, timeout=90_000, wait_until="domcontentloaded")
-        page.reload()  # これは必ず入れる!!!
-
-        # 機種名 (h2 に "ジャグラー" を含むものを優先)
-        model = ""
-        css = "div.tab_content > h2"
+        t0 = time.perf_counter()
         try:
-            TARGET_MODEL = "ジャグラー"
-            page.wait_for_selector(css, timeout=10_000)
-            h2s = page.locator(css)
-            for i in range(h2s.count()):
-                txt = extract_model_name(h2s.nth(i).inner_text())
-                if TARGET_MODEL in txt:
-                    model = txt
-                    break
-            if not model and h2s.count():
-                model = extract_model_name(h2s.nth(i).inner_text())
+            # ブラウザで取得する場合、描画されていなければ 1 回だけ再読み込みする
+            html = fetcher.fetch(url, MODEL_ROW_CSS, reload=True)
+        except FetchError as e:
+            logger.error("機種ページを取得できません: %s", e)
+            METRICS.incr("model_pages_failed")
+            yield model_key, None
+            continue
+        if html is None:
+            logger.debug("テーブルが見つかりません。")
+            METRICS.observe("extract_model_page_seconds", time.perf_counter() - t0, url)
+            METRICS.incr("model_pages_without_table")
+            yield model_key, pd.DataFrame()
+            continue
+
+        # 機種名・テーブルを HTML 1 回の取得でまとめて解析
+        titles, header, table = parse_model_page(html)
+
+        # 機種名（カタログの対象機種の h2 を優先し、正式名にする）
+        model = pick_model_name(titles)
+        if model:
             logger.info(f"機種名: {model}")
-        except PWTimeout:
+        else:
             logger.warning("機種タイトルが取得できませんでした: %s", url)
 
-        # テーブルの取得
-        css = "div > div.table_wrap > table > tbody > tr"
-        try:
-            page.wait_for_selector(css, timeout=15_000)
-        except PWTimeout:
-            logger.debug("テーブルが見つかりません。")
-            return []
-
-        rows = page.locator(css)
-        # th行(header)処理
-        ths = rows.nth(0).locator("th")
-        header = [_norm_text(ths.nth(i).inner_text()) for i in range(ths.count())]
         logger.debug(header)
-        # td(date)行処理
-        table: list[list[str]] = []
-        for j in range(rows.count()):
-            tds = rows.nth(j).locator("td")
-            row = []
-            for k in range(tds.count()):
-                row.append(_norm_text(tds.nth(k).inner_text()))
-            if row:  # 空行スキップ
-                table.append(row)
-
         logger.info(f"{len(table)} 行の機種データを取得")
-        for t in table:
-            logger.debug(t)
+        log_rows_sampled(logger, table, url)
 
         df = pd.DataFrame(table, columns=header)
         df = df[~df["台番"].astype(str).str.contains("平均")]
@@ -90,7 +81,27 @@ def extract_model_data(
         df["hall"] = hall
         df["model"] = model
         df["date"] = date
-        frames.append(df)
+        METRICS.observe("extract_model_page_seconds", time.perf_counter() - t0, url)
+        METRICS.observe("model_page_rows", len(df), url)
+        yield model_key, df
+
+
+def extract_model_data(
+    page: Page, model_urls: list[tuple[str, str, str, str, str]]
+) -> pd.DataFrame:
+    
+    """
+    各機種ページに移動し、台データを DataFrame で返す
+    page には Playwright の Page かフェッチャー (fetcher.py) を渡す
+    返却列: 台番/G数/差枚/BB/RB + pref/hall/model/date
+    """
+
+    frames: list[pd.DataFrame] = []
+
+    for _, df in iter_model_data(page, model_urls):
+        # データなし・取得失敗のページは飛ばし、他の機種ページは残す
+        if df is not None and not df.empty:
+            frames.append(df)
 
     return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
 
@@ -0,0 +1,405 @@
+import argparse
+from dataclasses import dataclass
+import datetime as dt
+import hashlib
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+from urllib.parse import quote, urljoin
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+import config
+from logger_steup import setup_logger
+from metrics import METRICS
+from parquet_store import KEY_COLUMNS, SCHEMA, append_results, to_arrow_table
+
+# =========================
+# 設定・ロガー
+# =========================
+filename, ext = os.path.splitext(os.path.basename(__file__))
+logger = setup_logger(filename, log_file=config.LOG_PATH)
+
+
+# =========================
+# シャード分割
+# =========================
+# halls.yaml のホールを N 個のシャードに分け、別々のプロセス（CI のジョブ）で取得する
+#   python scraper/scraper.py --all-halls --shard 1/4 --run-id <ID>   （4 分割の 1 番目）
+#   python scraper/shard.py merge --run-id <ID> [--sink csv parquet sqlite supabase]
+#   python scraper/shard.py run --shards 4 [--sink ...] [-- scraper.py の引数]（ローカルで N プロセス）
+#   python scraper/shard.py plan --shards 4   （割り当てと見積もり時間を表示）
+# 各シャードは <SHARD_DIR>/<run_id>/shard-<i>-of-<N>/ に results.parquet と manifest.json を書き、
+# merge がそれらをまとめて 1 回だけ取り込む
+def parse_shard(text: str) -> tuple[int, int]:
+    """'i/N' -> (i, N)（i は 1 始まり）"""
+    try:
+        index, shards = (int(x) for x in text.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"--shard は i/N の形式で指定してください: {text}")
+    if not 1 <= index <= shards:
+        raise argparse.ArgumentTypeError(f"--shard の i は 1〜N で指定してください: {text}")
+    return index, shards
+
+
+def default_run_id() -> str:
+    """CI では GITHUB_RUN_ID（同じ実行のシャードが同じ ID になる）、ローカルでは 'local'"""
+    return os.environ.get("GITHUB_RUN_ID", "local")
+
+
+def stable_hash(slug: str) -> int:
+    """プロセス・実行環境によらない hash（組み込みの hash() は実行ごとに変わる）"""
+    return int.from_bytes(hashlib.sha1(slug.encode("utf-8")).digest()[:8], "big")
+
+
+def hall_url(slug: str) -> str:
+    return urljoin(config.MAIN_URL, quote(slug))
+
+
+# ---------- ホールごとの所要時間 ----------
+def load_runtimes(path: str = config.HALL_RUNTIME_PATH) -> dict[str, float]:
+    """ホールごとの 1 日あたりの所要時間（秒）。過去の実行の指数移動平均"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def update_runtimes(
+    observed: dict[str, float],
+    path: str = config.HALL_RUNTIME_PATH,
+    alpha: float = config.HALL_RUNTIME_ALPHA,
+) -> None:
+    """observed: ホール -> 今回の 1 日あたりの秒数"""
+    runtimes = load_runtimes(path)
+    for slug, seconds in observed.items():
+        prev = runtimes.get(slug)
+        runtimes[slug] = seconds if prev is None else alpha * seconds + (1 - alpha) * prev
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(runtimes, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def estimate_seconds(hall: config.HallInfo, runtimes: dict[str, float]) -> float:
+    """見積もり = 1 日あたりの秒数 × period（記録の無いホールは記録のあるホールの中央値）"""
+    per_day = runtimes.get(hall.slug)
+    if per_day is None:
+        per_day = statistics.median(runtimes.values()) if runtimes else 1.0
+    return per_day * hall.period
+
+
+# ---------- 割り当て ----------
+@dataclass
+class ShardPlan:
+    shards: int
+    assignments: list[list[str]]  # シャード（0 始まり）-> slug
+    estimates: list[float]  # シャードごとの見積もり秒数
+    digest: str  # 割り当ての識別子（merge で全シャードが同じ割り当てか確認する）
+
+    def halls(self, hall_list: list[config.HallInfo], index: int) -> list[config.HallInfo]:
+        """index（1 始まり）番目のシャードのホール（halls.yaml の順）"""
+        slugs = set(self.assignments[index - 1])
+        return [h for h in hall_list if h.slug in slugs]
+
+
+def plan_shards(
+    hall_list: list[config.HallInfo],
+    shards: int,
+    runtimes: dict[str, float] | None = None,
+) -> ShardPlan:
+    """
+    見積もり時間の長いホールから順に、合計がいちばん短いシャードへ入れる
+    同じ見積もりのホールは stable_hash 順に並べるため、入力が同じなら常に同じ割り当てになる
+    """
+    runtimes = load_runtimes() if runtimes is None else runtimes
+    weights = {h.slug: estimate_seconds(h, runtimes) for h in hall_list}
+    order = sorted(hall_list, key=lambda h: (-round(weights[h.slug], 3), stable_hash(h.slug)))
+
+    assignments: list[list[str]] = [[] for _ in range(shards)]
+    loads = [0.0] * shards
+    for h in order:
+        j = min(range(shards), key=lambda k: (loads[k], k))
+        assignments[j].append(h.slug)
+        loads[j] += weights[h.slug]
+
+    digest = hashlib.sha1(
+        json.dumps(assignments, ensure_ascii=False).encode("utf-8")
+    ).hexdigest()[:12]
+    return ShardPlan(shards, assignments, loads, digest)
+
+
+# =========================
+# 部分出力
+# =========================
+def run_dir(run_id: str, root: str = config.SHARD_DIR) -> str:
+    return os.path.join(root, run_id)
+
+
+def shard_dir(run_id: str, index: int, shards: int, root: str = config.SHARD_DIR) -> str:
+    return os.path.join(run_dir(run_id, root), f"shard-{index}-of-{shards}")
+
+
+def hall_seconds(hall_list: list[config.HallInfo]) -> dict[str, float]:
+    """この実行で計測したホールごとの所要時間（METRICS の hall_seconds）"""
+    slugs = {hall_url(h.slug): h.slug for h in hall_list}
+    out: dict[str, float] = {}
+    for seconds, label in METRICS.samples("hall_seconds"):
+        if label in slugs:
+            out[slugs[label]] = out.get(slugs[label], 0.0) + seconds
+    return out
+
+
+def write_partial(
+    df: pd.DataFrame,
+    run_id: str,
+    index: int,
+    plan: ShardPlan,
+    hall_list: list[config.HallInfo],
+    started_at: str,
+    root: str = config.SHARD_DIR,
+) -> str:
+    """
+    シャードの結果（df_clean 後）を results.parquet と manifest.json に書き出す
+    書き終えてからディレクトリを置き換えるため、merge が書きかけを読むことはない
+    """
+    out = shard_dir(run_id, index, plan.shards, root)
+    tmp = out + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    table = to_arrow_table(df) if not df.empty else SCHEMA.empty_table()
+    pq.write_table(table, os.path.join(tmp, "results.parquet"))
+
+    seconds = hall_seconds(hall_list)
+    periods = {h.slug: h.period for h in hall_list}
+    manifest = {
+        "run_id": run_id,
+        "shard": index,
+        "shards": plan.shards,
+        "plan": plan.digest,
+        "halls": plan.assignments[index - 1],
+        "rows": table.num_rows,
+        "estimated_seconds": plan.estimates[index - 1],
+        # 次回の割り当て用（1 日あたりの秒数）
+        "seconds_per_day": {s: v / max(periods[s], 1) for s, v in seconds.items()},
+        "started_at": started_at,
+        "finished_at": dt.datetime.now().isoformat(timespec="seconds"),
+        "counters": METRICS.summary()["counters"],
+    }
+    with open(os.path.join(tmp, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    shutil.rmtree(out, ignore_errors=True)
+    os.replace(tmp, out)
+    logger.info(
+        "シャード %d/%d の結果を保存: %s (%d 行)", index, plan.shards, out, table.num_rows
+    )
+    return out
+
+
+# =========================
+# マージ
+# =========================
+def read_manifests(run_id: str, root: str = config.SHARD_DIR) -> list[tuple[str, dict]]:
+    """(ディレクトリ, manifest) をシャード番号順に返す"""
+    base = run_dir(run_id, root)
+    if not os.path.isdir(base):
+        return []
+    out = []
+    for name in sorted(os.listdir(base)):
+        path = os.path.join(base, name, "manifest.json")
+        if name.startswith("shard-") and not name.endswith(".tmp") and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                out.append((os.path.join(base, name), json.load(f)))
+    return sorted(out, key=lambda x: x[1]["shard"])
+
+
+def combine_partials(run_id: str, root: str = config.SHARD_DIR) -> tuple[pd.DataFrame, list[dict]]:
+    """
+    シャードの結果をまとめる（欠けているシャード・割り当ての食い違いはログに出す）
+    同じ台が複数のシャードにあれば 1 行にし、並びを KEY_COLUMNS 順に揃える
+    （シャードの終わった順によらず同じ結果になる）
+    """
+    partials = read_manifests(run_id, root)
+    if not partials:
+        raise FileNotFoundError(f"シャードの結果がありません: {run_dir(run_id, root)}")
+    manifests = [m for _, m in partials]
+
+    shards = {m["shards"] for m in manifests}
+    plans = {m["plan"] for m in manifests}
+    if len(shards) > 1 or len(plans) > 1:
+        logger.warning(
+            "シャードの分割が揃っていません（分割数 %s / 割り当て %s）。重複は 1 行にまとめます",
+            sorted(shards),
+            sorted(plans),
+        )
+    missing = sorted(set(range(1, max(shards) + 1)) - {m["shard"] for m in manifests})
+    if missing:
+        logger.error(
+            "結果の無いシャード: %s（同じ run_id で再実行してから merge し直してください）", missing
+        )
+
+    frames = [pd.read_parquet(os.path.join(path, "results.parquet")) for path, _ in partials]
+    df = pd.concat(frames, ignore_index=True)
+    before = len(df)
+    df = df.drop_duplicates(subset=KEY_COLUMNS, keep="first")
+    df = df.sort_values(KEY_COLUMNS, kind="stable").reset_index(drop=True)
+    logger.info(
+        "シャード %d 件をまとめました: %d 行（重複 %d 行）",
+        len(manifests),
+        len(df),
+        before - len(df),
+    )
+    return df, manifests
+
+
+def load_sink(df: pd.DataFrame, sink: str) -> None:
+    """まとめた結果を出力・取り込む（どの取り込み先も同じデータを 2 回入れても重複しない）"""
+    if sink == "csv":
+        df.to_csv(config.CLEAN_CSV, index=False)
+    elif sink == "parquet":
+        append_results(df)
+    elif sink == "sqlite":
+        import df_to_db
+        from sqlite_profile import bulk_load, connect_for_ingest
+
+        conn = connect_for_ingest(config.DB_PATH)
+        try:
+            with bulk_load(conn, rows=len(df)):
+                df_to_db.add_data_result(conn, conn.cursor(), df)
+        finally:
+            conn.close()
+    elif sink == "supabase":
+        import df_to_supabase
+
+        df_to_supabase.load_results(df, df_to_supabase.get_supabase_client())
+
+
+def merge(
+    run_id: str,
+    sinks: list[str],
+    force: bool = False,
+    root: str = config.SHARD_DIR,
+) -> dict:
+    """
+    シャードの結果をまとめて取り込み、ホールごとの所要時間を更新する
+    取り込み済みの取り込み先は merged.json に記録し、再実行しても取り込まない
+    （後から届いたシャードがある場合・force の場合は取り込み直す）
+    """
+    marker = os.path.join(run_dir(run_id, root), "merged.json")
+    shards = [m["shard"] for _, m in read_manifests(run_id, root)]
+    done: dict = {}
+    if os.path.exists(marker) and not force:
+        with open(marker, encoding="utf-8") as f:
+            done = json.load(f)
+        if done["shards"] != shards:
+            logger.info("前回の merge の後にシャードが増えたため取り込み直します: %s", shards)
+            done = {}
+    todo = [s for s in sinks if s not in done.get("sinks", [])]
+    if not todo:
+        logger.info("取り込み済みです: %s (%s)", run_id, ", ".join(sinks))
+        return done
+
+    df, manifests = combine_partials(run_id, root)
+    if not done.get("runtimes_updated"):
+        observed = {}
+        for m in manifests:
+            observed.update(m.get("seconds_per_day", {}))
+        update_runtimes(observed)
+
+    done = {
+        "run_id": run_id,
+        "rows": len(df),
+        "shards": shards,
+        "sinks": list(done.get("sinks", [])),
+        "runtimes_updated": True,
+    }
+    for sink in todo:
+        with METRICS.timer("shard_merge", sink):
+            load_sink(df, sink)
+        # 取り込み先ごとに記録する（途中で失敗しても、済んだ取り込み先は次回飛ばす）
+        done["sinks"].append(sink)
+        done["merged_at"] = dt.datetime.now().isoformat(timespec="seconds")
+        with open(marker, "w", encoding="utf-8") as f:
+            json.dump(done, f, ensure_ascii=False, indent=2)
+        logger.info("シャードの結果を取り込みました: %s → %s", run_id, sink)
+    return done
+
+
+# =========================
+# ローカル実行
+# =========================
+def run_local(shards: int, run_id: str, sinks: list[str], scraper_args: list[str]) -> int:
+    """scraper.py を N プロセスで実行し、終わったらマージする"""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scraper.py")
+    start = time.perf_counter()
+    procs = [
+        subprocess.Popen(
+            [sys.executable, script, "--shard", f"{i}/{shards}", "--run-id", run_id, *scraper_args]
+        )
+        for i in range(1, shards + 1)
+    ]
+    codes = [p.wait() for p in procs]
+    failed = [i for i, code in enumerate(codes, start=1) if code != 0]
+    if failed:
+        logger.error("失敗したシャード: %s", failed)
+    logger.info("全シャード終了: %.2f 秒", time.perf_counter() - start)
+
+    merge(run_id, sinks)
+    return 1 if failed else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="ホールのシャード分割・マージ")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_plan = sub.add_parser("plan", help="割り当てと見積もり時間を表示")
+    p_plan.add_argument("--shards", type=int, required=True)
+    p_plan.add_argument("--all-halls", action="store_true", help="test_mode を解除")
+
+    sink_args = {
+        "nargs": "+",
+        "choices": ["csv", "parquet", "sqlite", "supabase"],
+        "default": list(config.OUTPUT_FORMATS),
+        "help": "取り込み先（既定は config.OUTPUT_FORMATS）",
+    }
+    p_merge = sub.add_parser("merge", help="シャードの結果をまとめて取り込む")
+    p_merge.add_argument("--run-id", default=default_run_id())
+    p_merge.add_argument("--sink", **sink_args)
+    p_merge.add_argument("--force", action="store_true", help="取り込み済みでも取り込み直す")
+
+    p_run = sub.add_parser("run", help="ローカルで N プロセス実行してマージする")
+    p_run.add_argument("--shards", type=int, required=True)
+    p_run.add_argument("--run-id", default=None)
+    p_run.add_argument("--sink", **sink_args)
+    p_run.add_argument("scraper_args", nargs=argparse.REMAINDER, help="scraper.py の引数（-- の後）")
+
+    args = parser.parse_args()
+    if args.command == "plan":
+        from scraper import load_halls
+
+        hall_list, _ = load_halls(test_mode=not args.all_halls)
+        plan = plan_shards(hall_list, args.shards)
+        for i, (slugs, seconds) in enumerate(zip(plan.assignments, plan.estimates), start=1):
+            print(f"shard {i}/{args.shards}: {len(slugs)} ホール / 見積もり {seconds:.0f} 秒")
+            for slug in slugs:
+                print(f"  {slug}")
+        print(f"plan: {plan.digest}")
+    elif args.command == "merge":
+        merge(args.run_id, args.sink, force=args.force)
+        METRICS.write_report("shard_merge")
+    else:
+        run_id = args.run_id or dt.datetime.now().strftime("local_%Y%m%d_%H%M%S")
+        scraper_args = [a for a in args.scraper_args if a != "--"]
+        sys.exit(run_local(args.shards, run_id, args.sink, scraper_args))
+
+
+if __name__ == "__main__":
+    main()
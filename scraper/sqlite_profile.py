@@ -0,0 +1,85 @@
+from contextlib import contextmanager
+import os
+import sqlite3
+import time
+
+import config
+from logger_steup import setup_logger
+
+# =========================
+# 設定・ロガー
+# =========================
+filename, ext = os.path.splitext(os.path.basename(__file__))
+logger = setup_logger(filename, log_file=config.LOG_PATH)
+
+
+# results のセカンダリインデックス（utils/create_databese.py と同じ定義）
+# idx_results_unique は INSERT OR IGNORE の重複判定に使うため対象外
+SECONDARY_INDEXES = {
+    "idx_results_hall_date": "CREATE INDEX IF NOT EXISTS idx_results_hall_date ON results (hall_id, date)",
+    "idx_results_model_date": "CREATE INDEX IF NOT EXISTS idx_results_model_date ON results (model_id, date)",
+}
+
+
+# =========================
+# PRAGMA
+# =========================
+def apply_ingest_profile(conn: sqlite3.Connection) -> None:
+    """
+    書き込み向けの PRAGMA を設定する
+    WAL にしておくと、取り込み中でも分析側のクエリが読み取れる
+    """
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute(f"PRAGMA synchronous = {config.SQLITE_SYNCHRONOUS}")
+    conn.execute(f"PRAGMA cache_size = {int(config.SQLITE_CACHE_SIZE)}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    conn.execute(f"PRAGMA mmap_size = {int(config.SQLITE_MMAP_SIZE)}")
+
+
+def connect_for_ingest(db_path: str = config.DB_PATH) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path)
+    apply_ingest_profile(conn)
+    return conn
+
+
+# =========================
+# インデックス
+# =========================
+def drop_secondary_indexes(conn: sqlite3.Connection) -> None:
+    with conn:
+        for name in SECONDARY_INDEXES:
+            conn.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+def rebuild_secondary_indexes(conn: sqlite3.Connection) -> None:
+    with conn:
+        for sql in SECONDARY_INDEXES.values():
+            conn.execute(sql)
+
+
+def optimize(conn: sqlite3.Connection) -> None:
+    """統計情報を更新してクエリプランナーに反映する"""
+    conn.execute("ANALYZE")
+    conn.execute("PRAGMA optimize")
+
+
+@contextmanager
+def bulk_load(conn: sqlite3.Connection, rows: int = 0):
+    """
+    大量取り込み用のコンテキスト
+    - rows が config.SQLITE_INDEX_REBUILD_ROWS 以上ならセカンダリインデックスを外して後で作り直す
+    - 終了後に ANALYZE / PRAGMA optimize を実行する
+    """
+    apply_ingest_profile(conn)
+    rebuild = rows >= config.SQLITE_INDEX_REBUILD_ROWS
+    if rebuild:
+        logger.info("セカンダリインデックスを一時的に削除します (%d 行)", rows)
+        drop_secondary_indexes(conn)
+    try:
+        yield conn
+    finally:
+        t0 = time.perf_counter()
+        if rebuild:
+            rebuild_secondary_indexes(conn)
+        optimize(conn)
+        logger.info("インデックス再構築 / ANALYZE: %.2f 秒", time.perf_counter() - t0)
@@ -1,3 +1,4 @@
+import datetime as dt
 import re
 import unicodedata
 
@@ -13,6 +14,23 @@ def _norm_text(s: str | None) -> str:
     return str(s).strip()
 
 
+def parse_date_text(date_text: str) -> str | None:
+    """
+    "YYYY/MM/DD" or "M/D" 形式の文字列を "YYYY-MM-DD" に変換する
+    解釈できない場合は None
+    """
+    m = re.match(r"(?:(\d{4})/)?(\d{1,2})/(\d{1,2})", date_text)
+    if not m:
+        return None
+    y, mth, d = m.groups()
+    if y is None:
+        y = str(dt.date.today().year)
+    try:
+        return dt.date(int(y), int(mth), int(d)).strftime("%Y-%m-%d")
+    except ValueError:
+        return None
+
+
 def extract_model_name(text: str) -> str:
     """
     'ハッピージャグラーＶＩＩＩ　グラフ一覧' のような文字列から
@@ -24,10 +42,16 @@ def extract_model_name(text: str) -> str:
     # 1️⃣ 「グラフ一覧」などの末尾を除去（スペースや全角空白も考慮）
     name = re.sub(r"[　\s]*(グラフ一覧|一覧|データ一覧).*", "", text)
 
-    # 2️⃣ 全角英数字・記号を半角に（例：ＶＩＩＩ → VIII）
-    name = unicodedata.normalize("NFKC", name)
+    # 2️⃣ 全角英数字・記号を半角に（例：ＶＩＩＩ → VIII）、空白を整理
+    return normalize_model_name(name)
 
-    # 3️⃣ 前後の空白をトリム
-    name = name.strip()
 
-    return name
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_model_name(name: str) -> str:
+    """
+    機種名の表記を揃える（model_catalog の照合と共通）
+    NFKC で全角英数字・記号を半角にし、連続する空白を 1 つにして前後をトリムする
+    """
+    return _SPACES.sub(" ", unicodedata.normalize("NFKC", name)).strip()
@@ -0,0 +1,70 @@
+from collections import deque
+import os
+import threading
+
+import numpy as np
+
+import config
+from logger_steup import setup_logger
+
+# =========================
+# 設定・ロガー
+# =========================
+filename, ext = os.path.splitext(os.path.basename(__file__))
+logger = setup_logger(filename, log_file=config.LOG_PATH)
+
+
+# =========================
+# 待ち時間
+# =========================
+class WaitPolicy:
+    """
+    ページ種別ごとの所要時間から待ち時間（ミリ秒）を決める
+    - key は "navigate" か、ページの必須要素のセレクタ（= ページ種別）
+    - 直近 window 件の p95 × factor を [min_ms, max_ms] に収める
+    - タイムアウトした場合は待った時間をそのまま記録する（遅くなれば待ち時間も伸びる）
+    """
+
+    def __init__(
+        self,
+        window: int = config.WAIT_WINDOW,
+        min_samples: int = config.WAIT_MIN_SAMPLES,
+        factor: float = config.WAIT_P95_FACTOR,
+        min_ms: int = config.WAIT_MIN_MS,
+        max_ms: int = config.WAIT_MAX_MS,
+        initial_ms: dict[str, int] = config.WAIT_INITIAL_MS,
+    ):
+        self.window = window
+        self.min_samples = min_samples
+        self.factor = factor
+        self.min_ms = min_ms
+        self.max_ms = max_ms
+        self.initial_ms = initial_ms
+        self._samples: dict[str, deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, key: str, seconds: float) -> None:
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self.window)).append(seconds)
+
+    def timeout_ms(self, key: str) -> int:
+        with self._lock:
+            samples = list(self._samples.get(key, ()))
+        if len(samples) < self.min_samples:
+            return self.initial_ms["navigate" if key == "navigate" else "selector"]
+        p95_ms = float(np.percentile(samples, 95)) * 1000
+        return int(min(max(p95_ms * self.factor, self.min_ms), self.max_ms))
+
+    def reset(self) -> None:
+        with self._lock:
+            self._samples.clear()
+
+    def log_summary(self) -> None:
+        with self._lock:
+            keys = list(self._samples)
+        for key in keys:
+            logger.info("待ち時間 [%s]: %d ms", key, self.timeout_ms(key))
+
+
+# プロセス全体で共有する（sync / async のどちらのフェッチャーからも使う）
+WAIT_POLICY = WaitPolicy()
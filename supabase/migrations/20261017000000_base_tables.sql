@@ -0,0 +1,32 @@
+-- 取り込み先のテーブル（utils/create_databese.py の SQLite 版と同じ定義）
+-- 既存のプロジェクトでは何もしない。空の Postgres（ローカルのコンテナなど）に
+-- マイグレーションを順に流すと、本番と同じ構成で取り込みを試せる
+
+create table if not exists public.prefectures (
+    prefecture_id bigint generated by default as identity primary key,
+    name text not null unique
+);
+
+create table if not exists public.halls (
+    hall_id bigint generated by default as identity primary key,
+    name text not null,
+    prefecture_id bigint not null references public.prefectures (prefecture_id),
+    unique (name, prefecture_id)
+);
+
+create table if not exists public.models (
+    model_id bigint generated by default as identity primary key,
+    name text not null unique
+);
+
+create table if not exists public.results (
+    hall_id bigint not null references public.halls (hall_id),
+    model_id bigint not null references public.models (model_id),
+    unit_no integer not null,
+    date date not null,
+    game integer,
+    bb integer,
+    rb integer,
+    medal integer,
+    unique (hall_id, model_id, unit_no, date)
+);
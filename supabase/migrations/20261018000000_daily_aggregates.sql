@@ -0,0 +1,125 @@
+-- 日次の集計テーブル（scraper/aggregates.py の SQLite 版と同じ定義）
+-- 取り込み後に df_to_supabase が refresh_daily_aggregates を呼び、
+-- 取り込んだ (hall_id, date) の分だけ集計し直す
+-- 平均や BB・RB 確率は 合計 / units、game / bb のように読み取り側で計算する
+
+create table if not exists public.agg_hall_date (
+    hall_id bigint not null,
+    date date not null,
+    units integer not null,
+    game bigint,
+    medal bigint,
+    bb bigint,
+    rb bigint,
+    win_units integer,
+    primary key (hall_id, date)
+);
+
+create table if not exists public.agg_model_date (
+    model_id bigint not null,
+    date date not null,
+    units integer not null,
+    game bigint,
+    medal bigint,
+    bb bigint,
+    rb bigint,
+    win_units integer,
+    primary key (model_id, date)
+);
+
+create table if not exists public.agg_hall_model_date (
+    hall_id bigint not null,
+    date date not null,
+    model_id bigint not null,
+    units integer not null,
+    game bigint,
+    medal bigint,
+    bb bigint,
+    rb bigint,
+    win_units integer,
+    primary key (hall_id, date, model_id)
+);
+
+-- digit: 台番の末尾 (unit_no % 10)
+create table if not exists public.agg_hall_digit_date (
+    hall_id bigint not null,
+    date date not null,
+    digit integer not null,
+    units integer not null,
+    game bigint,
+    medal bigint,
+    bb bigint,
+    rb bigint,
+    win_units integer,
+    primary key (hall_id, date, digit)
+);
+
+-- p_keys: [{"hall_id": 1, "date": "2026-10-01"}, ...]。null なら全件作り直す
+create or replace function public.refresh_daily_aggregates(p_keys jsonb default null)
+returns integer
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    n integer;
+begin
+    create temp table if not exists agg_keys (hall_id bigint, date date, primary key (hall_id, date))
+        on commit drop;
+    create temp table if not exists agg_model_keys (model_id bigint, date date, primary key (model_id, date))
+        on commit drop;
+    truncate agg_keys, agg_model_keys;
+
+    if p_keys is null then
+        insert into agg_keys select distinct r.hall_id, r.date from results r;
+    else
+        insert into agg_keys
+        select distinct (k ->> 'hall_id')::bigint, (k ->> 'date')::date
+        from jsonb_array_elements(p_keys) as k;
+    end if;
+    get diagnostics n = row_count;
+
+    -- 機種 × 日付は、対象の (hall_id, date) に含まれる機種の日付分を集計し直す
+    insert into agg_model_keys
+    select distinct r.model_id, r.date
+    from agg_keys k join results r on r.hall_id = k.hall_id and r.date = k.date;
+
+    delete from agg_hall_date a using agg_keys k
+    where a.hall_id = k.hall_id and a.date = k.date;
+    insert into agg_hall_date
+    select r.hall_id, r.date, count(*), sum(r.game), sum(r.medal), sum(r.bb), sum(r.rb),
+           count(*) filter (where r.medal > 0)
+    from agg_keys k join results r on r.hall_id = k.hall_id and r.date = k.date
+    group by 1, 2;
+
+    delete from agg_hall_model_date a using agg_keys k
+    where a.hall_id = k.hall_id and a.date = k.date;
+    insert into agg_hall_model_date
+    select r.hall_id, r.date, r.model_id, count(*), sum(r.game), sum(r.medal), sum(r.bb), sum(r.rb),
+           count(*) filter (where r.medal > 0)
+    from agg_keys k join results r on r.hall_id = k.hall_id and r.date = k.date
+    group by 1, 2, 3;
+
+    delete from agg_hall_digit_date a using agg_keys k
+    where a.hall_id = k.hall_id and a.date = k.date;
+    insert into agg_hall_digit_date
+    select r.hall_id, r.date, r.unit_no % 10, count(*), sum(r.game), sum(r.medal), sum(r.bb), sum(r.rb),
+           count(*) filter (where r.medal > 0)
+    from agg_keys k join results r on r.hall_id = k.hall_id and r.date = k.date
+    group by 1, 2, 3;
+
+    delete from agg_model_date a using agg_model_keys k
+    where a.model_id = k.model_id and a.date = k.date;
+    insert into agg_model_date
+    select r.model_id, r.date, count(*), sum(r.game), sum(r.medal), sum(r.bb), sum(r.rb),
+           count(*) filter (where r.medal > 0)
+    from agg_model_keys k join results r on r.model_id = k.model_id and r.date = k.date
+    group by 1, 2;
+
+    return n;
+end;
+$$;
+
+-- results を日付・機種で引くための索引（agg_model_date の集計用）
+create index if not exists results_model_id_date_idx on public.results (model_id, date);
+create index if not exists results_hall_id_date_idx on public.results (hall_id, date);
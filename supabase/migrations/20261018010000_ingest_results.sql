@@ -0,0 +1,86 @@
+-- 名前で書いた results の行を 1 回の呼び出しで取り込む（df_to_supabase.ingest_results から呼ぶ）
+-- p_rows: [{"pref": "東京都", "hall": "...", "model": "...", "unit_no": 1, "date": "2026-10-01",
+--           "game": 1234, "bb": 3, "rb": 2, "medal": -120}, ...]
+-- prefectures / models / halls に無い名前を登録し、ID に置き換えて results に upsert する
+-- returns: {"rows": upsert した results の行数, "keys": [{"hall_id": 1, "date": "2026-10-01"}, ...]}
+-- 集計テーブルは、呼び出し側が全バッチの keys をまとめて refresh_daily_aggregates で更新する
+-- （並列のバッチごとに更新すると、別ホールの同じ日付で agg_model_date の行がぶつかるため）
+-- p_refresh なら 1 回の呼び出しで集計まで行う（psql などから単発で呼ぶ場合）
+drop function if exists public.ingest_results(jsonb, boolean);
+create function public.ingest_results(p_rows jsonb, p_refresh boolean default false)
+returns jsonb
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    n integer;
+    v_keys jsonb;
+begin
+    create temp table if not exists ingest_rows (
+        pref text,
+        hall text,
+        model text,
+        unit_no integer,
+        date date,
+        game integer,
+        bb integer,
+        rb integer,
+        medal integer
+    ) on commit drop;
+    truncate ingest_rows;
+
+    insert into ingest_rows
+    select r.pref, r.hall, r.model, r.unit_no, r.date, r.game, r.bb, r.rb, r.medal
+    from jsonb_to_recordset(p_rows) as r (
+        pref text, hall text, model text, unit_no integer, date date,
+        game integer, bb integer, rb integer, medal integer
+    )
+    where r.pref is not null and r.hall is not null and r.model is not null
+      and r.unit_no is not null and r.date is not null;
+
+    -- 並列に呼ばれてもロックの順番が揃うよう、キーの順に登録する
+    insert into prefectures (name)
+    select distinct pref from ingest_rows order by 1
+    on conflict (name) do nothing;
+
+    insert into models (name)
+    select distinct model from ingest_rows order by 1
+    on conflict (name) do nothing;
+
+    insert into halls (name, prefecture_id)
+    select distinct r.hall, p.prefecture_id
+    from ingest_rows r join prefectures p on p.name = r.pref
+    order by 2, 1
+    on conflict (name, prefecture_id) do nothing;
+
+    -- 同じ台が 1 回の呼び出しに複数あれば 1 行にする（on conflict は同じ行を 2 回更新できない）
+    insert into results (hall_id, model_id, unit_no, date, game, bb, rb, medal)
+    select distinct on (h.hall_id, m.model_id, r.unit_no, r.date)
+           h.hall_id, m.model_id, r.unit_no, r.date, r.game, r.bb, r.rb, r.medal
+    from ingest_rows r
+    join prefectures p on p.name = r.pref
+    join halls h on h.name = r.hall and h.prefecture_id = p.prefecture_id
+    join models m on m.name = r.model
+    order by h.hall_id, m.model_id, r.unit_no, r.date
+    on conflict (hall_id, model_id, unit_no, date) do update
+    set game = excluded.game, bb = excluded.bb, rb = excluded.rb, medal = excluded.medal;
+    get diagnostics n = row_count;
+
+    select coalesce(jsonb_agg(jsonb_build_object('hall_id', k.hall_id, 'date', k.date)), '[]')
+    into v_keys
+    from (
+        select distinct h.hall_id, r.date
+        from ingest_rows r
+        join prefectures p on p.name = r.pref
+        join halls h on h.name = r.hall and h.prefecture_id = p.prefecture_id
+    ) k;
+
+    -- null を渡すと全件作り直しになるため、空のときは呼ばない
+    if p_refresh and jsonb_array_length(v_keys) > 0 then
+        perform refresh_daily_aggregates(v_keys);
+    end if;
+
+    return jsonb_build_object('rows', n, 'keys', v_keys);
+end;
+$$;
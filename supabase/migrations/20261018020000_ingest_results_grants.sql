@@ -0,0 +1,14 @@
+-- ingest_results は security definer（RLS を通さずに results などへ書き込む）のため、
+-- PostgREST から anon キーで呼べないよう、実行権限を service_role だけに絞る
+-- （関数は作成時に PUBLIC へ実行権限が付き、Supabase では anon / authenticated にも付く）
+revoke all on function public.ingest_results(jsonb, boolean) from public;
+
+-- Supabase のロールが無い素の Postgres（README のローカル確認用コンテナ）では所有者だけが呼べる
+do $$
+begin
+    if exists (select 1 from pg_roles where rolname = 'service_role') then
+        revoke all on function public.ingest_results(jsonb, boolean) from anon, authenticated;
+        grant execute on function public.ingest_results(jsonb, boolean) to service_role;
+    end if;
+end;
+$$;
@@ -0,0 +1,33 @@
+-- refresh_daily_aggregates は security definer のため、anon キーから呼べると
+-- p_keys => null で全件の作り直しを誰でも起こせる。実行権限は service_role だけにする
+-- （ingest_results からの呼び出しは関数の所有者の権限で動くので影響しない）
+revoke all on function public.refresh_daily_aggregates(jsonb) from public;
+
+-- Supabase のロールが無い素の Postgres（README のローカル確認用コンテナ）では所有者だけが呼べる
+do $$
+begin
+    if exists (select 1 from pg_roles where rolname = 'service_role') then
+        revoke all on function public.refresh_daily_aggregates(jsonb) from anon, authenticated;
+        grant execute on function public.refresh_daily_aggregates(jsonb) to service_role;
+    end if;
+end;
+$$;
+
+-- 集計テーブルは読み取り専用で公開する（書き込みは refresh_daily_aggregates だけ）
+-- RLS を有効にし、select のポリシーだけを置く。service_role と関数の所有者は RLS を通らない
+alter table public.agg_hall_date enable row level security;
+alter table public.agg_model_date enable row level security;
+alter table public.agg_hall_model_date enable row level security;
+alter table public.agg_hall_digit_date enable row level security;
+
+drop policy if exists agg_hall_date_read on public.agg_hall_date;
+create policy agg_hall_date_read on public.agg_hall_date for select using (true);
+
+drop policy if exists agg_model_date_read on public.agg_model_date;
+create policy agg_model_date_read on public.agg_model_date for select using (true);
+
+drop policy if exists agg_hall_model_date_read on public.agg_hall_model_date;
+create policy agg_hall_model_date_read on public.agg_hall_model_date for select using (true);
+
+drop policy if exists agg_hall_digit_date_read on public.agg_hall_digit_date;
+create policy agg_hall_digit_date_read on public.agg_hall_digit_date for select using (true);
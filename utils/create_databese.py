@@ -5,6 +5,9 @@ def create_databese(DB_PATH):
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
 
+    # WAL は DB ファイルに保存される（取り込み中も読み取り可能にする）
+    cursor.execute("PRAGMA journal_mode = WAL")
+
     # --- テーブル作成 ---
 
     # 都道府県テーブル
@@ -78,6 +81,95 @@ def create_databese(DB_PATH):
         """
     )
 
+    # --- 日次の集計テーブル（scraper/aggregates.py と同じ定義） ---
+    # 取り込んだ (hall_id, date) の分だけ df_to_db が集計し直す
+    # units: 台数 / game・medal・bb・rb: 合計 / win_units: 差枚がプラスの台数
+
+    # ホール × 日付
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS agg_hall_date (
+            hall_id INTEGER NOT NULL,
+            date DATE NOT NULL,
+            units INTEGER NOT NULL,
+            game INTEGER,
+            medal INTEGER,
+            bb INTEGER,
+            rb INTEGER,
+            win_units INTEGER,
+            PRIMARY KEY (hall_id, date)
+        ) WITHOUT ROWID;
+        """
+    )
+
+    # 機種 × 日付
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS agg_model_date (
+            model_id INTEGER NOT NULL,
+            date DATE NOT NULL,
+            units INTEGER NOT NULL,
+            game INTEGER,
+            medal INTEGER,
+            bb INTEGER,
+            rb INTEGER,
+            win_units INTEGER,
+            PRIMARY KEY (model_id, date)
+        ) WITHOUT ROWID;
+        """
+    )
+
+    # ホール × 日付 × 機種
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS agg_hall_model_date (
+            hall_id INTEGER NOT NULL,
+            date DATE NOT NULL,
+            model_id INTEGER NOT NULL,
+            units INTEGER NOT NULL,
+            game INTEGER,
+            medal INTEGER,
+            bb INTEGER,
+            rb INTEGER,
+            win_units INTEGER,
+            PRIMARY KEY (hall_id, date, model_id)
+        ) WITHOUT ROWID;
+        """
+    )
+
+    # ホール × 日付 × 台番の末尾 (unit_no % 10)
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS agg_hall_digit_date (
+            hall_id INTEGER NOT NULL,
+            date DATE NOT NULL,
+            digit INTEGER NOT NULL,
+            units INTEGER NOT NULL,
+            game INTEGER,
+            medal INTEGER,
+            bb INTEGER,
+            rb INTEGER,
+            win_units INTEGER,
+            PRIMARY KEY (hall_id, date, digit)
+        ) WITHOUT ROWID;
+        """
+    )
+
+    # クロール状態テーブル（取得済みの ホール・日付・機種ページ を記録）
+    # model_url = '' の行は「その日付の全機種を取得済み」を表す
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS crawl_state (
+            hall TEXT NOT NULL,
+            date DATE NOT NULL,
+            model_url TEXT NOT NULL,
+            rows INTEGER,
+            ingested_at TEXT NOT NULL,
+            PRIMARY KEY (hall, date, model_url)
+        );
+        """
+    )
+
     # コミットして終了
     conn.commit()
     conn.close()